@@ -0,0 +1,265 @@
+"""
+Append-only JSONL storage for scraped card data.
+
+The scraper used to rewrite all of mtg_cards_data.json after every set.
+Here each set is appended as one JSON line per card followed by a commit
+marker line, written and fsynced in a single write, so a crash can only
+leave an uncommitted tail, which readers ignore and writers truncate away.
+
+Files ending in .gz are gzip (one member per set); files ending in .zst
+are zstandard (one frame per set, needs the zstandard package).
+compact_to_json() writes the legacy JSON array for older consumers such
+as detectname.py and image_scraper.py.
+"""
+import gzip
+import io
+import json
+import os
+import time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Key of the commit marker line written after each set's cards
+COMMIT_KEY = '_commit'
+
+# Errors that mean the end of the file was cut off mid-write
+TRUNCATION_ERRORS = (EOFError, OSError, ValueError)
+if zstandard is not None:
+    TRUNCATION_ERRORS += (zstandard.ZstdError,)
+
+
+def _compression(path):
+    if path.endswith('.gz'):
+        return 'gzip'
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise ImportError("zstandard is required for .zst card logs (pip install zstandard)")
+        return 'zstd'
+    return None
+
+
+def _compress(data, compression):
+    if compression == 'gzip':
+        return gzip.compress(data)
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor().compress(data)
+    return data
+
+
+def _open_lines(path):
+    """Open a card log for reading decoded lines, whatever its compression"""
+    compression = _compression(path)
+    raw = open(path, 'rb')
+    if compression == 'gzip':
+        return io.TextIOWrapper(gzip.GzipFile(fileobj=raw), encoding='utf-8')
+    if compression == 'zstd':
+        reader = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+        return io.TextIOWrapper(reader, encoding='utf-8')
+    return io.TextIOWrapper(raw, encoding='utf-8')
+
+
+def _iter_records(path, torn=None):
+    """
+    Yield (record, is_commit) for every complete line; stops at a truncated
+    tail. If a list is passed as `torn`, True is appended to it when one is hit.
+    """
+    if not os.path.exists(path):
+        return
+    with _open_lines(path) as f:
+        try:
+            for line in f:
+                if not line.endswith('\n'):
+                    raise ValueError("torn final line")
+                record = json.loads(line)
+                yield record, COMMIT_KEY in record
+        except TRUNCATION_ERRORS:
+            # A torn compressed member/frame or partial line at the end of the file
+            if torn is not None:
+                torn.append(True)
+
+
+def iter_cards(path):
+    """Stream the card dicts of every committed set, in write order"""
+    pending = []
+    for record, is_commit in _iter_records(path):
+        if is_commit:
+            yield from pending
+            pending = []
+        else:
+            pending.append(record)
+
+
+def committed_sets(path):
+    """Return the commit markers ({'set_id', 'cards', 'committed_at'}) in write order"""
+    return [record[COMMIT_KEY] for record, is_commit in _iter_records(path) if is_commit]
+
+
+def _committed_length(path):
+    """Byte length of the committed prefix of an uncompressed log"""
+    committed = 0
+    position = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            position += len(line)
+            if not line.endswith(b'\n'):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if COMMIT_KEY in record:
+                committed = position
+    return committed
+
+
+class CardDataLog:
+    def __init__(self, path='mtg_cards_data.jsonl', fsync=True):
+        """Open a card log for appending, dropping any uncommitted tail left by a crash"""
+        self.path = path
+        self.compression = _compression(path)
+        self.fsync = fsync
+        if os.path.exists(path):
+            if self.compression is None:
+                committed = _committed_length(path)
+                if committed < os.path.getsize(path):
+                    print(f"Discarding uncommitted tail of {path}")
+                    with open(path, 'r+b') as f:
+                        f.truncate(committed)
+            else:
+                self._repair_compressed()
+        self.file = open(path, 'ab')
+
+    def _repair_compressed(self):
+        """Rewrite a compressed log without its uncommitted tail (compressed files can't be truncated)"""
+        torn = []
+        uncommitted = False
+        for _, is_commit in _iter_records(self.path, torn):
+            uncommitted = not is_commit
+        if not torn and not uncommitted:
+            return
+
+        print(f"Discarding uncommitted tail of {self.path}")
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'wb') as f:
+            lines = []
+            for record, is_commit in _iter_records(self.path):
+                lines.append(json.dumps(record, ensure_ascii=False))
+                if is_commit:
+                    f.write(_compress(('\n'.join(lines) + '\n').encode('utf-8'), self.compression))
+                    lines = []
+        os.replace(temp_path, self.path)
+
+    def append_set(self, set_id, cards, continues=False):
+        """
+        Append one set's cards and its commit marker as a single write.
+        Pass continues=True when the cards are a later page of the same
+        scrape of the set as the previous commit for it. Returns the card count.
+        """
+        lines = [json.dumps(card, ensure_ascii=False) for card in cards]
+        marker = {
+            'set_id': str(set_id),
+            'cards': len(cards),
+            'committed_at': time.time(),
+        }
+        if continues:
+            marker['continues'] = True
+        lines.append(json.dumps({COMMIT_KEY: marker}))
+        self.file.write(_compress(('\n'.join(lines) + '\n').encode('utf-8'), self.compression))
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+        return len(cards)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def iter_card_keys(path):
+    """
+    Yield a key per committed card, in iter_cards order: the card URL, or
+    for cards without one (set id, name, n) for the n-th card of that name
+    in its scrape of the set, so a re-scrape replaces same-named cards one
+    for one. A scrape spans the set's commits from one without `continues`
+    up to the next one (page-by-page commits), numbering cards the same way
+    as the database's id suffixes.
+    """
+    pending = []
+    occurrences = {}  # set id -> {name: cards of that name so far in the set's scrape}
+    for record, is_commit in _iter_records(path):
+        if not is_commit:
+            pending.append(record)
+            continue
+        marker = record[COMMIT_KEY]
+        if not marker.get('continues'):
+            occurrences.pop(str(marker.get('set_id', '')), None)
+        for card in pending:
+            if card.get('card_url'):
+                yield card['card_url']
+                continue
+            set_id, name = str(card.get('set_id', '')), card.get('name', '')
+            names = occurrences.setdefault(set_id, {})
+            occurrence = names.get(name, 0)
+            names[name] = occurrence + 1
+            yield (set_id, name, occurrence)
+        pending = []
+
+
+def compact_to_json(log_path, json_path='mtg_cards_data.json'):
+    """
+    Write the committed cards of a log as the legacy JSON array (same layout
+    as json.dump(cards, indent=2)), streaming and atomically. A card that
+    was scraped more than once is written once, as its latest record (see
+    iter_card_keys). Returns the count.
+    """
+    # First pass: the position of each card's latest record
+    latest = {}
+    for position, key in enumerate(iter_card_keys(log_path)):
+        latest[key] = position
+    keep = set(latest.values())
+
+    temp_path = f"{json_path}.tmp"
+    count = 0
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for position, card in enumerate(iter_cards(log_path)):
+            if position not in keep:
+                continue
+            f.write(',\n  ' if count else '\n  ')
+            f.write(json.dumps(card, indent=2, ensure_ascii=False).replace('\n', '\n  '))
+            count += 1
+        f.write('\n]' if count else ']')
+    os.replace(temp_path, json_path)
+    print(f"Compacted {count} cards from {log_path} into {json_path}")
+    return count
+
+
+def import_legacy_json(json_path, log_path):
+    """
+    One-time import of a legacy JSON array into a new card log, one
+    commit per run of consecutive cards from the same set. Returns the count.
+    """
+    with open(json_path, 'r', encoding='utf-8') as f:
+        cards = json.load(f)
+
+    imported = 0
+    with CardDataLog(log_path, fsync=False) as log:
+        batch = []
+        for card in cards:
+            if batch and card.get('set_id') != batch[0].get('set_id'):
+                imported += log.append_set(batch[0].get('set_id'), batch)
+                batch = []
+            batch.append(card)
+        if batch:
+            imported += log.append_set(batch[0].get('set_id'), batch)
+        os.fsync(log.file.fileno())
+    print(f"Imported {imported} cards from {json_path} into {log_path}")
+    return imported
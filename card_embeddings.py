@@ -0,0 +1,43 @@
+"""
+Cheap deterministic embeddings for the MTG card collection.
+
+Running Chroma's default embedding model over every card document is the
+slowest part of an ingest and needs a model download. The hashed
+character n-gram embedding here costs a few microseconds per card on a
+plain CPU. It has the same dimensionality as the default model, so hashed
+and semantic vectors can live in one collection until a backfill job
+replaces the hashed ones (see MTGCardDatabase.backfill_semantic_embeddings).
+"""
+import math
+import zlib
+
+# Matches all-MiniLM-L6-v2, Chroma's default embedding model
+EMBEDDING_DIMENSIONS = 384
+NGRAM_SIZE = 3
+
+
+def hashed_ngram_embedding(text, dimensions=EMBEDDING_DIMENSIONS, ngram_size=NGRAM_SIZE):
+    """Embed text as an L2-normalized vector of signed, hashed character n-gram counts"""
+    vector = [0.0] * dimensions
+    padded = f" {' '.join(text.lower().split())} "
+
+    for i in range(len(padded) - ngram_size + 1):
+        digest = zlib.crc32(padded[i:i + ngram_size].encode('utf-8'))
+        # Low bits pick the slot, the top bit picks the sign
+        vector[digest % dimensions] += -1.0 if digest & 0x80000000 else 1.0
+
+    norm = math.sqrt(sum(value * value for value in vector))
+    if norm:
+        vector = [value / norm for value in vector]
+    return vector
+
+
+class HashedNgramEmbeddingFunction:
+    """Embeds a list of texts, with the same call signature as a Chroma embedding function"""
+
+    def __init__(self, dimensions=EMBEDDING_DIMENSIONS, ngram_size=NGRAM_SIZE):
+        self.dimensions = dimensions
+        self.ngram_size = ngram_size
+
+    def __call__(self, input):
+        return [hashed_ngram_embedding(text, self.dimensions, self.ngram_size) for text in input]
@@ -0,0 +1,374 @@
+"""
+In-memory lexical and fuzzy indexes over normalized MTG card names.
+
+Used by MTGCardDatabase so that a price lookup only scores the cards that
+share a word (or a word prefix) with the query, instead of pulling every
+stored card out of ChromaDB and scoring the whole collection. The trigram
+matcher resolves OCR-garbled names and typos without a full scan.
+"""
+import heapq
+import itertools
+import math
+from collections import defaultdict
+
+# Query words at least this long also match stored words that start with them
+PREFIX_LENGTH = 3
+
+# Minimum trigram similarity for a name to count as a fuzzy match
+FUZZY_MIN_SIMILARITY = 0.4
+
+# How many fuzzy name matches the lexical index adds to its candidates
+FUZZY_CANDIDATES = 20
+
+
+def name_trigrams(name):
+    """Return the set of character trigrams of a normalized name"""
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def trigram_similarity(name1, name2):
+    """Jaccard similarity of the trigram sets of two normalized names (0.0-1.0)"""
+    grams1 = name_trigrams(name1)
+    grams2 = name_trigrams(name2)
+    shared = len(grams1 & grams2)
+    return shared / (len(grams1) + len(grams2) - shared)
+
+
+def calculate_name_similarity(query_normalized, stored_normalized, original_stored):
+    """Calculate similarity score (0-100) between card names"""
+    # Exact match (highest priority)
+    if query_normalized == stored_normalized:
+        return 100
+    
+    # Exact match ignoring case in original
+    if query_normalized == original_stored.lower().strip():
+        return 95
+    
+    # Query is contained in stored name
+    if query_normalized in stored_normalized:
+        return 80
+    
+    # Stored name is contained in query
+    if stored_normalized in query_normalized:
+        return 75
+    
+    if not query_normalized or not stored_normalized:
+        return 0
+    
+    # Word-by-word matching
+    query_words = set(query_normalized.split())
+    stored_words = set(stored_normalized.split())
+    
+    word_score = 0
+    if query_words and stored_words:
+        # Calculate Jaccard similarity (intersection over union)
+        intersection = len(query_words.intersection(stored_words))
+        union = len(query_words.union(stored_words))
+        jaccard_score = intersection / union
+        
+        # Bonus for having all query words
+        if query_words.issubset(stored_words):
+            jaccard_score += 0.2
+        
+        # Convert to 0-70 scale for word matching
+        word_score = int(jaccard_score * 70)
+    
+    # Character trigrams catch typos and OCR errors that share no whole word
+    fuzzy_similarity = trigram_similarity(query_normalized, stored_normalized)
+    fuzzy_score = int(fuzzy_similarity * 70) if fuzzy_similarity >= FUZZY_MIN_SIMILARITY else 0
+    
+    return max(word_score, fuzzy_score)
+
+
+def top_k_scored(scored_items, k, exact_score=100):
+    """
+    Return the k best tuples from scored_items (tuples whose first element is
+    the score), best first, with earlier items winning ties.
+
+    Items are streamed through a bounded min-heap, so the full scored list
+    is never built, and scoring stops as soon as k exact matches are held.
+    Items scoring 0 or less are dropped.
+    """
+    if k <= 0:
+        return []
+
+    heap = []
+    order = itertools.count()
+    for item in scored_items:
+        score = item[0]
+        if score <= 0:
+            continue
+        # Negated arrival order breaks ties without comparing the items
+        entry = (score, -next(order), item)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif score > heap[0][0]:
+            heapq.heapreplace(heap, entry)
+        if len(heap) == k and heap[0][0] >= exact_score:
+            break
+
+    return [item for _, _, item in sorted(heap, reverse=True)]
+
+
+class TrigramNameMatcher:
+    def __init__(self, names=()):
+        """Create a trigram index, optionally filled with normalized names"""
+        # name -> trigram set, for every indexed name
+        self.name_grams = {}
+        # trigram -> names containing it
+        self.postings = defaultdict(set)
+        for name in names:
+            self.add(name)
+
+    def __len__(self):
+        return len(self.name_grams)
+
+    def add(self, name):
+        """Add a normalized name to the index"""
+        if not name or name in self.name_grams:
+            return
+        grams = name_trigrams(name)
+        self.name_grams[name] = grams
+        for gram in grams:
+            self.postings[gram].add(name)
+
+    def remove(self, name):
+        """Remove a normalized name from the index"""
+        grams = self.name_grams.pop(name, None)
+        if grams is None:
+            return
+        for gram in grams:
+            names = self.postings.get(gram)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del self.postings[gram]
+
+    def search(self, query, k=5, min_similarity=FUZZY_MIN_SIMILARITY):
+        """
+        Return up to k (similarity, name) pairs with trigram similarity of at
+        least min_similarity, best first.
+        """
+        if not query or not self.name_grams:
+            return []
+
+        query_grams = name_trigrams(query)
+        query_size = len(query_grams)
+
+        # Prefix filter: a name reaching min_similarity shares at least
+        # ceil(min_similarity * |query|) trigrams with the query, so it must
+        # contain one of the rarest (|query| - that + 1) query trigrams.
+        # Only the short posting lists of those rare trigrams are read.
+        required = max(1, math.ceil(min_similarity * query_size))
+        known_grams = sorted(
+            (gram for gram in query_grams if gram in self.postings),
+            key=lambda gram: len(self.postings[gram])
+        )
+        if len(known_grams) < required:
+            return []
+        rare_grams = known_grams[:len(known_grams) - required + 1]
+
+        candidates = set()
+        for gram in rare_grams:
+            candidates.update(self.postings[gram])
+
+        matches = []
+        for name in candidates:
+            grams = self.name_grams[name]
+            # Length filter: similarity can't exceed the smaller/larger set ratio
+            if min(len(grams), query_size) < min_similarity * max(len(grams), query_size):
+                continue
+            shared = len(query_grams & grams)
+            similarity = shared / (query_size + len(grams) - shared)
+            if similarity >= min_similarity:
+                matches.append((similarity, name))
+
+        return heapq.nlargest(k, matches)
+
+
+class CardNameIndex:
+    def __init__(self):
+        """Create an empty index"""
+        # normalized name -> card ids stored under that name
+        self.name_to_ids = defaultdict(set)
+        # word -> normalized names containing that word
+        self.token_postings = defaultdict(set)
+        # first PREFIX_LENGTH characters of a word -> words starting with them
+        self.prefix_postings = defaultdict(set)
+        # card id -> (normalized name, original name, set name)
+        self.cards = {}
+        # card id -> order the card was first added in (the collection order
+        # when built from the database), used to break score ties the same way every run
+        self.positions = {}
+        self.next_position = 0
+        # Trigram matcher over the same normalized names
+        self.fuzzy = TrigramNameMatcher()
+        # Per-set partitions: lowercased set name -> card ids in that set
+        self.set_partitions = defaultdict(set)
+        # Resolved set filters: lowercased query -> matching partition keys
+        self.set_resolver_cache = {}
+
+    def __len__(self):
+        return len(self.cards)
+
+    def __contains__(self, card_id):
+        return card_id in self.cards
+
+    def add(self, card_id, normalized_name, name, set_name):
+        """Add (or replace) a single card in the index"""
+        position = self.positions.get(card_id)
+        if card_id in self.cards:
+            self.remove(card_id)
+        if position is None:
+            position = self.next_position
+            self.next_position += 1
+        self.positions[card_id] = position
+
+        self.cards[card_id] = (normalized_name, name or '', set_name or '')
+
+        set_key = self.set_key(set_name)
+        if set_key not in self.set_partitions:
+            self.set_resolver_cache.clear()
+        self.set_partitions[set_key].add(card_id)
+
+        is_new_name = normalized_name not in self.name_to_ids
+        self.name_to_ids[normalized_name].add(card_id)
+
+        if is_new_name:
+            self.fuzzy.add(normalized_name)
+            for token in set(normalized_name.split()):
+                self.token_postings[token].add(normalized_name)
+                self.prefix_postings[token[:PREFIX_LENGTH]].add(token)
+
+    def remove(self, card_id):
+        """Remove a card from the index, dropping postings that become empty"""
+        entry = self.cards.pop(card_id, None)
+        if entry is None:
+            return
+        del self.positions[card_id]
+
+        set_key = self.set_key(entry[2])
+        partition = self.set_partitions.get(set_key)
+        if partition is not None:
+            partition.discard(card_id)
+            if not partition:
+                del self.set_partitions[set_key]
+                self.set_resolver_cache.clear()
+
+        normalized_name = entry[0]
+        ids = self.name_to_ids.get(normalized_name)
+        if ids is None:
+            return
+
+        ids.discard(card_id)
+        if ids:
+            return
+
+        del self.name_to_ids[normalized_name]
+        self.fuzzy.remove(normalized_name)
+        for token in set(normalized_name.split()):
+            names = self.token_postings.get(token)
+            if names is None:
+                continue
+            names.discard(normalized_name)
+            if not names:
+                del self.token_postings[token]
+                tokens = self.prefix_postings.get(token[:PREFIX_LENGTH])
+                if tokens is not None:
+                    tokens.discard(token)
+                    if not tokens:
+                        del self.prefix_postings[token[:PREFIX_LENGTH]]
+
+    def set_key(self, set_name):
+        """Partition key for a set name"""
+        return (set_name or '').strip().lower()
+
+    def resolve_sets(self, set_query):
+        """Return the partition keys of every stored set whose name contains set_query"""
+        query = self.set_key(set_query)
+        resolved = self.set_resolver_cache.get(query)
+        if resolved is None:
+            resolved = [set_key for set_key in self.set_partitions if query in set_key]
+            self.set_resolver_cache[query] = resolved
+        return resolved
+
+    def set_names(self, set_keys):
+        """Return the stored (original) set names for partition keys"""
+        names = set()
+        for set_key in set_keys:
+            card_id = next(iter(self.set_partitions.get(set_key, ())), None)
+            if card_id is not None:
+                names.add(self.cards[card_id][2])
+        return sorted(names)
+
+    def _in_card_order(self, card_ids):
+        """Yield (card_id, normalized name, original name, set name) for card_ids, in the order they were added"""
+        for card_id in sorted(card_ids, key=self.positions.__getitem__):
+            yield (card_id,) + self.cards[card_id]
+
+    def cards_in_sets(self, set_keys):
+        """Yield (card_id, normalized name, original name, set name) for every card in the given sets"""
+        return self._in_card_order(
+            card_id for set_key in set_keys for card_id in self.set_partitions.get(set_key, ())
+        )
+
+    def candidate_names(self, normalized_query):
+        """
+        Return the stored normalized names sharing a word or word prefix with
+        the query, plus its closest trigram matches.
+        """
+        names = set(name for _, name in self.fuzzy.search(normalized_query, k=FUZZY_CANDIDATES))
+
+        if normalized_query in self.name_to_ids:
+            names.add(normalized_query)
+
+        for token in set(normalized_query.split()):
+            names.update(self.token_postings.get(token, ()))
+
+            if len(token) >= PREFIX_LENGTH:
+                for stored_token in self.prefix_postings.get(token[:PREFIX_LENGTH], ()):
+                    if stored_token != token and stored_token.startswith(token):
+                        names.update(self.token_postings[stored_token])
+
+        return names
+
+    def substring_names(self, normalized_query):
+        """
+        Return the stored normalized names containing the query anywhere,
+        including inside a word ("ragon" finds "shivan dragon"). Such names
+        contain every trigram of the query, so only the names in the
+        intersection of its trigram postings are checked.
+        """
+        if not normalized_query:
+            return set()
+        grams = [normalized_query[i:i + 3] for i in range(len(normalized_query) - 2)]
+        if not grams:
+            # Too short for trigrams: check every name
+            return {name for name in self.name_to_ids if normalized_query in name}
+
+        postings = sorted((self.fuzzy.postings.get(gram, set()) for gram in set(grams)), key=len)
+        names = set(postings[0])
+        for posting in postings[1:]:
+            if not names:
+                break
+            names &= posting
+        return {name for name in names if normalized_query in name}
+
+    def substring_candidates(self, normalized_query):
+        """Yield (card_id, normalized name, original name, set name) for every card whose name contains the query"""
+        return self._in_card_order(
+            card_id for normalized_name in self.substring_names(normalized_query)
+            for card_id in self.name_to_ids.get(normalized_name, ())
+        )
+
+    def candidates(self, normalized_query):
+        """
+        Yield (card_id, normalized name, original name, set name) for every
+        candidate card, in the order the cards were added, so equal scores
+        resolve the same way on every run
+        """
+        return self._in_card_order(
+            card_id for normalized_name in self.candidate_names(normalized_query)
+            for card_id in self.name_to_ids.get(normalized_name, ())
+        )
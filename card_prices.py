@@ -0,0 +1,17 @@
+"""
+Price fields shared by the card database, the price history store and
+the catalog analytics, and the one parser they all use for price values.
+"""
+PRICE_FIELDS = ['price', 'market_price', 'low_price', 'high_price', 'average_price']
+
+
+def parse_price(value):
+    """Return a price ('$1,234.50', '2.5', 3) as float, or None if it isn't numeric"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace(',', '').replace('$', '').strip())
+    except ValueError:
+        return None
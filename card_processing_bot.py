@@ -21,6 +21,7 @@ LISTEN_CHANNEL_NAME = "datadump"
 # The channel where the bot will post results and the bulk CSV.
 RESULTS_CHANNEL_NAME = "results" 
 PRICE_THRESHOLD = 1.00
+CATALOG_REPORT_COMMAND = "!catalog"
 
 # --- Bot Setup ---
 intents = discord.Intents.default()
@@ -44,6 +45,15 @@ async def on_message(message):
     if message.author == client.user:
         return
 
+    # "!catalog" posts the price database analytics report
+    if message.content.strip().lower() == CATALOG_REPORT_COMMAND:
+        # Imported here: loading the price database is slow and only this command needs it
+        from mtgstocksPriceDatabasescraper import get_catalog_report_text
+        report = await asyncio.to_thread(get_catalog_report_text)
+        for chunk in [report[i:i+1950] for i in range(0, len(report), 1950)]:
+            await message.channel.send(f"```\n{chunk}\n```")
+        return
+
     # Check if the message is in the correct channel and has a CSV attachment
     if message.channel.name == LISTEN_CHANNEL_NAME and message.attachments:
         attachment = message.attachments[0]
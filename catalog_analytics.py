@@ -0,0 +1,239 @@
+"""
+Vectorized analytics over the MTG card catalog.
+
+The catalog's price fields are loaded once into NumPy arrays (one float64
+column per price field, NaN = missing), from card dicts or straight from
+the ChromaDB collection. Everything else is computed on those arrays over
+the whole catalog, never a sample:
+
+    coverage         cards with each price field, and with any price
+    distribution     percentiles of a price field
+    group_stats      count, priced share, mean, median, p90, max and total
+                     value per set or per rarity
+    top_movers       biggest risers and fallers since a date, against the
+                     price history store
+
+catalog_report() bundles them into one dict for the bot and the LLM
+assistant; format_report() renders it as text.
+
+    python catalog_analytics.py [--json mtg_cards_data.json] [--days 7] [--top 10]
+"""
+import json
+import sys
+import time
+
+import numpy as np
+
+from card_prices import PRICE_FIELDS, parse_price
+
+LABEL_FIELDS = ['name', 'set_name', 'rarity']
+PERCENTILES = [10, 25, 50, 75, 90, 99]
+
+DAY_SECONDS = 86400
+
+
+def _price_column(cards, field):
+    """float64 column of one price field, NaN where missing or not numeric"""
+    prices = (parse_price(card.get(field)) for card in cards)
+    return np.fromiter((np.nan if price is None else price for price in prices),
+                       dtype=np.float64, count=len(cards))
+
+
+class CatalogArrays:
+    def __init__(self, card_ids, labels, prices):
+        """
+        Columnar catalog: card_ids and labels[field] are object arrays,
+        prices[field] is a float64 array with NaN for missing prices
+        """
+        self.card_ids = card_ids
+        self.labels = labels
+        self.prices = prices
+
+    def __len__(self):
+        return len(self.card_ids)
+
+
+def arrays_from_cards(cards, card_ids=None):
+    """Build CatalogArrays from card dicts or ChromaDB metadatas"""
+    cards = list(cards)
+    if card_ids is None:
+        card_ids = [card.get('card_url') or card.get('name', '') for card in cards]
+    labels = {field: np.array([card.get(field) or '' for card in cards], dtype=object)
+              for field in LABEL_FIELDS}
+    prices = {field: _price_column(cards, field) for field in PRICE_FIELDS}
+    return CatalogArrays(np.array(card_ids, dtype=object), labels, prices)
+
+
+def arrays_from_collection(collection, batch_size=5000):
+    """Build CatalogArrays from every card in the MTGCardDatabase collection"""
+    card_ids = []
+    metadatas = []
+    offset = 0
+    while True:
+        batch = collection.get(include=['metadatas'], limit=batch_size, offset=offset)
+        if not batch['ids']:
+            break
+        card_ids.extend(batch['ids'])
+        metadatas.extend(metadata or {} for metadata in batch['metadatas'])
+        offset += len(batch['ids'])
+        if len(batch['ids']) < batch_size:
+            break
+    return arrays_from_cards(metadatas, card_ids)
+
+
+def coverage(catalog):
+    """{field: cards with that price, 'any': cards with any price, 'total': cards}"""
+    priced = {field: int(np.count_nonzero(values > 0)) for field, values in catalog.prices.items()}
+    any_price = np.zeros(len(catalog), dtype=bool)
+    for values in catalog.prices.values():
+        any_price |= values > 0
+    priced['any'] = int(np.count_nonzero(any_price))
+    priced['total'] = len(catalog)
+    return priced
+
+
+def distribution(catalog, field='price', percentiles=PERCENTILES):
+    """Percentiles, mean and count of a price field over the priced cards"""
+    values = catalog.prices[field]
+    values = values[values > 0]
+    if not len(values):
+        return {'count': 0}
+    return {
+        'count': int(len(values)),
+        'mean': float(values.mean()),
+        'percentiles': dict(zip(percentiles, np.percentile(values, percentiles).tolist())),
+    }
+
+
+def group_stats(catalog, by='set_name', field='price'):
+    """
+    Per-group stats of a price field, most valuable groups first: a list of
+    {group, cards, priced, mean, median, p90, max, total}.
+    """
+    if not len(catalog):
+        return []
+    groups, inverse = np.unique(catalog.labels[by].astype(str), return_inverse=True)
+    values = catalog.prices[field]
+    priced = values > 0
+
+    cards = np.bincount(inverse, minlength=len(groups))
+    priced_counts = np.bincount(inverse, weights=priced, minlength=len(groups))
+    totals = np.bincount(inverse, weights=np.where(priced, values, 0.0), minlength=len(groups))
+
+    # Priced cards sorted by group then price, so each group is one contiguous, ordered slice
+    order = np.lexsort((values[priced], inverse[priced]))
+    sorted_values = values[priced][order]
+    bounds = np.concatenate(([0], np.cumsum(priced_counts.astype(np.int64))))
+
+    stats = []
+    for i, group in enumerate(groups):
+        group_values = sorted_values[bounds[i]:bounds[i + 1]]
+        entry = {'group': group or 'Unknown', 'cards': int(cards[i]), 'priced': int(priced_counts[i]),
+                 'total': float(totals[i])}
+        if len(group_values):
+            entry['mean'] = float(totals[i] / priced_counts[i])
+            entry['median'], entry['p90'] = np.percentile(group_values, [50, 90]).tolist()
+            entry['max'] = float(group_values[-1])
+        stats.append(entry)
+    stats.sort(key=lambda entry: entry['total'], reverse=True)
+    return stats
+
+
+def top_movers(catalog, price_history, since, field='price', n=10, min_price=0.0):
+    """
+    Biggest percent risers and fallers between `since` and the current
+    catalog prices: {'risers': [...], 'fallers': [...]}, each entry a dict
+    with card_id, name, set_name, old, new and delta_pct. Cards priced
+    below min_price at both ends are ignored.
+    """
+    old_by_id = price_history.prices_at(since, field)
+    old = np.array([old_by_id.get(card_id, np.nan) for card_id in catalog.card_ids], dtype=np.float64)
+    new = catalog.prices[field]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delta_pct = (new - old) / old * 100
+    valid = (old > 0) & (new > 0) & (np.maximum(old, new) >= min_price) & (new != old)
+    candidates = np.flatnonzero(valid)
+
+    def entries(indices):
+        return [{
+            'card_id': catalog.card_ids[i],
+            'name': catalog.labels['name'][i],
+            'set_name': catalog.labels['set_name'][i],
+            'old': float(old[i]),
+            'new': float(new[i]),
+            'delta_pct': float(delta_pct[i]),
+        } for i in indices]
+
+    by_change = candidates[np.argsort(delta_pct[candidates], kind='stable')]
+    risers = by_change[::-1][:n]
+    fallers = by_change[:n]
+    return {
+        'risers': entries(risers[delta_pct[risers] > 0]),
+        'fallers': entries(fallers[delta_pct[fallers] < 0]),
+    }
+
+
+def catalog_report(catalog, price_history=None, days=7, top=10, field='price'):
+    """Full-catalog report as a plain dict (JSON-serializable)"""
+    report = {
+        'generated_at': time.time(),
+        'cards': len(catalog),
+        'sets': int(len(np.unique(catalog.labels['set_name'].astype(str)))),
+        'coverage': coverage(catalog),
+        'distribution': distribution(catalog, field),
+        'by_set': group_stats(catalog, 'set_name', field)[:top],
+        'by_rarity': group_stats(catalog, 'rarity', field),
+    }
+    if price_history is not None:
+        report['movers_days'] = days
+        report['movers'] = top_movers(catalog, price_history, time.time() - days * DAY_SECONDS, field, top)
+    return report
+
+
+def format_report(report):
+    """Render a catalog_report dict as text"""
+    lines = [f"=== CATALOG REPORT ===",
+             f"Cards: {report['cards']} in {report['sets']} sets"]
+
+    cov = report['coverage']
+    total = cov['total'] or 1
+    lines.append(f"Cards with any price: {cov['any']} ({cov['any'] / total:.1%})")
+    for field in PRICE_FIELDS:
+        if cov[field]:
+            lines.append(f"  {field}: {cov[field]} ({cov[field] / total:.1%})")
+
+    dist = report['distribution']
+    if dist['count']:
+        percentiles = ', '.join(f"p{q}: ${value:,.2f}" for q, value in dist['percentiles'].items())
+        lines.append(f"Price distribution ({dist['count']} priced, mean ${dist['mean']:,.2f}): {percentiles}")
+
+    for title, key in (("Most valuable sets", 'by_set'), ("By rarity", 'by_rarity')):
+        lines.append(f"\n{title}:")
+        for entry in report[key]:
+            if entry['priced']:
+                lines.append(f"  {entry['group']}: {entry['cards']} cards, total ${entry['total']:,.2f}, "
+                             f"median ${entry['median']:,.2f}, p90 ${entry['p90']:,.2f}, max ${entry['max']:,.2f}")
+            else:
+                lines.append(f"  {entry['group']}: {entry['cards']} cards, no prices")
+
+    if 'movers' in report:
+        for title, key in (("Top risers", 'risers'), ("Top fallers", 'fallers')):
+            lines.append(f"\n{title} (last {report['movers_days']} days):")
+            if not report['movers'][key]:
+                lines.append("  none")
+            for entry in report['movers'][key]:
+                lines.append(f"  {entry['name']} ({entry['set_name']}): ${entry['old']:,.2f} -> "
+                             f"${entry['new']:,.2f} ({entry['delta_pct']:+.1f}%)")
+    return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    days = int(sys.argv[sys.argv.index('--days') + 1]) if '--days' in sys.argv[:-1] else 7
+    top = int(sys.argv[sys.argv.index('--top') + 1]) if '--top' in sys.argv[:-1] else 10
+    if '--json' in sys.argv[:-1]:
+        with open(sys.argv[sys.argv.index('--json') + 1], 'r', encoding='utf-8') as f:
+            print(format_report(catalog_report(arrays_from_cards(json.load(f)), days=days, top=top)))
+    else:
+        from mtgstocksPriceDatabasescraper import get_catalog_report_text
+        print(get_catalog_report_text(days=days, top=top))
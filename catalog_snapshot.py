@@ -0,0 +1,297 @@
+"""
+Compact binary snapshot of the MTG card catalog.
+
+Loading mtg_cards_data.json means parsing the whole catalog, and reading
+through ChromaDB is slower still. A snapshot stores the same cards as
+columnar arrays (float64 prices, uint32 string references) plus an
+interned string table with an offset index. Opening one only memory-maps
+the file and reads a small header, so startup cost doesn't grow with the
+catalog; records are decoded on access.
+
+Each snapshot records the format version and a tag describing its source
+(file mtime/size for JSON, row count for ChromaDB), so readers can tell
+when it is stale and regenerate it.
+
+File layout (little-endian):
+    header        magic, version, record count, string count, created_at,
+                  source tag length; then the source tag (UTF-8)
+    prices        one float64 column per PRICE_COLUMNS field, NaN = missing
+    references    one uint32 column per STRING_COLUMNS field (string ids)
+    string index  uint32 offsets into the string blob (string count + 1)
+    string blob   UTF-8 strings, concatenated
+Every section starts on an 8-byte boundary.
+"""
+import json
+import math
+import mmap
+import os
+import struct
+import time
+from array import array
+
+from card_prices import PRICE_FIELDS
+
+SNAPSHOT_MAGIC = b'MTGSNAP\0'
+SNAPSHOT_VERSION = 1
+
+HEADER_FORMAT = '<8sIIIdI'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+STRING_COLUMNS = ['name', 'set_name', 'set_id', 'rarity', 'card_url']
+# Changing the price fields changes the file layout: bump SNAPSHOT_VERSION
+PRICE_COLUMNS = list(PRICE_FIELDS)
+# Collection metadata key counting writes to the card collection
+WRITE_VERSION_KEY = 'write_version'
+
+
+def _padding(length):
+    return b'\0' * (-length % 8)
+
+
+def _parse_price(value):
+    try:
+        return float(str(value).replace(',', '').replace('$', ''))
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def json_source_tag(json_path):
+    """Source tag identifying the current contents of a JSON catalog file"""
+    stat = os.stat(json_path)
+    return f"json:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def collection_source_tag(collection):
+    """
+    Source tag identifying the current contents of a ChromaDB collection:
+    its size plus the write version MTGCardDatabase bumps on every write,
+    so price-only updates make snapshots stale too
+    """
+    write_version = (collection.metadata or {}).get(WRITE_VERSION_KEY, 0)
+    return f"chroma:{collection.count()}:{write_version}"
+
+
+def write_snapshot(cards, snapshot_path, source_tag=''):
+    """Write an iterable of card dicts to a snapshot file (atomically). Returns the record count."""
+    strings = {}
+    string_columns = {column: array('I') for column in STRING_COLUMNS}
+    price_columns = {column: array('d') for column in PRICE_COLUMNS}
+
+    for card in cards:
+        for column in STRING_COLUMNS:
+            value = str(card.get(column) or '')
+            string_id = strings.get(value)
+            if string_id is None:
+                string_id = strings[value] = len(strings)
+            string_columns[column].append(string_id)
+        for column in PRICE_COLUMNS:
+            value = card.get(column)
+            price_columns[column].append(_parse_price(value) if value not in (None, '') else math.nan)
+
+    record_count = len(string_columns['name'])
+
+    encoded = [value.encode('utf-8') for value in strings]
+    offsets = array('I', [0])
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+
+    tag = source_tag.encode('utf-8')
+    header = struct.pack(HEADER_FORMAT, SNAPSHOT_MAGIC, SNAPSHOT_VERSION, record_count,
+                         len(encoded), time.time(), len(tag)) + tag
+
+    temp_path = f"{snapshot_path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(header + _padding(len(header)))
+        for column in PRICE_COLUMNS:
+            f.write(price_columns[column].tobytes())
+        for column in STRING_COLUMNS:
+            data = string_columns[column].tobytes()
+            f.write(data + _padding(len(data)))
+        data = offsets.tobytes()
+        f.write(data + _padding(len(data)))
+        f.write(b''.join(encoded))
+    os.replace(temp_path, snapshot_path)
+
+    print(f"Wrote catalog snapshot with {record_count} cards to {snapshot_path}")
+    return record_count
+
+
+def snapshot_from_json(json_path, snapshot_path):
+    """Generate a snapshot from the legacy JSON catalog"""
+    source_tag = json_source_tag(json_path)
+    with open(json_path, 'r', encoding='utf-8') as f:
+        cards = json.load(f)
+    return write_snapshot(cards, snapshot_path, source_tag)
+
+
+def snapshot_from_collection(collection, snapshot_path, batch_size=5000):
+    """Generate a snapshot from the MTGCardDatabase ChromaDB collection"""
+    source_tag = collection_source_tag(collection)
+
+    def iter_cards():
+        offset = 0
+        while True:
+            batch = collection.get(include=['metadatas'], limit=batch_size, offset=offset)
+            if not batch['ids']:
+                return
+            yield from batch['metadatas']
+            offset += len(batch['ids'])
+            if len(batch['ids']) < batch_size:
+                return
+
+    return write_snapshot(iter_cards(), snapshot_path, source_tag)
+
+
+class CatalogSnapshot:
+    def __init__(self, snapshot_path):
+        """Memory-map a snapshot file; raises ValueError if it isn't a readable snapshot"""
+        self.snapshot_path = snapshot_path
+        self.file = open(snapshot_path, 'rb')
+        try:
+            self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise ValueError(f"Empty snapshot file: {snapshot_path}")
+
+        try:
+            self._map_sections()
+        except (ValueError, struct.error, TypeError):
+            self.close()
+            raise
+
+    def _map_sections(self):
+        if len(self.mmap) < HEADER_SIZE:
+            raise ValueError(f"Truncated snapshot: {self.snapshot_path}")
+        magic, version, record_count, string_count, created_at, tag_length = struct.unpack_from(
+            HEADER_FORMAT, self.mmap, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"Not a catalog snapshot: {self.snapshot_path}")
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {version} (expected {SNAPSHOT_VERSION})")
+
+        self.version = version
+        self.record_count = record_count
+        self.created_at = created_at
+        self.source_tag = bytes(self.mmap[HEADER_SIZE:HEADER_SIZE + tag_length]).decode('utf-8')
+
+        position = HEADER_SIZE + tag_length
+        position += -position % 8
+
+        def take(length, typecode):
+            nonlocal position
+            if position + length > len(self.mmap):
+                raise ValueError(f"Truncated snapshot: {self.snapshot_path}")
+            section = view[position:position + length].cast(typecode)
+            position += length + (-length % 8)
+            return section
+
+        # Sections are views into the map; release the parent view even on
+        # error, or close() can't unmap the file
+        with memoryview(self.mmap) as view:
+            self.prices = {}
+            self.references = {}
+            for column in PRICE_COLUMNS:
+                self.prices[column] = take(8 * record_count, 'd')
+            for column in STRING_COLUMNS:
+                self.references[column] = take(4 * record_count, 'I')
+            self.string_offsets = take(4 * (string_count + 1), 'I')
+        self.string_blob_start = position
+        if position + self.string_offsets[string_count] > len(self.mmap):
+            raise ValueError(f"Truncated snapshot: {self.snapshot_path}")
+
+    def close(self):
+        """Release the memory map and file"""
+        for name in ('prices', 'references', 'string_offsets'):
+            sections = getattr(self, name, None)
+            if isinstance(sections, dict):
+                for section in sections.values():
+                    section.release()
+            elif sections is not None:
+                sections.release()
+        self.prices = self.references = self.string_offsets = None
+        if self.mmap is not None:
+            self.mmap.close()
+            self.mmap = None
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.record_count
+
+    def string(self, string_id):
+        """Decode an interned string by id"""
+        start = self.string_blob_start + self.string_offsets[string_id]
+        end = self.string_blob_start + self.string_offsets[string_id + 1]
+        return self.mmap[start:end].decode('utf-8')
+
+    def value(self, column, index):
+        """Return one field of one record (prices as float, None when missing)"""
+        if column in self.prices:
+            price = self.prices[column][index]
+            return None if math.isnan(price) else price
+        return self.string(self.references[column][index])
+
+    def column(self, column):
+        """Decode a whole string column"""
+        references = self.references[column]
+        return [self.string(references[i]) for i in range(self.record_count)]
+
+    def names(self):
+        """Card names of every record, in order"""
+        return self.column('name')
+
+    def __getitem__(self, index):
+        """
+        Decode one record as a card dict in the legacy JSON layout
+        (prices as strings, missing fields omitted).
+        """
+        if index < 0:
+            index += self.record_count
+        if not 0 <= index < self.record_count:
+            raise IndexError(index)
+
+        card = {}
+        for column in STRING_COLUMNS:
+            value = self.string(self.references[column][index])
+            if value:
+                card[column] = value
+        for column in PRICE_COLUMNS:
+            price = self.prices[column][index]
+            if not math.isnan(price):
+                card[column] = f"{price:.2f}"
+        return card
+
+    def __iter__(self):
+        for index in range(self.record_count):
+            yield self[index]
+
+    def is_stale(self, source_tag):
+        """True if the snapshot was generated from a different source state"""
+        return self.source_tag != source_tag
+
+
+def open_json_catalog(json_path, snapshot_path=None):
+    """
+    Open the snapshot for a JSON catalog, regenerating it first if it is
+    missing, stale or from another format version.
+    """
+    snapshot_path = snapshot_path or os.path.splitext(json_path)[0] + '.snapshot'
+    source_tag = json_source_tag(json_path)
+
+    if os.path.exists(snapshot_path):
+        try:
+            snapshot = CatalogSnapshot(snapshot_path)
+            if not snapshot.is_stale(source_tag):
+                return snapshot
+            snapshot.close()
+            print(f"Catalog snapshot {snapshot_path} is stale, regenerating...")
+        except ValueError as e:
+            print(f"Catalog snapshot {snapshot_path} unreadable ({e}), regenerating...")
+
+    snapshot_from_json(json_path, snapshot_path)
+    return CatalogSnapshot(snapshot_path)
@@ -8,6 +8,8 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 import difflib
+from mtgstocks_http import http_get
+from price_sources import headline_price
 
 def scrape_mtgstocks_sealed_prices():
     """
@@ -18,7 +20,7 @@ def scrape_mtgstocks_sealed_prices():
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
     }
-    response = requests.get(url, headers=headers)
+    response = http_get(url, headers=headers)
     if response.status_code != 200:
         print(f"Error: Received status code {response.status_code} from MTGStocks API.")
         print(f"Response text: {response.text[:500]}")
@@ -32,7 +34,7 @@ def scrape_mtgstocks_sealed_prices():
     for set_data in data:
         for product in set_data.get("products", []):
             name = f"{set_data['name']} {product['name']}".strip()
-            price = product.get("latestPrice", {}).get("average") or product.get("latestPrice", {}).get("market")
+            price = headline_price(product.get("latestPrice") or {})
             if price:
                 prices[name.lower()] = float(price)
     return prices
@@ -8,11 +8,22 @@ from datetime import datetime
 import uuid
 import winsound
 import time
+from card_name_index import TrigramNameMatcher, top_k_scored
+from sharded_name_scorer import ShardedNameScorer
+from catalog_snapshot import open_json_catalog
 
-# Initialize EasyOCR reader once
-print("Initializing EasyOCR reader...")
-reader = easyocr.Reader(['en'])
-print("EasyOCR reader initialized successfully!")
+# EasyOCR reader, initialized once on first use (not at import, so scoring
+# worker processes that re-import this module don't each load the model)
+reader = None
+
+def get_reader():
+    """Return the shared EasyOCR reader, initializing it on first use"""
+    global reader
+    if reader is None:
+        print("Initializing EasyOCR reader...")
+        reader = easyocr.Reader(['en'])
+        print("EasyOCR reader initialized successfully!")
+    return reader
 
 # Common Magic: The Gathering card names for reference/correction
 COMMON_CARD_NAMES = [
@@ -107,7 +118,7 @@ def find_text(frame, card_contour=None):
             for scale_factor in [2, 3, 4]:
                 scaled = cv2.resize(img, (0, 0), fx=scale_factor, fy=scale_factor, interpolation=cv2.INTER_CUBIC)
                 # result is a list of strings, e.g., ['Lightning', 'Bolt'] or ['Lightning Bolt']
-                result_fragments = reader.readtext(scaled, detail=0)
+                result_fragments = get_reader().readtext(scaled, detail=0)
                 if result_fragments:
                     all_results.extend(result_fragments)
 
@@ -181,20 +192,89 @@ def save_card_to_products(card_data: dict) -> bool:
         print(f"❌ Error saving to products.json: {str(e)}")
         return False
 
+# Catalog and name matcher caches, so repeated lookups don't reload or rescan the JSON
+_cards_data_cache = {}
+_name_matcher_cache = {}
+
+# How many distinct card names the trigram matcher hands to the detailed comparison
+MATCH_CANDIDATE_NAMES = 50
+# OCR output is noisy, so accept weaker trigram matches than the price lookups do
+MATCH_MIN_SIMILARITY = 0.2
+# Catalogs with at least this many distinct names are scored across CPU cores
+PARALLEL_SCORING_MIN_NAMES = 20000
+
+def normalize_match_name(name):
+    """Lowercase a card name and collapse whitespace for matching"""
+    return ' '.join(str(name).lower().split())
+
+def load_cards_data(json_path):
+    """
+    Open the card catalog through its binary snapshot (regenerated from the
+    JSON only when the JSON changes), reusing it while the file is unchanged.
+    """
+    mtime = os.path.getmtime(json_path)
+    if _cards_data_cache.get('key') != (json_path, mtime):
+        if _cards_data_cache.get('cards') is not None:
+            _cards_data_cache['cards'].close()
+        _cards_data_cache['cards'] = open_json_catalog(json_path)
+        _cards_data_cache['key'] = (json_path, mtime)
+    return _cards_data_cache['cards']
+
+def get_name_matcher(all_cards_data):
+    """Return a trigram matcher over the catalog names and a name -> catalog positions map"""
+    if _name_matcher_cache.get('cards') is not all_cards_data:
+        if hasattr(all_cards_data, 'names'):
+            card_names = all_cards_data.names()
+        else:
+            card_names = [card.get('name') for card in all_cards_data]
+        positions_by_name = {}
+        for position, card_name in enumerate(card_names):
+            if card_name:
+                positions_by_name.setdefault(normalize_match_name(card_name), []).append(position)
+        _name_matcher_cache['cards'] = all_cards_data
+        _name_matcher_cache['matcher'] = TrigramNameMatcher(positions_by_name)
+        _name_matcher_cache['positions_by_name'] = positions_by_name
+    return _name_matcher_cache['matcher'], _name_matcher_cache['positions_by_name']
+
+def find_candidate_cards(detected_name, all_cards_data):
+    """Return the cards whose names are close enough to be worth comparing in detail"""
+    matcher, positions_by_name = get_name_matcher(all_cards_data)
+    close_names = matcher.search(normalize_match_name(detected_name),
+                                 k=MATCH_CANDIDATE_NAMES, min_similarity=MATCH_MIN_SIMILARITY)
+    if not close_names:
+        # Nothing shares enough trigrams - fall back to comparing everything
+        scorer = get_sharded_scorer(positions_by_name)
+        if scorer is None:
+            return all_cards_data
+        close_names = scorer.top_matches(normalize_match_name(detected_name), k=MATCH_CANDIDATE_NAMES)
+    return [all_cards_data[position] for _, name in close_names for position in positions_by_name[name]]
+
+def get_sharded_scorer(positions_by_name):
+    """Return a multi-core scorer over the catalog names, or None for small catalogs"""
+    if len(positions_by_name) < PARALLEL_SCORING_MIN_NAMES or (os.cpu_count() or 1) < 2:
+        return None
+    if _name_matcher_cache.get('scorer_names') is not positions_by_name:
+        if _name_matcher_cache.get('scorer'):
+            _name_matcher_cache['scorer'].close()
+        _name_matcher_cache['scorer'] = ShardedNameScorer(positions_by_name, scorer='sequence')
+        _name_matcher_cache['scorer_names'] = positions_by_name
+    return _name_matcher_cache['scorer']
+
 def find_and_print_top_matches(detected_name, all_cards_data, top_n=6):
     """Finds and prints the top N card matches from the JSON data with user confirmation."""
     if not detected_name:
         return
 
-    matches = []
-    for card in all_cards_data:
-        card_name = card.get('name')
-        if card_name:
-            similarity = compare_strings(detected_name, card_name)
-            matches.append((similarity, card))
+    candidate_cards = find_candidate_cards(detected_name, all_cards_data)
+
+    def score_cards(cards):
+        for card in cards:
+            card_name = card.get('name')
+            if card_name:
+                yield (compare_strings(detected_name, card_name), card)
 
-    # Sort by similarity, descending
-    matches.sort(key=lambda x: x[0], reverse=True)
+    # Keep the top N by similarity, descending
+    matches = top_k_scored(score_cards(candidate_cards), top_n, exact_score=1.0)
 
     # Print top N matches
     print(f"\n{'='*60}")
@@ -228,11 +308,9 @@ def find_and_print_top_matches(detected_name, all_cards_data, top_n=6):
             # Filter by set name
             set_filter = input("Enter set name to filter by (e.g., 'Core Set 2021', 'Dominaria'): ").strip()
             if set_filter:
-                filtered_matches = []
-                for score, card in matches:
-                    card_set = card.get('set_name', '').lower()
-                    if set_filter.lower() in card_set:
-                        filtered_matches.append((score, card))
+                set_cards = [card for card in candidate_cards
+                             if set_filter.lower() in card.get('set_name', '').lower()]
+                filtered_matches = top_k_scored(score_cards(set_cards), top_n, exact_score=1.0)
                 
                 if filtered_matches:
                     print(f"\n{'='*60}")
@@ -838,8 +916,7 @@ def webcam_mode(cam_index=1):
     
     try:
         json_path = os.path.join(os.path.dirname(__file__), 'mtg_cards_data.json')
-        with open(json_path, 'r', encoding='utf-8') as f:
-            all_cards_data = json.load(f)
+        all_cards_data = load_cards_data(json_path)
     except FileNotFoundError:
         print(f"❌ Error: 'mtg_cards_data.json' not found in the script directory.")
         return
@@ -1307,7 +1384,7 @@ def main():
                     best_alpha_count = 0
                     for i, ocr_img in enumerate(ocr_images):
                         # Use EasyOCR with allowlist for A-Z, a-z, and space
-                        result_fragments = reader.readtext(ocr_img, detail=0, allowlist='abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ ')
+                        result_fragments = get_reader().readtext(ocr_img, detail=0, allowlist='abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ ')
                         for text in result_fragments:
                             clean_text = ''.join(c for c in text if c.isalpha() or c.isspace()).strip()
                             alpha_count = sum(1 for c in clean_text if c.isalpha())
@@ -1337,8 +1414,7 @@ def main():
                 print(f"✅ SUCCESS: Extracted card names: {', '.join([repr(n) for n in detected_names])}")
                 try:
                     json_path = os.path.join(os.path.dirname(__file__), 'mtg_cards_data.json')
-                    with open(json_path, 'r', encoding='utf-8') as f:
-                        all_cards_data = json.load(f)
+                    all_cards_data = load_cards_data(json_path)
                     for i, detected_name in enumerate(detected_names):
                         print(f"\n{'='*60}")
                         print(f"CARD {i+1}/{len(detected_names)}: '{detected_name}'")
@@ -0,0 +1,148 @@
+"""
+Record/replay of HTTP traffic at the requests transport level.
+
+RecordingAdapter sends requests to the network as usual and saves every
+response (status, headers, decoded body) to a fixture directory.
+ReplayAdapter answers from those fixtures without touching the network,
+after a configurable latency, so scrapers can be profiled and benchmarked
+offline and repeatably. Requests with no recorded response raise
+FixtureNotFound, a ConnectionError, so scrapers handle them like a
+network failure.
+
+Both are requests transport adapters. use_transport(adapter, sessions)
+mounts one on the given sessions (by default the shared mtgstocks_http
+client's) while the context is active; scraper-owned sessions such as
+MTGCardImageScraper.session are passed explicitly. Other sessions, and
+plain requests.get calls, are not affected.
+
+Fixture layout, per request:
+    <key>.json   {"method", "url", "status", "reason", "headers", "recorded_at"}
+    <key>.body   the decoded response body
+where key is the host and path made filename-safe plus a hash of the full URL.
+"""
+import contextlib
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.response import HTTPResponse
+
+# Headers that describe the wire encoding; bodies are stored decoded
+WIRE_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding'}
+
+
+class FixtureNotFound(requests.exceptions.ConnectionError):
+    pass
+
+
+def fixture_key(method, url):
+    """File name stem a request's recorded response is stored under"""
+    readable = re.sub(r'^https?://', '', url.split('?')[0])
+    readable = re.sub(r'[^A-Za-z0-9]+', '_', readable).strip('_')[:80]
+    digest = hashlib.sha1(f"{method.upper()} {url}".encode('utf-8')).hexdigest()[:12]
+    return f"{readable}_{digest}"
+
+
+class RecordingAdapter(HTTPAdapter):
+    def __init__(self, fixtures_dir, **kwargs):
+        """Transport that saves every response it receives to fixtures_dir"""
+        super().__init__(**kwargs)
+        self.fixtures_dir = fixtures_dir
+        self.recorded = 0
+        self.lock = threading.Lock()
+        os.makedirs(fixtures_dir, exist_ok=True)
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        if kwargs.get('stream'):
+            # Streamed bodies belong to the caller; don't read them here
+            return response
+        key = fixture_key(request.method, request.url)
+        meta = {
+            'method': request.method,
+            'url': request.url,
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': {name: value for name, value in response.headers.items()
+                        if name.lower() not in WIRE_HEADERS},
+            'recorded_at': time.time(),
+        }
+        with open(os.path.join(self.fixtures_dir, key + '.body'), 'wb') as f:
+            f.write(response.content)
+        with open(os.path.join(self.fixtures_dir, key + '.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        with self.lock:
+            self.recorded += 1
+        return response
+
+
+class ReplayAdapter(HTTPAdapter):
+    def __init__(self, fixtures_dir, latency=0.0, jitter=0.0):
+        """
+        Transport that serves recorded responses from fixtures_dir, each
+        after latency seconds (plus up to +/- jitter seconds).
+        """
+        super().__init__()
+        self.fixtures_dir = fixtures_dir
+        self.latency = latency
+        self.jitter = jitter
+        self.served = 0
+        self.missing = 0
+        self.lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        key = fixture_key(request.method, request.url)
+        try:
+            with open(os.path.join(self.fixtures_dir, key + '.json'), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(os.path.join(self.fixtures_dir, key + '.body'), 'rb') as f:
+                body = f.read()
+        except OSError:
+            with self.lock:
+                self.missing += 1
+            raise FixtureNotFound(f"No recorded response for {request.method} {request.url}", request=request)
+
+        delay = self.latency + (random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+        raw = HTTPResponse(
+            body=io.BytesIO(body),
+            headers=dict(meta['headers'], **{'Content-Length': str(len(body))}),
+            status=meta['status'],
+            reason=meta.get('reason'),
+            preload_content=False,
+            decode_content=False,
+        )
+        with self.lock:
+            self.served += 1
+        return self.build_response(request, raw)
+
+
+@contextlib.contextmanager
+def use_transport(adapter, sessions=None):
+    """
+    Mount adapter for http:// and https:// on sessions (default: the shared
+    mtgstocks_http client's session) while the context is active, then put
+    their previous adapters back
+    """
+    if sessions is None:
+        from mtgstocks_http import get_client
+        sessions = [get_client().session]
+    saved = [(session, session.adapters) for session in sessions]
+    for session in sessions:
+        session.adapters = session.adapters.copy()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+    try:
+        yield adapter
+    finally:
+        for session, adapters in saved:
+            session.adapters = adapters
@@ -1,23 +1,63 @@
 import json
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from urllib.parse import urljoin, urlparse
 import time
 import re
+from rate_limit import TokenBucket
+
+# Concurrent mode: cards processed at once, and the limits applied to each
+# host (card pages and image CDN are limited separately)
+DEFAULT_WORKERS = 8
+HOST_CONCURRENCY = 4
+HOST_REQUESTS_PER_SECOND = 2.0
 
 class MTGCardImageScraper:
-    def __init__(self, json_file_path, output_dir="card_images"):
+    def __init__(self, json_file_path, output_dir="card_images", pool_size=DEFAULT_WORKERS,
+                 host_concurrency=HOST_CONCURRENCY, host_requests_per_second=HOST_REQUESTS_PER_SECOND):
         self.json_file_path = json_file_path
         self.output_dir = output_dir
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        # Keep-alive connections for every worker thread
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        # Per-host concurrency cap and token bucket, created on first request to a host
+        self.host_concurrency = host_concurrency
+        self.host_requests_per_second = host_requests_per_second
+        self.host_limits = {}
+        self.host_limits_lock = threading.Lock()
         
         # Create output directory if it doesn't exist
         os.makedirs(output_dir, exist_ok=True)
     
+    def _host_limits(self, url):
+        """(semaphore, token bucket) limiting requests to url's host"""
+        host = urlparse(url).netloc
+        with self.host_limits_lock:
+            limits = self.host_limits.get(host)
+            if limits is None:
+                limits = (threading.BoundedSemaphore(self.host_concurrency),
+                          TokenBucket(self.host_requests_per_second))
+                self.host_limits[host] = limits
+        return limits
+    
+    def _get(self, url, timeout):
+        """GET through the pooled session, within the host's concurrency and rate caps"""
+        semaphore, bucket = self._host_limits(url)
+        with semaphore:
+            bucket.acquire()
+            return self.session.get(url, timeout=timeout)
+    
     def sanitize_filename(self, filename):
         """Remove or replace characters that aren't valid in filenames"""
         return re.sub(r'[<>:"/\\|?*]', '_', filename)
@@ -35,7 +75,7 @@ class MTGCardImageScraper:
     def get_image_url_from_page(self, card_url):
         """Extract the card image URL from the MTG Stocks page"""
         try:
-            response = self.session.get(card_url, timeout=10)
+            response = self._get(card_url, timeout=10)
             response.raise_for_status()
             
             soup = BeautifulSoup(response.content, 'html.parser')
@@ -127,7 +167,7 @@ class MTGCardImageScraper:
     def download_image(self, image_url, file_path):
         """Download an image from URL and save it to file_path"""
         try:
-            response = self.session.get(image_url, timeout=15)
+            response = self._get(image_url, timeout=15)
             response.raise_for_status()
             
             with open(file_path, 'wb') as file:
@@ -138,8 +178,66 @@ class MTGCardImageScraper:
             print(f"    ❌ Error downloading image from {image_url}: {e}")
             return False
     
-    def scrape_card_images(self, delay=1, save_frequency=10):
-        """Main method to scrape all card images"""
+    def image_file_path(self, card):
+        """Where a card's image is saved: <name>_<set>.jpg in the output directory"""
+        safe_card_name = self.sanitize_filename(card.get('name', 'Unknown'))
+        safe_set_name = self.sanitize_filename(card.get('set_name', 'Unknown_Set'))
+        return os.path.join(self.output_dir, f"{safe_card_name}_{safe_set_name}.jpg")
+    
+    def process_card(self, card):
+        """
+        Find and download one card's image. Returns (outcome, updates,
+        messages): outcome is 'downloaded', 'skipped', 'not_found' (no image
+        URL on the card page) or 'failed', updates the fields to set on the
+        card, messages the progress lines to print.
+        The card dict itself is not modified, so this can run in a worker thread.
+        """
+        card_name = card.get('name', 'Unknown')
+        card_url = card.get('card_url', '')
+        
+        if not card_url:
+            return 'failed', {}, [f"  ❌ No URL found for {card_name}"]
+        
+        # Skip if card already has image data
+        if card.get('image_path') and card.get('image_url'):
+            if os.path.exists(card.get('image_path')):
+                return 'skipped', {}, [f"  ⏭️  Image data already exists: {card_name}"]
+        
+        file_path = self.image_file_path(card)
+        filename = os.path.basename(file_path)
+        
+        # Skip if file already exists
+        if os.path.exists(file_path):
+            updates = {'image_path': file_path}
+            if not card.get('image_url'):
+                image_url = self.get_image_url_from_page(card_url)
+                if image_url:
+                    updates['image_url'] = image_url
+            return 'skipped', updates, [f"  ⏭️  Image file already exists, updating JSON: {filename}"]
+        
+        # Get image URL from the card page
+        messages = [f"  🔍 Searching for image at: {card_url}"]
+        image_url = self.get_image_url_from_page(card_url)
+        
+        if not image_url:
+            messages.append(f"  ❌ Could not find image URL for {card_name}")
+            return 'not_found', {}, messages
+        
+        messages.append(f"  📷 Found image URL: {image_url}")
+        
+        # Download the image
+        if self.download_image(image_url, file_path):
+            messages.append(f"  ✅ Downloaded: {filename}")
+            return 'downloaded', {'image_path': file_path, 'image_url': image_url}, messages
+        messages.append(f"  ❌ Failed to download image for {card_name}")
+        return 'failed', {}, messages
+    
+    def scrape_card_images(self, delay=1, save_frequency=10, workers=None):
+        """
+        Main method to scrape all card images. With workers, cards are
+        processed concurrently (see scrape_card_images_concurrent) and
+        delay is replaced by the per-host rate cap.
+        """
         cards_data = self.load_cards_data()
         total_cards = len(cards_data)
         
@@ -148,77 +246,120 @@ class MTGCardImageScraper:
         print(f"Target selector: mtg-print-image component")
         print("-" * 60)
         
-        for index, card in enumerate(cards_data, 1):
-            card_name = card.get('name', 'Unknown')
-            card_url = card.get('card_url', '')
-            set_name = card.get('set_name', 'Unknown_Set')
-            
-            print(f"[{index}/{total_cards}] Processing: {card_name}")
-            
-            if not card_url:
-                print(f"  ❌ No URL found for {card_name}")
-                continue
-            
-            # Skip if card already has image data
-            if card.get('image_path') and card.get('image_url'):
-                if os.path.exists(card.get('image_path')):
-                    print(f"  ⏭️  Image data already exists: {card_name}")
+        if workers:
+            self.scrape_card_images_concurrent(cards_data, workers, save_frequency)
+        else:
+            for index, card in enumerate(cards_data, 1):
+                print(f"[{index}/{total_cards}] Processing: {card.get('name', 'Unknown')}")
+                outcome, updates, messages = self.process_card(card)
+                card.update(updates)
+                for message in messages:
+                    print(message)
+                # Only cards that went on to download count towards the save and the delay
+                if outcome in ('skipped', 'not_found') or not card.get('card_url'):
                     continue
-            
-            # Create filename
-            safe_card_name = self.sanitize_filename(card_name)
-            safe_set_name = self.sanitize_filename(set_name)
-            filename = f"{safe_card_name}_{safe_set_name}.jpg"
-            file_path = os.path.join(self.output_dir, filename)
-            
-            # Skip if file already exists
-            if os.path.exists(file_path):
-                print(f"  ⏭️  Image file already exists, updating JSON: {filename}")
-                card['image_path'] = file_path
-                if not card.get('image_url'):
-                    image_url = self.get_image_url_from_page(card_url)
-                    if image_url:
-                        card['image_url'] = image_url
-                continue
-            
-            # Get image URL from the card page
-            print(f"  🔍 Searching for image at: {card_url}")
-            image_url = self.get_image_url_from_page(card_url)
-            
-            if not image_url:
-                print(f"  ❌ Could not find image URL for {card_name}")
-                continue
-            
-            print(f"  📷 Found image URL: {image_url}")
-            
-            # Download the image
-            if self.download_image(image_url, file_path):
-                print(f"  ✅ Downloaded: {filename}")
-                # Update the card data with image information
-                card['image_path'] = file_path
-                card['image_url'] = image_url
-            else:
-                print(f"  ❌ Failed to download image for {card_name}")
-            
-            # Save progress periodically to avoid losing data
-            if index % save_frequency == 0:
-                self.save_cards_data(cards_data)
-                print(f"  💾 Progress saved (processed {index}/{total_cards} cards)")
-            
-            # Be respectful to the server
-            time.sleep(delay)
+                
+                # Save progress periodically to avoid losing data
+                if index % save_frequency == 0:
+                    self.save_cards_data(cards_data)
+                    print(f"  💾 Progress saved (processed {index}/{total_cards} cards)")
+                
+                # Be respectful to the server
+                time.sleep(delay)
         
         # Final save of the updated JSON
         self.save_cards_data(cards_data)
         print(f"\n🎉 Scraping completed! Images saved to '{self.output_dir}' directory")
         print(f"📄 Original JSON file updated: {self.json_file_path}")
+    
+    def scrape_card_images_concurrent(self, cards_data, workers=DEFAULT_WORKERS, save_frequency=10):
+        """
+        Process cards on a bounded pool of worker threads sharing the pooled
+        session. Requests stay within the per-host concurrency and rate caps.
+        Cards that save to the same file (same name and set) are never in
+        flight together: later ones wait for the first, then find its file.
+        Results are applied to cards_data and reported in card order, and
+        progress is saved every save_frequency completed cards. Returns
+        {outcome: count}.
+        """
+        total_cards = len(cards_data)
+        counts = {'downloaded': 0, 'skipped': 0, 'not_found': 0, 'failed': 0}
+        completed = {}  # index -> (outcome, messages), waiting for earlier cards to be reported
+        next_to_report = 0
+        completed_since_save = 0
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            in_flight = {}  # future -> (index, file path)
+            in_flight_paths = set()
+            waiting = {}  # file path -> [(index, card)] waiting for the card in flight with that path
+            pending_cards = iter(enumerate(cards_data))
+            
+            def submit(index, card, file_path):
+                in_flight[executor.submit(self.process_card, card)] = (index, file_path)
+                in_flight_paths.add(file_path)
+            
+            while True:
+                # Keep at most two cards per worker queued, not the whole catalog
+                for index, card in pending_cards:
+                    file_path = self.image_file_path(card)
+                    if file_path in in_flight_paths:
+                        waiting.setdefault(file_path, []).append((index, card))
+                        continue
+                    submit(index, card, file_path)
+                    if len(in_flight) >= workers * 2:
+                        break
+                if not in_flight:
+                    break
+                
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, file_path = in_flight.pop(future)
+                    in_flight_paths.discard(file_path)
+                    if waiting.get(file_path):
+                        next_index, next_card = waiting[file_path].pop(0)
+                        # Now it finds the file the finished card saved, as it would in a sequential run
+                        submit(next_index, next_card, file_path)
+                    try:
+                        outcome, updates, messages = future.result()
+                    except Exception as e:
+                        outcome, updates, messages = 'failed', {}, [f"  ❌ Error processing card: {e}"]
+                    cards_data[index].update(updates)
+                    counts[outcome] += 1
+                    completed[index] = (outcome, messages)
+                    completed_since_save += 1
+                
+                # Report finished cards in catalog order
+                while next_to_report in completed:
+                    outcome, messages = completed.pop(next_to_report)
+                    print(f"[{next_to_report + 1}/{total_cards}] Processed: "
+                          f"{cards_data[next_to_report].get('name', 'Unknown')} ({outcome})")
+                    for message in messages:
+                        print(message)
+                    next_to_report += 1
+                
+                # Save progress every save_frequency completed cards
+                if completed_since_save >= save_frequency:
+                    self.save_cards_data(cards_data)
+                    completed_since_save = 0
+                    done_count = sum(counts.values())
+                    print(f"  💾 Progress saved ({done_count}/{total_cards} cards done: "
+                          f"{counts['downloaded']} downloaded, {counts['skipped']} skipped, "
+                          f"{counts['not_found']} without an image, {counts['failed']} failed)")
+        
+        return counts
 
 def main():
     # Initialize the scraper
     scraper = MTGCardImageScraper('mtg_cards_data.json', 'card_images')
     
-    # Start scraping (with 1 second delay between requests, save every 10 cards)
-    scraper.scrape_card_images(delay=1, save_frequency=10)
+    # Start scraping (with 1 second delay between requests, save every 10 cards);
+    # --workers N processes N cards at once within the per-host rate caps
+    workers = None
+    if '--workers' in sys.argv:
+        position = sys.argv.index('--workers')
+        value = sys.argv[position + 1] if position + 1 < len(sys.argv) else ''
+        workers = int(value) if value.isdigit() else DEFAULT_WORKERS
+    scraper.scrape_card_images(delay=1, save_frequency=10, workers=workers)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -6,7 +6,7 @@ import os
 from datetime import datetime
 import traceback
 import re
-from mtgstocksPriceDatabasescraper import get_card_price
+from mtgstocksPriceDatabasescraper import get_card_price, get_catalog_report_text
 from gemmacardidentifier import identify_card_from_image
 from trendnewscollector import MTGWebSearchAgent
 from cost_to_value_search import cost_to_value_search
@@ -216,6 +216,11 @@ FUNCTION_REGISTRY = [
         "func": lambda: print(get_card_price(input("Enter the card name to look up price: ").strip())),
         "keywords": ["card price", "mtg price", "how much is", "value of", "price of"]
     },
+    {
+        "name": "Catalog Price Report",
+        "func": lambda: print(get_catalog_report_text()),
+        "keywords": ["catalog", "price report", "top movers", "price movers", "most valuable sets", "price distribution"]
+    },
     {
         "name": "Card Image Identification",
         "func": lambda: print(identify_card_from_image(input("Enter the image file path (jpg/png): ").strip())),
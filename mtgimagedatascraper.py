@@ -12,6 +12,7 @@ import os
 import hashlib
 from PIL import Image
 import io
+from mtgstocks_http import http_get, retry_delay
 
 def get_all_mtgstocks_set_urls():
     """
@@ -24,7 +25,7 @@ def get_all_mtgstocks_set_urls():
 
     print(f"Fetching: {sets_listing_url}")
     try:
-        response = requests.get(sets_listing_url)
+        response = http_get(sets_listing_url)
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
         print(f"Error fetching the sets listing page: {e}")
@@ -78,11 +79,8 @@ def download_image(image_url, save_path, max_retries=3):
     
     for attempt in range(max_retries):
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            
-            response = requests.get(image_url, headers=headers, timeout=30)
+            # Retries are counted by this loop, not by the client
+            response = http_get(image_url, retries=0, timeout=30)
             response.raise_for_status()
             
             # Verify it's actually an image
@@ -106,7 +104,7 @@ def download_image(image_url, save_path, max_retries=3):
         except requests.exceptions.RequestException as e:
             print(f"    Attempt {attempt + 1} failed to download {image_url}: {e}")
             if attempt < max_retries - 1:
-                time.sleep(2)  # Wait before retry
+                time.sleep(retry_delay(attempt))  # Wait before retry
             
         except Exception as e:
             print(f"    Error saving image {image_url}: {e}")
@@ -393,7 +391,7 @@ def scrape_set_page(set_url, set_info, max_pages=None, download_images=True, ima
     while current_url:
         print(f"Processing page {page_num}...")
         try:
-            response = requests.get(current_url)
+            response = http_get(current_url)
             response.raise_for_status()
         except Exception as e:
             print(f"Failed to fetch {current_url}: {e}")
@@ -1,14 +1,140 @@
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 import re
 import time
+import asyncio
 import json
 from urllib.parse import urljoin, urlparse, parse_qs
 import chromadb
 from chromadb.config import Settings
-import uuid
 from datetime import datetime
 import os
+import sys
+import hashlib
+import threading
+import queue
+import numpy as np
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from card_name_index import CardNameIndex, calculate_name_similarity, top_k_scored
+from price_history import PriceHistoryStore
+from card_prices import PRICE_FIELDS
+from card_embeddings import HashedNgramEmbeddingFunction
+from sharded_name_scorer import ShardedNameScorer
+from catalog_snapshot import snapshot_from_collection, collection_source_tag, WRITE_VERSION_KEY
+from rate_limit import TokenBucket, AdaptiveBackoff, parse_retry_after
+from mtgstocks_http import http_get, get_client, print_http_stats
+from page_cache import PageCache
+from card_data_log import CardDataLog, compact_to_json, import_legacy_json
+from price_sources import JSONAPIPriceSource, HTMLPriceSource, FallbackPriceSource
+from refresh_scheduler import RefreshScheduler
+from scrape_journal import ScrapeJournal
+from catalog_analytics import (arrays_from_cards, arrays_from_collection, coverage, distribution,
+                               group_stats, catalog_report, format_report)
+from price_change_feed import PriceChangeFeed, FEED_PRICE_FIELD, read_new_changes
+
+# Change feed written next to the database on every ingest (see price_change_feed)
+PRICE_CHANGE_FEED_FILE = 'price_changes.jsonl'
+
+# Ingest modes: 'semantic' runs Chroma's embedding model over every card document,
+# 'fast' stores cheap hashed n-gram embeddings to be backfilled later
+INGEST_MODES = ('semantic', 'fast')
+
+# Price shown for a card in search listings: the first of these it has,
+# then any other PRICE_FIELDS
+LISTING_PRICE_ORDER = ['market_price', 'price', 'average_price']
+LISTING_PRICE_FIELDS = LISTING_PRICE_ORDER + [field for field in PRICE_FIELDS if field not in LISTING_PRICE_ORDER]
+
+# Ids written before stable card ids: <set id>_<normalized name>_<8 random hex digits>
+LEGACY_CARD_ID_RE = re.compile(r'_[0-9a-f]{8}$')
+# Collection metadata flag set once no legacy-id rows are left
+LEGACY_IDS_CLEARED_KEY = 'legacy_ids_cleared'
+
+# Politeness budget shared by every request to mtgstocks.com: average
+# requests per second and burst size of one token bucket
+MTGSTOCKS_REQUESTS_PER_SECOND = 0.5
+MTGSTOCKS_BURST = 2
+# Sets scraped at once by the async engine
+DEFAULT_SETS_IN_FLIGHT = 4
+# Set page parsing: only the card table and the pagination items are
+# needed, so the lean path parses just those elements
+SET_PAGE_STRAINER = SoupStrainer(['table', 'li'])
+LEAN_HTML_PARSER = os.environ.get('MTGSTOCKS_HTML_PARSER', 'html.parser')
+# Print the full pagination structure of every page (slow, noisy)
+DEBUG_PAGINATION = os.environ.get('MTGSTOCKS_DEBUG_PAGINATION') == '1'
+
+# Patterns used on every scraped row, compiled once
+PRICE_PATTERNS = [
+    re.compile(r'\$(\d+(?:,\d{3})*(?:\.\d{2})?)'),  # $1.23, $1,234.56
+    re.compile(r'(\d+(?:,\d{3})*\.\d{2})'),        # 1.23, 1,234.56 (with decimals)
+    re.compile(r'(\d+(?:,\d{3})+)'),               # 1,234 (with commas)
+]
+DOLLAR_PRICE_RE = PRICE_PATTERNS[0]
+LEADING_PRICE_RE = re.compile(r'^\$?[\d,]+\.?\d*')
+PAGE_PARAM_RE = re.compile(r'page=\d+')
+CARD_CONTAINER_CLASS_RE = re.compile(r'card|row')
+CARD_NAME_CLASS_RE = re.compile(r'card|name')
+PRINT_HREF_RE = re.compile(r'/prints/')
+RARITY_INDICATORS = ['common', 'uncommon', 'rare', 'mythic', 'C', 'U', 'R', 'M']
+RARITY_MATCHES = [(rarity.lower(), rarity.title()) for rarity in RARITY_INDICATORS]
+
+# Pages of one set fetched at once when prefetching (still within the rate limit)
+PREFETCH_WORKERS = 4
+
+# Where card prices come from: rendered set pages, the JSON API, or the
+# API with the HTML pages as fallback
+PRICE_SOURCES = ('html', 'api', 'auto')
+
+# Responses that mean "slow down" rather than "this page is broken"
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Conditional-request cache of set pages and the cards parsed from them
+SET_PAGE_CACHE_DIR = './http_cache'
+set_page_cache = PageCache(SET_PAGE_CACHE_DIR)
+
+mtgstocks_rate_limiter = TokenBucket(MTGSTOCKS_REQUESTS_PER_SECOND, MTGSTOCKS_BURST)
+mtgstocks_backoff = AdaptiveBackoff(mtgstocks_rate_limiter)
+
+def configure_mtgstocks_rate_limit(requests_per_second, burst=None):
+    """Change the shared mtgstocks.com politeness budget"""
+    mtgstocks_rate_limiter.set_rate(requests_per_second)
+    mtgstocks_rate_limiter.capacity = float(burst if burst is not None else max(1.0, requests_per_second))
+    mtgstocks_backoff.max_rate = float(requests_per_second)
+    mtgstocks_backoff.min_rate = mtgstocks_backoff.max_rate / 16
+
+def fetch_page(url, headers=None, max_attempts=5):
+    """
+    Fetch a page within the shared mtgstocks.com rate limit. 429/5xx
+    responses and connection errors back off and retry. Returns the
+    response, or None if it could not be fetched.
+    """
+    for attempt in range(1, max_attempts + 1):
+        mtgstocks_backoff.wait()
+        mtgstocks_rate_limiter.acquire()
+        try:
+            # Retries go through the adaptive backoff, so the client must not retry
+            response = http_get(url, retries=0, headers=headers)
+        except requests.exceptions.RequestException as e:
+            delay = mtgstocks_backoff.failure()
+            print(f"    Error fetching {url}: {e} (attempt {attempt}/{max_attempts}, backing off {delay:.1f}s)")
+            continue
+
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            delay = mtgstocks_backoff.failure(parse_retry_after(response))
+            print(f"    HTTP {response.status_code} for {url} (attempt {attempt}/{max_attempts}, backing off {delay:.1f}s)")
+            continue
+
+        try:
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching page {url}: {e}")
+            return None
+
+        mtgstocks_backoff.success()
+        return response
+
+    print(f"Giving up on {url} after {max_attempts} attempts")
+    return None
 
 def get_all_mtgstocks_set_urls():
     """
@@ -20,11 +146,9 @@ def get_all_mtgstocks_set_urls():
     set_data = []
 
     print(f"Fetching: {sets_listing_url}")
-    try:
-        response = requests.get(sets_listing_url)
-        response.raise_for_status()
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching the sets listing page: {e}")
+    response = fetch_page(sets_listing_url)
+    if response is None:
+        print("Error fetching the sets listing page")
         return []
 
     soup = BeautifulSoup(response.text, 'html.parser')
@@ -104,15 +228,17 @@ def debug_pagination_structure(soup):
         for indicator in total_indicators[:5]:
             print(f"  '{indicator.strip()}'")
 
-def find_next_page_url(soup, current_url):
+def find_next_page_url(soup, current_url, debug=None):
     """
     Find the URL for the next page of results.
     Enhanced to better handle MTGStocks pagination structure.
+    Pass debug=True (or set MTGSTOCKS_DEBUG_PAGINATION=1) to dump the pagination structure.
     """
     base_url = "https://www.mtgstocks.com"
     
     # Debug the pagination structure
-    debug_pagination_structure(soup)
+    if DEBUG_PAGINATION if debug is None else debug:
+        debug_pagination_structure(soup)
     
     # First, try to find the current page number
     current_page = 1
@@ -186,7 +312,7 @@ def find_next_page_url(soup, current_url):
                     if next_page <= max_page:
                         # Construct next page URL
                         if 'page=' in current_url:
-                            next_url = re.sub(r'page=\d+', f'page={next_page}', current_url)
+                            next_url = PAGE_PARAM_RE.sub(f'page={next_page}', current_url)
                         else:
                             separator = '&' if '?' in current_url else '?'
                             next_url = f"{current_url}{separator}page={next_page}"
@@ -217,7 +343,7 @@ def find_next_page_url(soup, current_url):
         
         # Construct URL manually
         if 'page=' in current_url:
-            next_url = re.sub(r'page=\d+', f'page={next_page}', current_url)
+            next_url = PAGE_PARAM_RE.sub(f'page={next_page}', current_url)
         else:
             separator = '&' if '?' in current_url else '?'
             next_url = f"{current_url}{separator}page={next_page}"
@@ -228,15 +354,45 @@ def find_next_page_url(soup, current_url):
     print(f"    No next page available")
     return None
 
-def scrape_set_page(set_url, set_info, max_pages=None):
+def fetch_set_page(url, set_info, parse=None, fetch_stats=None):
+    """
+    Fetch and parse one set page within the shared rate limit. Returns
+    (cards, next page URL, page count), or None if the page couldn't be fetched.
+    """
+    cache_entry = set_page_cache.get(url)
+    fetch_start = time.monotonic()
+    response = fetch_page(url, headers=set_page_cache.conditional_headers(cache_entry))
+    if response is None:
+        return None
+    if fetch_stats:
+        fetch_stats.record(1, time.monotonic() - fetch_start)
+
+    # Extract cards from the page (reused from the cache if the page is unchanged)
+    return resolve_set_page(url, response, cache_entry, set_info, parse)
+
+def scrape_set_page(set_url, set_info, max_pages=None, parse=None, fetch_stats=None, prefetch=False,
+                    start_page=1, on_page=None, on_error=None):
     """
     Scrapes a specific MTG set page to extract card information.
     Now handles pagination to get all cards from all pages.
+    parse(html, set_info, url) replaces parse_set_page (e.g. to run it in a
+    process pool); fetch_stats, a StageStats, counts fetched pages.
+
+    To resume a set, pass the URL of the page to continue from as set_url
+    and its page number as start_page. on_page(page number, url, cards,
+    next url) is called for every page with cards, in page order; if it
+    returns False the scrape of the set stops there. on_error(page number,
+    url) is called if a page can't be fetched.
+
+    With prefetch, the page count is read from page 1's pagination widget
+    and pages 2..N are fetched concurrently; following next links remains
+    the fallback when there is no count, and continues past page N if the
+    widget only showed part of the range.
     """
     print(f"\nScraping set page: {set_url}")
     all_cards_data = []
     current_url = set_url
-    page_count = 0
+    page_count = start_page - 1
     visited_urls = set()  # Prevent infinite loops
     
     while current_url and (max_pages is None or page_count < max_pages):
@@ -249,34 +405,51 @@ def scrape_set_page(set_url, set_info, max_pages=None):
         page_count += 1
         print(f"  Scraping page {page_count}: {current_url}")
         
-        try:
-            response = requests.get(current_url)
-            response.raise_for_status()
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching page {current_url}: {e}")
+        page = fetch_set_page(current_url, set_info, parse, fetch_stats)
+        if page is None:
+            if on_error:
+                on_error(page_count, current_url)
             break
-
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Extract cards from current page
-        page_cards = extract_cards_from_page(soup, set_info)
+        page_cards, next_url, page_total = page
         
         if page_cards:
             all_cards_data.extend(page_cards)
             print(f"    Found {len(page_cards)} cards on page {page_count}")
+            if on_page and on_page(page_count, current_url, page_cards, next_url) is False:
+                break
         else:
             print(f"    No cards found on page {page_count}")
             # If no cards found, might be end of pagination
             break
         
-        # Look for next page
-        next_url = find_next_page_url(soup, current_url)
+        if prefetch and page_count == start_page and next_url and page_total and page_total > page_count + 1:
+            last_page = page_total if max_pages is None else min(page_total, max_pages)
+            page_urls = [set_page_url(current_url, number) for number in range(page_count + 1, last_page + 1)]
+            print(f"    Prefetching pages {page_count + 1}-{last_page} of {page_total}")
+            with ThreadPoolExecutor(max_workers=PREFETCH_WORKERS) as executor:
+                pages = list(executor.map(lambda url: fetch_set_page(url, set_info, parse, fetch_stats), page_urls))
+
+            # Reassemble in page order, stopping where a sequential walk would have stopped
+            for url, page in zip(page_urls, pages):
+                visited_urls.add(url)
+                page_count += 1
+                if page is None or not page[0]:
+                    if page is None and on_error:
+                        on_error(page_count, url)
+                    elif page is not None:
+                        print(f"    No cards found on page {page_count}")
+                    next_url = None
+                    break
+                page_cards, next_url, _ = page
+                all_cards_data.extend(page_cards)
+                print(f"    Found {len(page_cards)} cards on page {page_count}")
+                if on_page and on_page(page_count, url, page_cards, next_url) is False:
+                    next_url = None
+                    break
         
         if next_url and next_url != current_url:
             current_url = next_url
             print(f"    Next page found, continuing...")
-            # Be polite to the server between pages
-            time.sleep(2)
         else:
             print(f"    No more pages found, stopping pagination")
             break
@@ -284,6 +457,493 @@ def scrape_set_page(set_url, set_info, max_pages=None):
     print(f"Successfully extracted {len(all_cards_data)} cards from {page_count} pages of {set_info['set_name']}")
     return all_cards_data
 
+async def fetch_page_async(url, headers=None, max_attempts=5):
+    """
+    Fetch a page without blocking the event loop, within the shared
+    mtgstocks.com rate limit. 429/5xx responses and connection errors back
+    off and retry. Returns the response, or None if it could not be fetched.
+    """
+    for attempt in range(1, max_attempts + 1):
+        await mtgstocks_backoff.wait_async()
+        await mtgstocks_rate_limiter.acquire_async()
+        try:
+            # The engine runs its own adaptive backoff, so the client must not retry
+            response = await asyncio.to_thread(http_get, url, retries=0, headers=headers)
+        except requests.exceptions.RequestException as e:
+            delay = mtgstocks_backoff.failure()
+            print(f"    Error fetching {url}: {e} (attempt {attempt}/{max_attempts}, backing off {delay:.1f}s)")
+            continue
+
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            delay = mtgstocks_backoff.failure(parse_retry_after(response))
+            print(f"    HTTP {response.status_code} for {url} (attempt {attempt}/{max_attempts}, backing off {delay:.1f}s)")
+            continue
+
+        try:
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching page {url}: {e}")
+            return None
+
+        mtgstocks_backoff.success()
+        return response
+
+    print(f"Giving up on {url} after {max_attempts} attempts")
+    return None
+
+def parse_set_soup(html, lean=True, parser=None):
+    """
+    Parse a set page. The lean parse keeps only tables and list items (the
+    card table and pagination); pages without a table are parsed in full
+    for the div-based fallback, as is everything when debugging pagination.
+    """
+    if lean and not DEBUG_PAGINATION:
+        soup = BeautifulSoup(html, parser or LEAN_HTML_PARSER, parse_only=SET_PAGE_STRAINER)
+        if soup.find('table') is not None:
+            return soup
+    return BeautifulSoup(html, 'html.parser')
+
+def find_page_count(soup):
+    """Highest page number shown in the pagination widget, or None if there is none"""
+    page_numbers = []
+    for item in soup.find_all('li', class_='page-item'):
+        element = item.find('button', class_='page-link') or item.find('a', class_='page-link')
+        if element:
+            text = element.get_text(strip=True)
+            if text.isdigit():
+                page_numbers.append(int(text))
+    return max(page_numbers) if page_numbers else None
+
+def set_page_url(set_url, page):
+    """URL of a given page of a set, built the same way find_next_page_url builds it"""
+    if 'page=' in set_url:
+        return PAGE_PARAM_RE.sub(f'page={page}', set_url)
+    separator = '&' if '?' in set_url else '?'
+    return f"{set_url}{separator}page={page}"
+
+def parse_set_page(html, set_info, current_url, lean=True, parser=None):
+    """
+    Parse one set page; returns (cards on the page, next page URL or None,
+    page count shown in the pagination widget or None).
+    """
+    soup = parse_set_soup(html, lean, parser)
+    page_cards = extract_cards_from_page(soup, set_info)
+    next_url = find_next_page_url(soup, current_url) if page_cards else None
+    return page_cards, next_url, find_page_count(soup)
+
+def benchmark_page_parsing(pages_dir=SET_PAGE_CACHE_DIR, repeat=3):
+    """
+    Time the full and lean set page parses over saved pages (*.html, or the
+    *.html.gz bodies kept by the page cache) and check they agree.
+    Returns {mode: average ms per page}.
+    """
+    import glob
+    import gzip
+    import contextlib
+    import io
+
+    paths = sorted(glob.glob(os.path.join(pages_dir, '**', '*.html'), recursive=True)
+                   + glob.glob(os.path.join(pages_dir, '**', '*.html.gz'), recursive=True))
+    if not paths:
+        print(f"No saved pages found in {pages_dir}")
+        return {}
+
+    pages = []
+    for path in paths:
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rb') as f:
+            pages.append(f.read().decode('utf-8', errors='replace'))
+
+    set_info = {'set_id': '0', 'set_name': 'Benchmark'}
+    page_url = "https://www.mtgstocks.com/sets/0-benchmark"
+    # mode -> (lean, parser)
+    modes = {'full': (False, None), 'lean': (True, 'html.parser')}
+    try:
+        import lxml  # noqa: F401
+        modes['lean-lxml'] = (True, 'lxml')
+    except ImportError:
+        pass
+
+    timings = {}
+    results = {}
+    for mode, (lean, parser) in modes.items():
+        start = time.perf_counter()
+        # The extractors print progress for every page; keep it out of the timing output
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(repeat):
+                results[mode] = [parse_set_page(html, set_info, page_url, lean, parser) for html in pages]
+        timings[mode] = (time.perf_counter() - start) * 1000 / (repeat * len(pages))
+
+    print(f"\n=== PARSE BENCHMARK ({len(pages)} pages x {repeat}) ===")
+    for mode, ms in timings.items():
+        mismatches = sum(1 for full, other in zip(results['full'], results[mode]) if full != other)
+        print(f"  {mode:<10} {ms:8.2f} ms/page  {timings['full'] / ms:4.1f}x  "
+              f"{mismatches} pages differ from full parse")
+    return timings
+
+def resolve_set_page(url, response, cache_entry, set_info, parse_page=None):
+    """
+    Return (cards, next page URL, page count) for a fetched set page. Pages answered
+    with 304, or whose HTML hashes the same as the cached copy, reuse the
+    cached parse instead of running extract_cards_from_page again.
+    """
+    parse_page = parse_page or parse_set_page
+    parsed = []
+
+    def parse(html):
+        parsed.append(url)
+        return list(parse_page(html, set_info, url))
+
+    result = set_page_cache.resolve(url, response, cache_entry, parse)
+    if result is None:
+        return [], None, None
+    page_cards, next_url, page_total = result
+    if not parsed:
+        print(f"    Page unchanged since last scrape, reusing {len(page_cards)} cached cards")
+    return page_cards, next_url, page_total
+
+async def scrape_set_page_async(set_url, set_info, max_pages=None):
+    """
+    Async version of scrape_set_page: follows the set's pagination with
+    requests paced by the shared rate limiter instead of fixed sleeps.
+    """
+    print(f"\nScraping set page: {set_url}")
+    all_cards_data = []
+    current_url = set_url
+    page_count = 0
+    visited_urls = set()
+
+    while current_url and (max_pages is None or page_count < max_pages):
+        if current_url in visited_urls:
+            print(f"  Already visited {current_url}, stopping to prevent loop")
+            break
+
+        visited_urls.add(current_url)
+        page_count += 1
+        print(f"  [{set_info['set_name']}] Scraping page {page_count}: {current_url}")
+
+        cache_entry = set_page_cache.get(current_url)
+        response = await fetch_page_async(current_url, set_page_cache.conditional_headers(cache_entry))
+        if response is None:
+            break
+
+        # Parsing is CPU work; keep it off the event loop so other sets keep fetching
+        page_cards, next_url, _ = await asyncio.to_thread(resolve_set_page, current_url, response, cache_entry, set_info)
+
+        if not page_cards:
+            print(f"    No cards found on page {page_count} of {set_info['set_name']}")
+            break
+        all_cards_data.extend(page_cards)
+        print(f"    Found {len(page_cards)} cards on page {page_count} of {set_info['set_name']}")
+
+        if next_url and next_url != current_url:
+            current_url = next_url
+        else:
+            break
+
+    print(f"Successfully extracted {len(all_cards_data)} cards from {page_count} pages of {set_info['set_name']}")
+    return all_cards_data
+
+async def scrape_sets_async(sets_info, on_set_scraped=None, sets_in_flight=DEFAULT_SETS_IN_FLIGHT, max_pages=None):
+    """
+    Scrape several sets concurrently, keeping up to sets_in_flight sets in
+    progress. Overall request rate is bounded by the shared token bucket.
+
+    on_set_scraped(set_info, cards_data) is called once per finished set,
+    in a worker thread, one set at a time. Returns {set_id: card count}.
+    """
+    pending = asyncio.Queue()
+    for set_info in sets_info:
+        pending.put_nowait(set_info)
+    store_lock = asyncio.Lock()
+    card_counts = {}
+
+    async def worker():
+        while True:
+            try:
+                set_info = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            cards_data = await scrape_set_page_async(set_info['full_url'], set_info, max_pages)
+            card_counts[set_info['set_id']] = len(cards_data)
+            if on_set_scraped:
+                async with store_lock:
+                    await asyncio.to_thread(on_set_scraped, set_info, cards_data)
+
+    workers = max(1, min(sets_in_flight, len(sets_info)))
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    return card_counts
+
+def fetch_mtgstocks_json(url):
+    """GET a JSON API response within the shared mtgstocks rate limit and backoff"""
+    response = fetch_page(url, headers={'Accept': 'application/json'})
+    if response is None:
+        raise requests.exceptions.RequestException(f"Could not fetch {url}")
+    return response.json()
+
+def get_price_source(name='html', fetch_json=None, prefetch=False):
+    """
+    Build a price source by name (see PRICE_SOURCES). fetch_json overrides
+    how the API source fetches (default: fetch_mtgstocks_json).
+    """
+    html_source = HTMLPriceSource(lambda set_url, set_info: scrape_set_page(set_url, set_info, prefetch=prefetch))
+    if name == 'html':
+        return html_source
+    api_source = JSONAPIPriceSource(fetch_json or fetch_mtgstocks_json)
+    if name == 'api':
+        return api_source
+    if name == 'auto':
+        return FallbackPriceSource(api_source, html_source)
+    raise ValueError(f"Unknown price source: {name}")
+
+class StageStats:
+    def __init__(self, name, unit, workers=1):
+        """Throughput counters for one pipeline stage"""
+        self.name = name
+        self.unit = unit
+        self.workers = workers
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, items, seconds):
+        with self.lock:
+            self.items += items
+            self.busy_seconds += seconds
+
+    def report(self, elapsed):
+        """One line: items, rate while busy, and how busy the stage's workers were"""
+        rate = self.items / self.busy_seconds if self.busy_seconds else 0.0
+        utilisation = self.busy_seconds / (elapsed * self.workers) if elapsed else 0.0
+        print(f"  {self.name:<6} {self.items:>7} {self.unit:<6} {rate:9.1f} {self.unit}/s per worker "
+              f"x{self.workers}, {utilisation:6.1%} busy")
+
+def timed_parse_set_page(html, set_info, current_url):
+    """parse_set_page plus the seconds it took, for running in a parse pool"""
+    start = time.perf_counter()
+    result = parse_set_page(html, set_info, current_url)
+    return result, time.perf_counter() - start
+
+def run_scrape_pipeline(sets_info, on_batch, fetch_workers=DEFAULT_SETS_IN_FLIGHT, parse_workers=None,
+                        write_batch_cards=2000, queue_size=8, max_pages=None, prefetch=False):
+    """
+    Scrape sets through a staged pipeline:
+
+    fetch   fetch_workers threads, each walking one set's pages at a time
+            (paced by the shared rate limiter). Once page 1 shows the page
+            count, pages 2..N are fetched without waiting for their parses;
+            with prefetch, PREFETCH_WORKERS at a time.
+    parse   a process pool running parse_set_page on fetched HTML
+    collect one thread taking parse results in page order, storing them in
+            the page cache and assembling each set's cards
+    write   one thread calling on_batch([(set_info, cards), ...]) with
+            finished sets, batched up to write_batch_cards cards
+
+    The stages are joined by bounded queues (queue_size pages waiting to be
+    collected, queue_size finished sets), so a slow stage holds the others
+    back instead of letting pages pile up in memory. Per-stage throughput is
+    printed at the end. Returns {stage name: StageStats}.
+    """
+    parse_workers = parse_workers or os.cpu_count() or 1
+    stats = {
+        'fetch': StageStats('fetch', 'pages', fetch_workers),
+        'parse': StageStats('parse', 'pages', parse_workers),
+        'write': StageStats('write', 'cards'),
+    }
+    set_queue = queue.Queue()
+    for set_info in sets_info:
+        set_queue.put(set_info)
+    # ('page', set_info, job), then ('done' or 'failed', set_info, None), in page order per set
+    page_queue = queue.Queue(maxsize=queue_size)
+    write_queue = queue.Queue(maxsize=queue_size)
+    started = time.monotonic()
+
+    with ProcessPoolExecutor(max_workers=parse_workers) as parse_pool:
+        def fetch_page_job(url, set_info):
+            """Fetch a page and start parsing it without waiting; None if it couldn't be fetched"""
+            entry = set_page_cache.get(url)
+            fetch_start = time.monotonic()
+            response = fetch_page(url, headers=set_page_cache.conditional_headers(entry))
+            if response is None:
+                return None
+            stats['fetch'].record(1, time.monotonic() - fetch_start)
+            result, html = set_page_cache.check(url, response, entry)
+            job = {'url': url, 'response': response, 'entry': entry, 'result': result, 'future': None}
+            if html is not None:
+                job['future'] = parse_pool.submit(timed_parse_set_page, html, set_info, url)
+            elif result is None:
+                job['result'] = [[], None, None]
+            else:
+                print(f"    Page unchanged since last scrape, reusing {len(result[0])} cached cards")
+            return job
+
+        def finish(job):
+            """Wait for a job's parse and cache it (once); returns (cards, next page URL, page count)"""
+            if job['future'] is not None:
+                result, seconds = job['future'].result()
+                stats['parse'].record(1, seconds)
+                job['result'] = list(result)
+                job['future'] = None
+                set_page_cache.store_parsed(job['url'], job['response'], job['entry'], job['result'])
+            job['response'] = None
+            return job['result']
+
+        def peek(job):
+            """A job's parse result without caching it (that is left to the collector)"""
+            # Read once: the collector's finish() may clear it at any moment. It sets
+            # job['result'] before clearing the future, and the future keeps its result
+            future = job['future']
+            if future is None:
+                return job['result']
+            return future.result()[0]
+
+        def scrape_set(set_info):
+            """Feed one set's pages to page_queue in page order"""
+            url = set_info['full_url']
+            page_number = 0
+            visited_urls = set()
+            while url and url not in visited_urls and (max_pages is None or page_number < max_pages):
+                # Without a page count the next link is needed before the next fetch
+                visited_urls.add(url)
+                page_number += 1
+                print(f"  Scraping page {page_number}: {url}")
+                job = fetch_page_job(url, set_info)
+                if job is None:
+                    page_queue.put(('page', set_info, None))
+                    return
+                page_cards, next_url, page_total = finish(job)
+                page_queue.put(('page', set_info, job))
+                if not page_cards:
+                    return
+
+                if page_number == 1 and next_url and page_total and page_total > page_number:
+                    last_page = page_total if max_pages is None else min(page_total, max_pages)
+                    page_urls = [set_page_url(url, number) for number in range(2, last_page + 1)]
+                    print(f"    Fetching pages 2-{last_page} of {page_total} of {set_info['set_name']}")
+                    window = PREFETCH_WORKERS if prefetch else 1
+                    remaining_urls = iter(page_urls)
+                    in_flight = deque()
+
+                    def fetch_next(executor):
+                        page_url = next(remaining_urls, None)
+                        if page_url is not None:
+                            in_flight.append((page_url, executor.submit(fetch_page_job, page_url, set_info)))
+
+                    with ThreadPoolExecutor(max_workers=window) as executor:
+                        try:
+                            # At most `window` fetches ahead of the collector: a full page_queue stops fetching
+                            for _ in range(window):
+                                fetch_next(executor)
+                            while in_flight:
+                                page_url, future = in_flight.popleft()
+                                job = future.result()
+                                visited_urls.add(page_url)
+                                page_number += 1
+                                page_queue.put(('page', set_info, job))
+                                if job is None:
+                                    return
+                                fetch_next(executor)
+                        finally:
+                            # Don't spend requests on pages after a failure
+                            for _, future in in_flight:
+                                future.cancel()
+                    if page_urls:
+                        # Follow the last page's next link in case the widget showed only part of the range
+                        page_cards, next_url, _ = peek(job)
+                        if not page_cards:
+                            return
+                url = next_url if next_url != url else None
+
+        def fetch_worker():
+            while True:
+                try:
+                    set_info = set_queue.get_nowait()
+                except queue.Empty:
+                    return
+                print(f"\nScraping set page: {set_info['full_url']}")
+                try:
+                    scrape_set(set_info)
+                except Exception as e:
+                    print(f"Error scraping {set_info['set_name']}: {e}")
+                    page_queue.put(('failed', set_info, None))
+                    continue
+                page_queue.put(('done', set_info, None))
+
+        def collector():
+            # set_id -> [cards so far, stopped]; a set stops at its first missing or empty page
+            sets = {}
+            while True:
+                item = page_queue.get()
+                if item is None:
+                    break
+                kind, set_info, job = item
+                state = sets.setdefault(set_info['set_id'], [[], False])
+                if kind == 'failed':
+                    del sets[set_info['set_id']]
+                elif kind == 'done':
+                    del sets[set_info['set_id']]
+                    print(f"Successfully extracted {len(state[0])} cards from {set_info['set_name']}")
+                    write_queue.put((set_info, state[0]))
+                elif job is None:
+                    print(f"Error fetching a page of {set_info['set_name']}")
+                    state[1] = True
+                else:
+                    try:
+                        page_cards = finish(job)[0]
+                    except Exception as e:
+                        print(f"Error parsing {job['url']}: {e}")
+                        page_cards = []
+                    if not state[1] and page_cards:
+                        state[0].extend(page_cards)
+                    else:
+                        state[1] = True
+
+        def write_batch(batch):
+            start = time.monotonic()
+            try:
+                on_batch(batch)
+            except Exception as e:
+                print(f"Error writing batch of {len(batch)} sets: {e}")
+            stats['write'].record(sum(len(cards) for _, cards in batch), time.monotonic() - start)
+
+        def writer():
+            batch = []
+            batch_cards = 0
+            while True:
+                item = write_queue.get()
+                if item is None:
+                    break
+                batch.append(item)
+                batch_cards += len(item[1])
+                # Write when the batch is full, or when nothing else is ready to join it
+                if batch_cards >= write_batch_cards or write_queue.empty():
+                    write_batch(batch)
+                    batch = []
+                    batch_cards = 0
+            if batch:
+                write_batch(batch)
+
+        writer_thread = threading.Thread(target=writer, name='scrape-writer')
+        writer_thread.start()
+        collector_thread = threading.Thread(target=collector, name='scrape-collector')
+        collector_thread.start()
+        fetch_threads = [threading.Thread(target=fetch_worker, name=f'scrape-fetch-{i}')
+                         for i in range(max(1, min(fetch_workers, len(sets_info))))]
+        for thread in fetch_threads:
+            thread.start()
+        for thread in fetch_threads:
+            thread.join()
+        page_queue.put(None)
+        collector_thread.join()
+        write_queue.put(None)
+        writer_thread.join()
+
+    elapsed = time.monotonic() - started
+    print(f"\n=== PIPELINE STAGES ({elapsed:.1f}s) ===")
+    for stage in stats.values():
+        stage.report(elapsed)
+    return stats
+
 def extract_cards_from_page(soup, set_info):
     """
     Extract all cards from a single page.
@@ -309,7 +969,7 @@ def extract_cards_from_page(soup, set_info):
     else:
         # Fallback to div-based structure
         print("    No table found, trying div-based extraction...")
-        card_containers = soup.find_all('div', class_=re.compile(r'card|row'))
+        card_containers = soup.find_all('div', class_=CARD_CONTAINER_CLASS_RE)
         
         for container in card_containers:
             try:
@@ -332,6 +992,8 @@ def extract_card_info_from_row(row):
         return None
     
     card_data = {}
+    # Cell text is needed by the name, price and rarity passes; extract it once
+    cell_texts = [cell.get_text(strip=True) for cell in cells]
     
     # Try to find card name (usually in first few columns)
     for i, cell in enumerate(cells[:3]):
@@ -340,23 +1002,17 @@ def extract_card_info_from_row(row):
             card_data['name'] = link.get_text(strip=True)
             card_data['card_url'] = f"https://www.mtgstocks.com{link['href']}"
             break
-        elif cell.get_text(strip=True) and not re.match(r'^\$?[\d,]+\.?\d*', cell.get_text(strip=True)):
+        elif cell_texts[i] and not LEADING_PRICE_RE.match(cell_texts[i]):
             if not card_data.get('name'):
-                card_data['name'] = cell.get_text(strip=True)
+                card_data['name'] = cell_texts[i]
     
     # Look for price information in all cells
     for i, cell in enumerate(cells):
-        cell_text = cell.get_text(strip=True)
+        cell_text = cell_texts[i]
         
         # Look for dollar amounts with more specific patterns
-        price_patterns = [
-            r'\$(\d+(?:,\d{3})*(?:\.\d{2})?)',  # $1.23, $1,234.56
-            r'(\d+(?:,\d{3})*\.\d{2})',        # 1.23, 1,234.56 (with decimals)
-            r'(\d+(?:,\d{3})+)',               # 1,234 (with commas)
-        ]
-        
-        for pattern in price_patterns:
-            price_match = re.search(pattern, cell_text)
+        for pattern in PRICE_PATTERNS:
+            price_match = pattern.search(cell_text)
             if price_match:
                 price_value = price_match.group(1).replace(',', '')
                 try:
@@ -386,21 +1042,20 @@ def extract_card_info_from_row(row):
                     continue
     
     # Look for rarity indicators
-    for cell in cells:
-        rarity_indicators = ['common', 'uncommon', 'rare', 'mythic', 'C', 'U', 'R', 'M']
-        cell_text = cell.get_text(strip=True).lower()
-        for rarity in rarity_indicators:
-            if rarity.lower() in cell_text:
-                card_data['rarity'] = rarity.title()
+    for i, cell in enumerate(cells):
+        cell_text = cell_texts[i].lower()
+        for indicator, rarity in RARITY_MATCHES:
+            if indicator in cell_text:
+                card_data['rarity'] = rarity
                 break
         
         # Also check for rarity symbols/images
         rarity_img = cell.find('img')
         if rarity_img and rarity_img.get('alt'):
             alt_text = rarity_img.get('alt').lower()
-            for rarity in rarity_indicators:
-                if rarity.lower() in alt_text:
-                    card_data['rarity'] = rarity.title()
+            for indicator, rarity in RARITY_MATCHES:
+                if indicator in alt_text:
+                    card_data['rarity'] = rarity
                     break
     
     return card_data if card_data.get('name') else None
@@ -413,10 +1068,10 @@ def extract_card_info(container):
     
     # Try to find card name
     name_selectors = [
-        container.find('a', href=re.compile(r'/prints/')),
-        container.find('a', class_=re.compile(r'card|name')),
-        container.find('span', class_=re.compile(r'card|name')),
-        container.find('div', class_=re.compile(r'card|name'))
+        container.find('a', href=PRINT_HREF_RE),
+        container.find('a', class_=CARD_NAME_CLASS_RE),
+        container.find('span', class_=CARD_NAME_CLASS_RE),
+        container.find('div', class_=CARD_NAME_CLASS_RE)
     ]
     
     card_name_element = next((elem for elem in name_selectors if elem), None)
@@ -427,7 +1082,7 @@ def extract_card_info(container):
     
     # More aggressive price searching
     all_text = container.get_text()
-    price_matches = re.findall(r'\$(\d+(?:,\d{3})*(?:\.\d{2})?)', all_text)
+    price_matches = DOLLAR_PRICE_RE.findall(all_text)
     if price_matches:
         card_data['price'] = price_matches[0].replace(',', '')
     
@@ -440,11 +1095,9 @@ def debug_page_structure(set_url):
     print(f"\n=== DEBUGGING PAGE STRUCTURE ===")
     print(f"URL: {set_url}")
     
-    try:
-        response = requests.get(set_url)
-        response.raise_for_status()
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching page: {e}")
+    response = fetch_page(set_url)
+    if response is None:
+        print("Error fetching page")
         return
     
     soup = BeautifulSoup(response.text, 'html.parser')
@@ -508,52 +1161,104 @@ def print_price_summary(all_cards_data):
     """
     print(f"\n=== PRICE DATA SUMMARY ===")
     
-    # Count cards with different types of price data
-    price_fields = ['price', 'market_price', 'low_price', 'high_price', 'average_price']
-    price_counts = {}
-    
-    for field in price_fields:
-        count = sum(1 for card in all_cards_data if card.get(field))
-        price_counts[field] = count
-        if count > 0:
-            print(f"Cards with {field}: {count}")
-    
-    # Show cards with any price data
-    cards_with_any_price = []
-    for card in all_cards_data:
-        for field in price_fields:
-            if card.get(field):
-                cards_with_any_price.append(card)
-                break
+    # Count cards with different types of price data, in one pass over the price arrays
+    catalog = arrays_from_cards(all_cards_data)
+    price_counts = coverage(catalog)
+    for field in PRICE_FIELDS:
+        if price_counts[field] > 0:
+            print(f"Cards with {field}: {price_counts[field]}")
     
-    print(f"Total cards with any price data: {len(cards_with_any_price)}")
+    print(f"Total cards with any price data: {price_counts['any']}")
     
-    if cards_with_any_price:
+    if price_counts['any']:
         print(f"\nSample cards with prices:")
-        for card in cards_with_any_price[:10]:
+        # First field with a price for each card (-1 if none)
+        priced = np.column_stack([catalog.prices[field] > 0 for field in PRICE_FIELDS])
+        first_field = np.where(priced.any(axis=1), priced.argmax(axis=1), -1)
+        for i in np.flatnonzero(first_field >= 0)[:10]:
+            card = all_cards_data[i]
+            field = PRICE_FIELDS[first_field[i]]
             name = card.get('name', 'Unknown')
             set_name = card.get('set_name', 'Unknown Set')
+            print(f"  - {name} ({set_name}) - {field.replace('_', ' ').title()}: ${card[field]}")
+    
+    distribution_stats = distribution(catalog)
+    if distribution_stats['count']:
+        percentiles = ', '.join(f"p{q}: ${value:,.2f}" for q, value in distribution_stats['percentiles'].items())
+        print(f"\nPrice distribution: {percentiles}")
+
+class CardValueCache:
+    def __init__(self, max_size=4096, ttl_seconds=900):
+        """LRU cache of card value lookups whose entries expire after ttl_seconds"""
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()  # key -> (expires_at, value)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def get(self, key):
+        """Return (found, value) for a cached lookup"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
             
-            # Find the best price to display
-            price_display = None
-            for field in price_fields:
-                if card.get(field):
-                    price_display = f"{field.replace('_', ' ').title()}: ${card[field]}"
-                    break
-            
-            if not price_display:
-                # Check for column-based prices
-                for key, value in card.items():
-                    if key.startswith('price_col_'):
-                        price_display = f"Price: ${value}"
-                        break
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return False, None
             
-            print(f"  - {name} ({set_name}) - {price_display or 'No price found'}")
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+    
+    def put(self, key, value):
+        """Store a lookup result, evicting the least recently used entries"""
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        """Drop every cached lookup (called when the card data changes)"""
+        with self.lock:
+            if self.entries:
+                self.invalidations += 1
+            self.entries.clear()
+    
+    def stats(self):
+        """Return hit/miss counters for sizing the cache"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'expirations': self.expirations,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
 
 class MTGCardDatabase:
-    def __init__(self, db_path="./mtg_cards_db"):
+    def __init__(self, db_path="./mtg_cards_db", ingest_mode='semantic'):
         """Initialize ChromaDB for MTG card storage"""
+        if ingest_mode not in INGEST_MODES:
+            raise ValueError(f"Unknown ingest mode: {ingest_mode}")
         self.db_path = db_path
+        self.ingest_mode = ingest_mode
+        self.fast_embedding_function = HashedNgramEmbeddingFunction()
         
         # Create the database directory if it doesn't exist
         os.makedirs(db_path, exist_ok=True)
@@ -567,9 +1272,95 @@ class MTGCardDatabase:
             metadata={"description": "MTG card database with pricing information"}
         )
         
+        # Lexical name index, built lazily on the first search
+        self.name_index = None
+        self.name_index_lock = threading.Lock()
+        # Collection source tag the index was built from, and when it was last compared
+        # with the stored one (another process may be writing to the same database)
+        self.name_index_source = None
+        self.name_index_checked_at = 0.0
+        # Memo of get_card_value_improved results, cleared whenever cards are written
+        self.value_cache = CardValueCache()
+        # Every price written to the collection is also appended to the history store
+        self.price_history = PriceHistoryStore(os.path.join(db_path, 'price_history.sqlite3'))
+        # Price moves of re-scraped cards, for downstream jobs (see price_change_feed)
+        self.price_feed = PriceChangeFeed(os.path.join(db_path, PRICE_CHANGE_FEED_FILE))
+        # Timing stats of the last get_card_values_bulk call
+        self.last_bulk_stats = None
+        # Multi-process scorer for catalog-wide fuzzy matching, started on demand
+        self.catalog_scorer = None
+        
         print(f"ChromaDB initialized at: {db_path}")
         print(f"Current collection size: {self.collection.count()}")
     
+    def build_name_index(self, batch_size=5000):
+        """Build the in-memory name index from the stored card metadata"""
+        index = CardNameIndex()
+        # Taken before reading, so a write during the build makes the index stale
+        source = self.stored_source_tag()
+        offset = 0
+        
+        while True:
+            batch = self.collection.get(include=['metadatas'], limit=batch_size, offset=offset)
+            ids = batch['ids']
+            if not ids:
+                break
+            
+            for card_id, metadata in zip(ids, batch['metadatas']):
+                name = metadata.get('name', '')
+                normalized = metadata.get('normalized_name') or self.normalize_card_name(name)
+                index.add(card_id, normalized, name, metadata.get('set_name', ''))
+            
+            offset += len(ids)
+            if len(ids) < batch_size:
+                break
+        
+        self.name_index = index
+        self.name_index_source = source
+        self.name_index_checked_at = time.monotonic()
+        print(f"Built name index for {len(index)} cards")
+        return index
+    
+    def stored_source_tag(self):
+        """Source tag (count and write version) of the collection as currently stored"""
+        # Re-read the collection: the cached handle's metadata misses other processes' writes
+        return collection_source_tag(self.client.get_collection(name="mtg_cards"))
+    
+    def refresh_name_index_if_stale(self):
+        """
+        Rebuild the name index and clear the value memo if another process
+        wrote to the database since the index was built. Checked at most
+        once per memo TTL.
+        """
+        if self.name_index is None or time.monotonic() - self.name_index_checked_at < self.value_cache.ttl_seconds:
+            return
+        with self.name_index_lock:
+            if time.monotonic() - self.name_index_checked_at < self.value_cache.ttl_seconds:
+                return
+            self.name_index_checked_at = time.monotonic()
+            try:
+                stale = self.stored_source_tag() != self.name_index_source
+            except Exception as e:
+                print(f"Error checking the database for changes: {e}")
+                return
+            if stale:
+                print("Database changed since the name index was built, rebuilding it")
+                self.build_name_index()
+                self.value_cache.clear()
+                if self.catalog_scorer is not None:
+                    self.catalog_scorer.close()
+                    self.catalog_scorer = None
+    
+    def get_name_index(self):
+        """Return the name index, building it on first use and rebuilding it when the database changed"""
+        if self.name_index is None:
+            with self.name_index_lock:
+                if self.name_index is None:
+                    self.build_name_index()
+        else:
+            self.refresh_name_index_if_stale()
+        return self.name_index
+    
     def normalize_card_name(self, name):
         """Improved normalization that preserves more card name structure"""
         if not name:
@@ -585,44 +1376,25 @@ class MTGCardDatabase:
     
     def calculate_name_similarity(self, query_normalized, stored_normalized, original_stored):
         """Calculate similarity score between card names"""
-        # Exact match (highest priority)
-        if query_normalized == stored_normalized:
-            return 100
-        
-        # Exact match ignoring case in original
-        if query_normalized == original_stored.lower().strip():
-            return 95
-        
-        # Query is contained in stored name
-        if query_normalized in stored_normalized:
-            return 80
-        
-        # Stored name is contained in query
-        if stored_normalized in query_normalized:
-            return 75
-        
-        # Word-by-word matching
-        query_words = set(query_normalized.split())
-        stored_words = set(stored_normalized.split())
-        
-        if not query_words or not stored_words:
-            return 0
-        
-        # Calculate Jaccard similarity (intersection over union)
-        intersection = len(query_words.intersection(stored_words))
-        union = len(query_words.union(stored_words))
-        
-        if union == 0:
-            return 0
-        
-        jaccard_score = intersection / union
+        return calculate_name_similarity(query_normalized, stored_normalized, original_stored)
+    
+    def _score_candidates(self, normalized_query, set_name=None):
+        """Yield (score, card_id, original name) for indexed cards similar to the query"""
+        index = self.get_name_index()
         
-        # Bonus for having all query words
-        if query_words.issubset(stored_words):
-            jaccard_score += 0.2
+        if set_name:
+            # Set-scoped lookups only touch the matching sets' partitions
+            candidates = index.cards_in_sets(index.resolve_sets(set_name))
+        else:
+            # Score only the cards sharing a word or word prefix with the query
+            candidates = index.candidates(normalized_query)
         
-        # Convert to 0-70 scale for word matching
-        return int(jaccard_score * 70)
+        for card_id, normalized_stored, card_name_stored, set_name_stored in candidates:
+            # Calculate similarity score
+            score = self.calculate_name_similarity(normalized_query, normalized_stored, card_name_stored)
+            
+            if score > 0:  # Only include if there's some similarity
+                yield (score, card_id, card_name_stored)
     
     def search_card_improved(self, card_name, set_name=None, n_results=10):
         """Improved card search with better matching logic"""
@@ -630,47 +1402,44 @@ class MTGCardDatabase:
             return []
         
         normalized_query = self.normalize_card_name(card_name)
-        results = []
         
         try:
-            # Get all cards from database
-            all_cards = self.collection.get()
+            # Keep the top results (higher score is better) in a bounded heap
+            scored_results = top_k_scored(self._score_candidates(normalized_query, set_name), n_results)
             
-            if not all_cards['metadatas']:
+            if not scored_results:
                 return []
             
-            # Score each card based on name similarity
-            scored_results = []
+            # Fetch full metadata only for the cards being returned
+            stored = self._get_cards_by_id([card_id for _, card_id, _ in scored_results])
             
-            for i, metadata in enumerate(all_cards['metadatas']):
-                card_name_stored = metadata.get('name', '')
-                set_name_stored = metadata.get('set_name', '')
-                normalized_stored = self.normalize_card_name(card_name_stored)
-                
-                # Skip if set filter doesn't match
-                if set_name and set_name.lower() not in set_name_stored.lower():
+            results = []
+            for score, card_id, card_name_stored in scored_results:
+                if card_id not in stored:
                     continue
-                
-                # Calculate similarity score
-                score = self.calculate_name_similarity(normalized_query, normalized_stored, card_name_stored)
-                
-                if score > 0:  # Only include if there's some similarity
-                    scored_results.append({
-                        'id': all_cards['ids'][i],
-                        'metadata': metadata,
-                        'document': all_cards['documents'][i] if all_cards['documents'] else '',
-                        'score': score,
-                        'original_name': card_name_stored
-                    })
-            
-            # Sort by score (higher is better) and return top results
-            scored_results.sort(key=lambda x: x['score'], reverse=True)
-            return scored_results[:n_results]
+                metadata, document = stored[card_id]
+                results.append({
+                    'id': card_id,
+                    'metadata': metadata,
+                    'document': document,
+                    'score': score,
+                    'original_name': card_name_stored
+                })
+            return results
             
         except Exception as e:
             print(f"Error in improved search: {e}")
             return []
     
+    def _get_cards_by_id(self, ids):
+        """Return {card id: (metadata, document)} for the given ids"""
+        cards = self.collection.get(ids=ids, include=['metadatas', 'documents'])
+        documents = cards.get('documents') or []
+        return {
+            card_id: (metadata, documents[i] if documents else '')
+            for i, (card_id, metadata) in enumerate(zip(cards['ids'], cards['metadatas']))
+        }
+    
     def get_card_value_improved(self, card_name, set_name=None):
         """Improved card value lookup with better matching"""
         results = self.search_card_improved(card_name, set_name, n_results=5)
@@ -680,23 +1449,36 @@ class MTGCardDatabase:
         
         # Get the best match
         best_match = results[0]
-        metadata = best_match['metadata']
-        
+        return self.build_price_info(best_match['metadata'], best_match['score'])
+    
+    def get_card_value_cached(self, card_name, set_name=None):
+        """get_card_value_improved, memoized on normalized name and set"""
+        self.refresh_name_index_if_stale()
+        key = (self.normalize_card_name(card_name), (set_name or '').strip().lower())
+        found, value = self.value_cache.get(key)
+        if found:
+            return value
+        
+        value = self.get_card_value_improved(card_name, set_name)
+        self.value_cache.put(key, value)
+        return value
+    
+    def build_price_info(self, metadata, match_score):
+        """Build the price lookup result for a matched card"""
         # Extract comprehensive price information
         price_info = {
             'card_name': metadata.get('name'),
             'set_name': metadata.get('set_name'),
             'set_id': metadata.get('set_id'),
             'rarity': metadata.get('rarity'),
-            'match_score': best_match['score'],
+            'match_score': match_score,
             'card_url': metadata.get('card_url'),
             'scraped_date': metadata.get('scraped_date'),
             'prices': {}
         }
         
         # Get all available prices
-        price_fields = ['price', 'market_price', 'low_price', 'high_price', 'average_price']
-        for field in price_fields:
+        for field in PRICE_FIELDS:
             if metadata.get(field):
                 try:
                     # Ensure price is a number
@@ -716,6 +1498,115 @@ class MTGCardDatabase:
         
         return price_info
     
+    def get_card_price_trend(self, card_name, set_name=None, days=30, field='price'):
+        """Price trend of the best matching card over the last `days` days, from the history store"""
+        results = self.search_card_improved(card_name, set_name, n_results=1)
+        if not results:
+            return None
+        
+        card_id = results[0]['id']
+        start = time.time() - days * 86400
+        return {
+            'card_name': results[0]['metadata'].get('name'),
+            'set_name': results[0]['metadata'].get('set_name'),
+            'days': days,
+            'current_price': self.price_history.price_at(card_id, field=field),
+            'window': self.price_history.window_stats(card_id, start, field=field),
+            'percent_change': self.price_history.percent_change(card_id, start, field=field),
+        }
+    
+    def get_catalog_scorer(self, num_shards=None):
+        """Return a multi-process scorer over every distinct stored name, started on first use"""
+        index = self.get_name_index()
+        if self.catalog_scorer is None:
+            self.catalog_scorer = ShardedNameScorer(list(index.name_to_ids), num_shards=num_shards, scorer='name')
+        return self.catalog_scorer
+    
+    def get_card_values_bulk(self, card_queries, fetch_batch_size=5000, catalog_wide=False):
+        """
+        Look up the values of many cards in one pass.
+        
+        card_queries is a list of card names or (card_name, set_name) pairs.
+        Repeated lookups are only scored once. With catalog_wide=True, names
+        the index finds no candidates for are scored against the whole
+        catalog on all CPU cores in one batch. Returns a list of price info
+        dicts (None where nothing matched) in input order; timing stats for
+        the batch are printed and kept in self.last_bulk_stats.
+        """
+        start_time = time.perf_counter()
+        self.get_name_index()
+        index_time = time.perf_counter()
+        
+        # Deduplicate on normalized name and set filter
+        query_keys = []
+        unique_queries = {}
+        for query in card_queries:
+            if isinstance(query, str):
+                card_name, set_name = query, None
+            else:
+                card_name, set_name = (tuple(query) + (None,))[:2]
+            key = (self.normalize_card_name(card_name), (set_name or '').strip().lower())
+            query_keys.append(key)
+            unique_queries.setdefault(key, set_name)
+        
+        # Score every distinct lookup against the index
+        best_matches = {}
+        for key, set_name in unique_queries.items():
+            if not key[0]:
+                continue
+            best = top_k_scored(self._score_candidates(key[0], set_name), 1)
+            if best:
+                best_matches[key] = best[0]
+        
+        if catalog_wide:
+            unmatched = [key for key, set_name in unique_queries.items()
+                         if key[0] and not set_name and key not in best_matches]
+            if unmatched:
+                index = self.get_name_index()
+                scorer = self.get_catalog_scorer()
+                for key, matches in zip(unmatched, scorer.score_batch([key[0] for key in unmatched], k=1)):
+                    if matches:
+                        score, position = matches[0]
+                        card_id = min(index.name_to_ids.get(scorer.names[position], ()), default=None)
+                        if card_id is not None:
+                            best_matches[key] = (score, card_id, index.cards[card_id][1])
+        score_time = time.perf_counter()
+        
+        # Fetch metadata for all matched cards in as few reads as possible
+        matched_ids = list({card_id for _, card_id, _ in best_matches.values()})
+        metadata_by_id = {}
+        try:
+            for i in range(0, len(matched_ids), fetch_batch_size):
+                batch = self.collection.get(ids=matched_ids[i:i+fetch_batch_size], include=['metadatas'])
+                metadata_by_id.update(zip(batch['ids'], batch['metadatas']))
+        except Exception as e:
+            print(f"Error fetching card metadata for bulk lookup: {e}")
+        fetch_time = time.perf_counter()
+        
+        price_infos = {}
+        for key, (score, card_id, _) in best_matches.items():
+            if card_id in metadata_by_id:
+                price_infos[key] = self.build_price_info(metadata_by_id[card_id], score)
+        
+        results = [price_infos.get(key) for key in query_keys]
+        end_time = time.perf_counter()
+        
+        self.last_bulk_stats = {
+            'queries': len(query_keys),
+            'unique_queries': len(unique_queries),
+            'matched': sum(1 for result in results if result),
+            'index_seconds': index_time - start_time,
+            'score_seconds': score_time - index_time,
+            'fetch_seconds': fetch_time - score_time,
+            'total_seconds': end_time - start_time,
+        }
+        stats = self.last_bulk_stats
+        print(f"Bulk lookup: {stats['matched']}/{stats['queries']} matched "
+              f"({stats['unique_queries']} unique) in {stats['total_seconds']:.2f}s "
+              f"[index {stats['index_seconds']:.2f}s, score {stats['score_seconds']:.2f}s, "
+              f"fetch {stats['fetch_seconds']:.2f}s]")
+        return results
+    
     def show_detailed_card_info(self, result):
         """Show detailed information about a specific card"""
         metadata = result['metadata']
@@ -740,16 +1631,9 @@ class MTGCardDatabase:
         print("-" * 30)
         
         # Show all available prices
-        price_fields = {
-            'price': 'Price',
-            'market_price': 'Market Price',
-            'low_price': 'Low Price',
-            'high_price': 'High Price',
-            'average_price': 'Average Price'
-        }
-        
         found_prices = False
-        for field, label in price_fields.items():
+        for field in PRICE_FIELDS:
+            label = field.replace('_', ' ').title()
             if metadata.get(field):
                 try:
                     price_val = float(metadata[field])
@@ -816,8 +1700,7 @@ class MTGCardDatabase:
                     
                     # Get best available price
                     price_display = "No price"
-                    price_fields = ['market_price', 'price', 'average_price', 'low_price', 'high_price']
-                    for field in price_fields:
+                    for field in LISTING_PRICE_FIELDS:
                         if metadata.get(field):
                             try:
                                 price_val = float(metadata[field])
@@ -887,15 +1770,68 @@ class MTGCardDatabase:
         
         return " | ".join(document_parts)
     
-    def add_cards_to_database(self, cards_data):
-        """Add multiple cards to the ChromaDB database"""
+    def make_card_id(self, card):
+        """Stable id for a card: set id plus MTGStocks print id, or normalized name"""
+        set_id = str(card.get('set_id', '')) or 'unknown'
+        print_match = re.search(r'/prints/(\d+)', card.get('card_url') or '')
+        if print_match:
+            card_id = f"{set_id}_print_{print_match.group(1)}"
+        else:
+            card_id = f"{set_id}_{self.normalize_card_name(card.get('name', ''))}"
+        return re.sub(r'[^\w]', '_', card_id)
+    
+    def price_content_hash(self, metadata):
+        """Hash of a card's price fields, used to skip rewriting unchanged cards"""
+        price_items = sorted(
+            (key, value) for key, value in metadata.items()
+            if key in PRICE_FIELDS or key.startswith('price_col_')
+        )
+        return hashlib.sha1(json.dumps(price_items).encode('utf-8')).hexdigest()[:16]
+    
+    def get_stored_content_hashes(self, ids, batch_size=5000, prices=None):
+        """
+        Return {card id: content hash} for the ids already in the database.
+        If a dict is passed as `prices`, it is filled with {card id: stored
+        price} from the same reads.
+        """
+        stored_hashes = {}
+        for i in range(0, len(ids), batch_size):
+            existing = self.collection.get(ids=ids[i:i+batch_size], include=['metadatas'])
+            for card_id, metadata in zip(existing['ids'], existing['metadatas']):
+                metadata = metadata or {}
+                stored_hashes[card_id] = metadata.get('content_hash')
+                if prices is not None:
+                    prices[card_id] = metadata.get(FEED_PRICE_FIELD)
+        return stored_hashes
+    
+    def add_cards_to_database(self, cards_data, ingest_mode=None, used_ids=None):
+        """
+        Add or update multiple cards in the ChromaDB database.
+        
+        Cards are upserted under stable ids, and cards whose prices haven't
+        changed since the last scrape are skipped. In 'fast' ingest mode the
+        cards get hashed n-gram embeddings instead of model embeddings (see
+        backfill_semantic_embeddings). Returns a dict with the number of
+        cards written and skipped as unchanged, and the ids of all the cards.
+        
+        Same-named cards without a print id get a running suffix (_2, _3...).
+        To keep the suffixes stable when one set is ingested in several calls
+        (page by page), pass the same used_ids set to each call: ids taken
+        by earlier calls are skipped, and the new ids are added to it.
+        """
+        ingest_mode = ingest_mode or self.ingest_mode
+        if ingest_mode not in INGEST_MODES:
+            raise ValueError(f"Unknown ingest mode: {ingest_mode}")
+        stats = {'written': 0, 'unchanged': 0, 'failed': 0, 'ids': []}
         if not cards_data:
             print("No cards to add to database")
-            return
+            return stats
         
         documents = []
         metadatas = []
         ids = []
+        used_ids = used_ids if used_ids is not None else set()
+        scraped_date = datetime.now().isoformat()
         
         for card in cards_data:
             if not card.get('name'):
@@ -903,7 +1839,6 @@ class MTGCardDatabase:
             
             # Create document for embedding
             document = self.create_card_document(card)
-            documents.append(document)
             
             # Prepare metadata (ChromaDB metadata must be simple types)
             metadata = {
@@ -912,12 +1847,12 @@ class MTGCardDatabase:
                 'set_name': card.get('set_name', ''),
                 'set_id': str(card.get('set_id', '')),
                 'rarity': card.get('rarity', ''),
-                'scraped_date': datetime.now().isoformat(),
+                'scraped_date': scraped_date,
+                'embedding': 'hashed' if ingest_mode == 'fast' else 'semantic',
             }
             
             # Add price information
-            price_fields = ['price', 'market_price', 'low_price', 'high_price', 'average_price']
-            for field in price_fields:
+            for field in PRICE_FIELDS:
                 if card.get(field):
                     try:
                         # Convert price to float for storage
@@ -939,79 +1874,294 @@ class MTGCardDatabase:
             if card.get('card_url'):
                 metadata['card_url'] = card['card_url']
             
+            metadata['content_hash'] = self.price_content_hash(metadata)
+            
+            # Stable ID; same-named cards without a print id get a running suffix
+            base_id = card_id = self.make_card_id(card)
+            suffix = 1
+            while card_id in used_ids:
+                suffix += 1
+                card_id = f"{base_id}_{suffix}"
+            used_ids.add(card_id)
+            
+            documents.append(document)
             metadatas.append(metadata)
+            ids.append(card_id)
+        
+        # Skip cards whose prices haven't moved since they were last stored
+        stored_prices = {}
+        try:
+            stored_hashes = self.get_stored_content_hashes(ids, prices=stored_prices)
+        except Exception as e:
+            print(f"Error reading stored cards, rewriting all of them: {e}")
+            stored_hashes = {}
+        
+        changed = [
+            i for i, (card_id, metadata) in enumerate(zip(ids, metadatas))
+            if stored_hashes.get(card_id) != metadata['content_hash']
+        ]
+        stats['unchanged'] = len(ids) - len(changed)
+        stats['ids'] = list(ids)
+        documents = [documents[i] for i in changed]
+        metadatas = [metadatas[i] for i in changed]
+        ids = [ids[i] for i in changed]
+        
+        if not documents:
+            print(f"All {stats['unchanged']} cards unchanged, nothing to write")
+            return stats
+        
+        # Fast mode supplies its own embeddings, so Chroma never runs the model
+        embeddings = self.fast_embedding_function(documents) if ingest_mode == 'fast' else None
+        
+        try:
+            # Upsert into ChromaDB
+            self.collection.upsert(
+                documents=documents,
+                metadatas=metadatas,
+                embeddings=embeddings,
+                ids=ids
+            )
+            self._index_added_cards(ids, metadatas, stored_prices)
+            stats['written'] = len(documents)
+            print(f"Successfully wrote {len(documents)} cards to ChromaDB ({stats['unchanged']} unchanged)")
+        except Exception as e:
+            print(f"Error adding cards to database: {e}")
+            # Try adding in smaller batches
+            batch_size = 100
+            for i in range(0, len(documents), batch_size):
+                batch_docs = documents[i:i+batch_size]
+                batch_meta = metadatas[i:i+batch_size]
+                batch_ids = ids[i:i+batch_size]
+                batch_embeddings = embeddings[i:i+batch_size] if embeddings else None
+                try:
+                    self.collection.upsert(
+                        documents=batch_docs,
+                        metadatas=batch_meta,
+                        embeddings=batch_embeddings,
+                        ids=batch_ids
+                    )
+                    self._index_added_cards(batch_ids, batch_meta, stored_prices)
+                    stats['written'] += len(batch_docs)
+                    print(f"Added batch {i//batch_size + 1}: {len(batch_docs)} cards")
+                except Exception as batch_error:
+                    stats['failed'] += len(batch_docs)
+                    print(f"Error adding batch {i//batch_size + 1}: {batch_error}")
+        
+        return stats
+    
+    def remove_legacy_card_ids(self, batch_size=5000):
+        """
+        Delete rows stored under the old random ids whose card has since
+        been re-scraped under its stable id, so it isn't stored twice.
+        Rows of cards not re-scraped yet are kept. Once none are left, a
+        flag in the collection metadata skips the scan from then on.
+        Returns the number of rows deleted.
+        """
+        if (self.collection.metadata or {}).get(LEGACY_IDS_CLEARED_KEY):
+            return 0
+        
+        stored_ids = set()
+        legacy_ids = {}  # legacy id -> stable id of the same card
+        offset = 0
+        while True:
+            batch = self.collection.get(include=['metadatas'], limit=batch_size, offset=offset)
+            if not batch['ids']:
+                break
+            for card_id, metadata in zip(batch['ids'], batch['metadatas']):
+                metadata = metadata or {}
+                stored_ids.add(card_id)
+                # Rows written under stable ids always carry a content hash
+                if 'content_hash' not in metadata and LEGACY_CARD_ID_RE.search(card_id):
+                    legacy_ids[card_id] = self.make_card_id(metadata)
+            offset += len(batch['ids'])
+            if len(batch['ids']) < batch_size:
+                break
+        
+        replaced = [card_id for card_id, stable_id in legacy_ids.items() if stable_id in stored_ids]
+        for i in range(0, len(replaced), batch_size):
+            self.collection.delete(ids=replaced[i:i+batch_size])
+        if replaced:
+            if self.name_index is not None:
+                for card_id in replaced:
+                    self.name_index.remove(card_id)
+            self.value_cache.clear()
+            self._bump_write_version()
+            if self.name_index is not None:
+                self.name_index_source = self.stored_source_tag()
+        
+        if len(replaced) == len(legacy_ids):
+            self.collection = self.client.get_collection(name="mtg_cards")
+            metadata = dict(self.collection.metadata or {})
+            metadata[LEGACY_IDS_CLEARED_KEY] = True
+            self.collection.modify(metadata=metadata)
+        print(f"Removed {len(replaced)} rows stored under legacy ids "
+              f"({len(legacy_ids) - len(replaced)} left until their sets are re-scraped)")
+        return len(replaced)
+    
+    def backfill_semantic_embeddings(self, batch_size=256, max_batches=None, embedding_function=None):
+        """
+        Replace hashed embeddings written by fast ingest with the default
+        model's embeddings (or embedding_function's). Safe to stop and
+        re-run; returns the number of cards updated.
+        """
+        if embedding_function is None:
+            from chromadb.utils import embedding_functions
+            embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        
+        updated = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            batch = self.collection.get(
+                where={'embedding': 'hashed'},
+                include=['documents', 'metadatas'],
+                limit=batch_size
+            )
+            if not batch['ids']:
+                break
             
-            # Create unique ID
-            card_id = f"{card.get('set_id', 'unknown')}_{self.normalize_card_name(card.get('name', ''))}"
-            card_id = re.sub(r'[^\w]', '_', card_id)
-            ids.append(f"{card_id}_{uuid.uuid4().hex[:8]}")
+            metadatas = [dict(metadata, embedding='semantic') for metadata in batch['metadatas']]
+            self.collection.update(
+                ids=batch['ids'],
+                embeddings=embedding_function(batch['documents']),
+                metadatas=metadatas
+            )
+            updated += len(batch['ids'])
+            batches += 1
+            print(f"Backfilled semantic embeddings for {updated} cards")
         
-        if documents:
+        return updated
+    
+    def _bump_write_version(self):
+        """Count a write in the collection metadata, so catalog snapshots of it go stale"""
+        try:
+            # Start from the stored metadata, which may include other processes' bumps
+            self.collection = self.client.get_collection(name="mtg_cards")
+            metadata = dict(self.collection.metadata or {})
+            metadata[WRITE_VERSION_KEY] = metadata.get(WRITE_VERSION_KEY, 0) + 1
+            self.collection.modify(metadata=metadata)
+        except Exception as e:
+            print(f"Error updating collection write version: {e}")
+    
+    def _index_added_cards(self, ids, metadatas, stored_prices=None):
+        """
+        Keep the name index, value cache, price history and price change
+        feed in sync with cards written to ChromaDB. stored_prices holds the
+        prices the cards had before the write.
+        """
+        self.value_cache.clear()
+        self._bump_write_version()
+        if self.catalog_scorer is not None:
+            # Shards hold a snapshot of the names; restart them on next use
+            self.catalog_scorer.close()
+            self.catalog_scorer = None
+        try:
+            self.price_history.record_prices(zip(ids, metadatas))
+        except Exception as e:
+            print(f"Error recording price history: {e}")
+        if stored_prices:
             try:
-                # Add to ChromaDB
-                self.collection.add(
-                    documents=documents,
-                    metadatas=metadatas,
-                    ids=ids
-                )
-                print(f"Successfully added {len(documents)} cards to ChromaDB")
+                self.price_feed.record_changes(ids, [stored_prices.get(card_id) for card_id in ids], metadatas)
             except Exception as e:
-                print(f"Error adding cards to database: {e}")
-                # Try adding in smaller batches
-                batch_size = 100
-                for i in range(0, len(documents), batch_size):
-                    try:
-                        batch_docs = documents[i:i+batch_size]
-                        batch_meta = metadatas[i:i+batch_size]
-                        batch_ids = ids[i:i+batch_size]
-                        
-                        self.collection.add(
-                            documents=batch_docs,
-                            metadatas=batch_meta,
-                            ids=batch_ids
-                        )
-                        print(f"Added batch {i//batch_size + 1}: {len(batch_docs)} cards")
-                    except Exception as batch_error:
-                        print(f"Error adding batch {i//batch_size + 1}: {batch_error}")
+                print(f"Error writing price change feed: {e}")
+        if self.name_index is None:
+            return
+        for card_id, metadata in zip(ids, metadatas):
+            self.name_index.add(card_id, metadata['normalized_name'], metadata['name'], metadata['set_name'])
+        # The index now includes this write; only other writers' changes should trigger a rebuild
+        try:
+            self.name_index_source = self.stored_source_tag()
+        except Exception as e:
+            print(f"Error reading collection source tag: {e}")
+    
+    def has_hashed_embeddings(self):
+        """True if any stored card still has a hashed embedding from fast ingest"""
+        return bool(self.collection.get(where={'embedding': 'hashed'}, limit=1, include=[])['ids'])
+    
+    def query_embeddings(self, query, n_results, where=None):
+        """
+        Nearest cards to a query document by embedding. While fast-ingested
+        cards still have hashed embeddings, the query is embedded the same
+        way and only compared with them (the model isn't run, so no model
+        download is needed); semantic-only collections are queried through
+        Chroma's embedding model.
+        """
+        if not self.has_hashed_embeddings():
+            return self.collection.query(query_texts=[query], n_results=n_results, where=where)
+        hashed = {'embedding': 'hashed'}
+        return self.collection.query(
+            query_embeddings=self.fast_embedding_function([query]),
+            n_results=n_results,
+            where={'$and': [where, hashed]} if where else hashed
+        )
     
     def search_card(self, card_name, n_results=5):
         """Search for a card by name"""
         query = f"Card Name: {card_name}"
         
         try:
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=n_results
-            )
+            results = self.query_embeddings(query, n_results)
             
             return self.format_search_results(results)
         except Exception as e:
             print(f"Error searching for card: {e}")
             return []
     
-    def search_card_fuzzy(self, card_name, n_results=10):
+    def set_filter(self, set_name):
+        """
+        Build a Chroma `where` filter selecting the stored sets whose name
+        contains set_name, or None when there is no set filter. Returns
+        False if no stored set matches.
+        """
+        if not set_name:
+            return None
+        index = self.get_name_index()
+        set_names = index.set_names(index.resolve_sets(set_name))
+        if not set_names:
+            return False
+        return {'set_name': {'$in': set_names}}
+    
+    def search_card_fuzzy(self, card_name, n_results=10, set_name=None):
         """Search for cards with fuzzy matching"""
         normalized_name = self.normalize_card_name(card_name)
         
         try:
-            # First try exact embedding search
+            # Push the set filter down into ChromaDB
+            where = self.set_filter(set_name)
+            if where is False:
+                return []
+            
+            # First try exact embedding search; if it fails the name match below still runs
             query = f"Card Name: {card_name}"
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=n_results
-            )
+            try:
+                results = self.query_embeddings(query, n_results, where)
+            except Exception as e:
+                print(f"Error in embedding search, using name matches only: {e}")
+                results = {'ids': [[]]}
             
-            # Also try metadata filtering for normalized names
-            all_cards = self.collection.get()
+            # Also look for stored names containing the query, keeping the best few
+            index = self.get_name_index()
+            if set_name:
+                candidates = index.cards_in_sets(index.resolve_sets(set_name))
+            else:
+                candidates = index.substring_candidates(normalized_name)
+            substring_matches = top_k_scored(
+                (
+                    (self.calculate_name_similarity(normalized_name, stored_normalized, stored_name), card_id)
+                    for card_id, stored_normalized, stored_name, _ in candidates
+                    if stored_normalized and normalized_name in stored_normalized
+                ),
+                n_results
+            )
+            stored = self._get_cards_by_id([card_id for _, card_id in substring_matches]) if substring_matches else {}
             fuzzy_matches = []
             
-            for i, metadata in enumerate(all_cards['metadatas']):
-                stored_normalized = metadata.get('normalized_name', '')
-                if stored_normalized and normalized_name in stored_normalized:
+            for _, card_id in substring_matches:
+                if card_id in stored:
+                    metadata, document = stored[card_id]
                     fuzzy_matches.append({
-                        'id': all_cards['ids'][i],
+                        'id': card_id,
                         'metadata': metadata,
-                        'document': all_cards['documents'][i] if all_cards['documents'] else '',
+                        'document': document,
                         'distance': 0.5  # Assign a moderate distance for fuzzy matches
                     })
             
@@ -1048,11 +2198,7 @@ class MTGCardDatabase:
     
     def get_card_value(self, card_name, set_name=None):
         """Get the current value of a card"""
-        results = self.search_card_fuzzy(card_name)
-        
-        if set_name:
-            # Filter by set if specified
-            results = [r for r in results if set_name.lower() in r['metadata'].get('set_name', '').lower()]
+        results = self.search_card_fuzzy(card_name, set_name=set_name)
         
         if not results:
             return None
@@ -1069,8 +2215,7 @@ class MTGCardDatabase:
         }
         
         # Get all available prices
-        price_fields = ['price', 'market_price', 'low_price', 'high_price', 'average_price']
-        for field in price_fields:
+        for field in PRICE_FIELDS:
             if metadata.get(field):
                 price_info['prices'][field] = metadata[field]
         
@@ -1081,54 +2226,79 @@ class MTGCardDatabase:
         
         return price_info
     
+    def export_snapshot(self, snapshot_path=None):
+        """Write the collection to a binary catalog snapshot (see catalog_snapshot.py)"""
+        snapshot_path = snapshot_path or os.path.join(self.db_path, 'catalog.snapshot')
+        snapshot_from_collection(self.collection, snapshot_path)
+        return snapshot_path
+    
     def print_database_stats(self):
-        """Print statistics about the database"""
+        """Print statistics about the database (over every card, see catalog_analytics)"""
         count = self.collection.count()
         print(f"\n=== MTG Card Database Statistics ===")
         print(f"Total cards in database: {count}")
         
         if count > 0:
-            # Get sample of cards to show sets and price coverage
-            sample = self.collection.get(limit=min(1000, count))
-            
-            sets = set()
-            cards_with_prices = 0
-            
-            for metadata in sample['metadatas']:
-                if metadata.get('set_name'):
-                    sets.add(metadata['set_name'])
-                
-                # Check if card has any price information
-                price_fields = ['price', 'market_price', 'low_price', 'high_price', 'average_price']
-                if any(metadata.get(field) for field in price_fields):
-                    cards_with_prices += 1
+            catalog = arrays_from_collection(self.collection)
+            sets = [entry['group'] for entry in group_stats(catalog, 'set_name')]
+            price_counts = coverage(catalog)
             
             print(f"Number of sets: {len(sets)}")
-            print(f"Cards with price data: {cards_with_prices}/{len(sample['metadatas'])}")
+            print(f"Cards with price data: {price_counts['any']}/{price_counts['total']}")
             
             if sets:
-                print(f"Sample sets: {', '.join(list(sets)[:10])}")
+                print(f"Most valuable sets: {', '.join(sets[:10])}")
+    
+    def catalog_report(self, days=7, top=10):
+        """Full-catalog analytics (coverage, distributions, top movers over `days`) as a dict"""
+        catalog = arrays_from_collection(self.collection)
+        return catalog_report(catalog, self.price_history, days=days, top=top)
 
-def load_scraped_set_ids(progress_file='scraped_sets.json'):
-    """Load the set IDs that have already been scraped from a progress file."""
-    if os.path.exists(progress_file):
-        with open(progress_file, 'r', encoding='utf-8') as f:
-            try:
-                return set(json.load(f))
-            except Exception:
-                return set()
-    return set()
-
-def save_scraped_set_id(set_id, progress_file='scraped_sets.json'):
-    """Append a set ID to the progress file after scraping."""
-    scraped = load_scraped_set_ids(progress_file)
-    scraped.add(str(set_id))
-    with open(progress_file, 'w', encoding='utf-8') as f:
-        json.dump(sorted(scraped, key=int), f, indent=2)
-
-def main():
-    """Main function to scrape MTGStocks and populate ChromaDB, with resume support."""
-    db = MTGCardDatabase()
+# Page-level scrape progress (replaces scraped_sets.json, which is imported once)
+SCRAPE_JOURNAL_FILE = 'scrape_journal.sqlite3'
+# Pages journaled per commit; a crash redoes at most this many pages
+JOURNAL_COMMIT_EVERY = 1
+_scrape_journal = None
+
+def get_scrape_journal():
+    """Return the process-wide scrape journal, opening it on first use"""
+    global _scrape_journal
+    if _scrape_journal is None:
+        _scrape_journal = ScrapeJournal(SCRAPE_JOURNAL_FILE, commit_every=JOURNAL_COMMIT_EVERY)
+    return _scrape_journal
+
+def load_scraped_set_ids():
+    """Load the set IDs that have already been scraped from the scrape journal."""
+    return get_scrape_journal().completed_set_ids()
+
+def save_scraped_set_id(set_id):
+    """Mark a set as completely scraped in the scrape journal."""
+    get_scrape_journal().complete_set(set_id)
+
+# Scraped cards are appended to CARD_DATA_LOG; CARD_DATA_JSON, the legacy
+# array older consumers read, is rebuilt from it with compact_to_json
+CARD_DATA_JSON = 'mtg_cards_data.json'
+CARD_DATA_LOG = 'mtg_cards_data.jsonl'
+
+def open_card_data_log():
+    """Open the card data log for appending, importing the legacy JSON array on first use"""
+    if not os.path.exists(CARD_DATA_LOG) and os.path.exists(CARD_DATA_JSON):
+        try:
+            import_legacy_json(CARD_DATA_JSON, CARD_DATA_LOG)
+        except ValueError as e:
+            print(f"Could not import {CARD_DATA_JSON}: {e}")
+    return CardDataLog(CARD_DATA_LOG)
+
+def main(ingest_mode='semantic', sets_in_flight=None, pipeline=False, prefetch=False, source='html'):
+    """
+    Main function to scrape MTGStocks and populate ChromaDB, with resume support.
+    With sets_in_flight, sets are scraped concurrently by the async engine;
+    with pipeline, by the staged fetch/parse/write pipeline. prefetch fetches
+    the pages of each set concurrently (sequential and pipeline modes).
+    source picks the price source (see PRICE_SOURCES); the async engine and
+    the pipeline scrape HTML, so other sources always run sequentially.
+    """
+    db = MTGCardDatabase(ingest_mode=ingest_mode)
     all_sets_info = get_all_mtgstocks_set_urls()
     if not all_sets_info:
         print("No sets found to scrape.")
@@ -1157,39 +2327,108 @@ def main():
     print(f"\nScraping {num_sets} sets and storing in ChromaDB...")
     total_cards_added = 0
 
-    # Load or initialize card data file
-    card_data_json = 'mtg_cards_data.json'
-    if os.path.exists(card_data_json):
-        with open(card_data_json, 'r', encoding='utf-8') as f:
-            try:
-                all_cards_json = json.load(f)
-            except Exception:
-                all_cards_json = []
-    else:
-        all_cards_json = []
-
-    for i, set_info in enumerate(sets_to_scrape[:num_sets]):
-        print(f"\n--- Processing set {i+1}/{num_sets}: {set_info['set_name']} (ID: {set_info['set_id']}) ---")
-        cards_data = scrape_set_page(set_info['full_url'], set_info)
-        if cards_data:
-            print(f"Scraped {len(cards_data)} cards from {set_info['set_name']}")
-            db.add_cards_to_database(cards_data)
-            total_cards_added += len(cards_data)
-            print(f"Added {len(cards_data)} cards to database")
+    # Scraped cards are appended to the card data log, one commit per set (per
+    # page in sequential HTML mode); the legacy JSON array is rebuilt from it
+    # once at the end of the run
+    card_log = open_card_data_log()
+
+    def store_sets(batch):
+        """Write a batch of (set_info, cards_data) with one database call"""
+        nonlocal total_cards_added
+        for set_info, cards_data in batch:
+            if cards_data:
+                print(f"Scraped {len(cards_data)} cards from {set_info['set_name']}")
+            else:
+                print(f"No cards found for {set_info['set_name']}")
+        batch = [(set_info, cards_data) for set_info, cards_data in batch if cards_data]
+        if not batch:
+            return
+
+        write_stats = db.add_cards_to_database([card for _, cards_data in batch for card in cards_data])
+        total_cards_added += write_stats['written']
+        print(f"Wrote {write_stats['written']} cards to database ({write_stats['unchanged']} unchanged)")
+        for set_info, cards_data in batch:
+            # Save to the card data log as well
+            card_log.append_set(set_info['set_id'], cards_data)
+            print(f"Appended {len(cards_data)} cards to {CARD_DATA_LOG}")
             save_scraped_set_id(set_info['set_id'])  # Save progress
-            # Save to JSON as well
-            all_cards_json.extend(cards_data)
-            with open(card_data_json, 'w', encoding='utf-8') as f:
-                json.dump(all_cards_json, f, indent=2, ensure_ascii=False)
-            print(f"Saved {len(all_cards_json)} total cards to {card_data_json}")
+
+    def store_set(set_info, cards_data):
+        store_sets([(set_info, cards_data)])
+
+    journal = get_scrape_journal()
+
+    def scrape_set_journaled(set_info):
+        """Scrape a set page by page, ingesting and journaling each page so a crash resumes mid-set"""
+        nonlocal total_cards_added
+        set_id = set_info['set_id']
+        start_page, start_url = 1, set_info['full_url']
+        resume = journal.resume_point(set_id)
+        if resume == (None, None):
+            # Every page was ingested; only the completion mark was missing
+            journal.complete_set(set_id)
+            print(f"All pages of {set_info['set_name']} already ingested")
+            return
+        if resume:
+            start_page, start_url = resume
+            print(f"Resuming {set_info['set_name']} at page {start_page}")
+
+        interrupted = []
+        journaled = []
+        # Ids taken by the pages already ingested, so same-named cards keep their suffixes across pages
+        used_ids = journal.ingested_card_ids(set_id, before_page=start_page)
+
+        def ingest_page(page_number, url, page_cards, next_url):
+            nonlocal total_cards_added
+            write_stats = db.add_cards_to_database(page_cards, used_ids=used_ids)
+            if write_stats['failed']:
+                print(f"Failed to store page {page_number}; it will be retried on the next run")
+                interrupted.append(page_number)
+                return False
+            total_cards_added += write_stats['written']
+            card_log.append_set(set_id, page_cards, continues=page_number > 1)
+            journal.record_page(set_id, page_number, url, next_url, write_stats['ids'])
+            journaled.append(page_number)
+
+        cards_data = scrape_set_page(start_url, set_info, prefetch=prefetch, start_page=start_page,
+                                     on_page=ingest_page, on_error=lambda page, url: interrupted.append(page))
+        if interrupted:
+            print(f"{set_info['set_name']} stopped at page {interrupted[0]}; "
+                  f"the next run resumes there from the journal")
+        elif not journaled:
+            print(f"No pages of {set_info['set_name']} were stored; leaving it for the next run")
+        else:
+            journal.complete_set(set_id)
+            print(f"Stored {len(cards_data)} cards from {set_info['set_name']}")
+
+    try:
+        if source != 'html':
+            price_source = get_price_source(source, prefetch=prefetch)
+            print(f"Reading prices from the {price_source.name} source")
+            for i, set_info in enumerate(sets_to_scrape[:num_sets]):
+                print(f"\n--- Processing set {i+1}/{num_sets}: {set_info['set_name']} (ID: {set_info['set_id']}) ---")
+                store_set(set_info, price_source.fetch_set_cards(set_info))
+        elif pipeline:
+            print(f"Scraping through the fetch/parse/write pipeline "
+                  f"({mtgstocks_rate_limiter.rate:g} requests/second budget)")
+            run_scrape_pipeline(sets_to_scrape[:num_sets], store_sets, sets_in_flight or DEFAULT_SETS_IN_FLIGHT,
+                                prefetch=prefetch)
+        elif sets_in_flight:
+            print(f"Scraping up to {sets_in_flight} sets at once "
+                  f"({mtgstocks_rate_limiter.rate:g} requests/second budget)")
+            asyncio.run(scrape_sets_async(sets_to_scrape[:num_sets], store_set, sets_in_flight))
         else:
-            print(f"No cards found for {set_info['set_name']}")
-        if i < num_sets - 1:
-            print("Waiting 3 seconds before next request...")
-            time.sleep(3)
+            for i, set_info in enumerate(sets_to_scrape[:num_sets]):
+                print(f"\n--- Processing set {i+1}/{num_sets}: {set_info['set_name']} (ID: {set_info['set_id']}) ---")
+                # Request pacing comes from the shared rate limiter, no sleeps needed between sets
+                scrape_set_journaled(set_info)
+    finally:
+        card_log.close()
+        journal.flush()
+    compact_to_json(CARD_DATA_LOG, CARD_DATA_JSON)
 
     print(f"\n=== SCRAPING COMPLETE ===")
-    print(f"Total cards added to database: {total_cards_added}")
+    print(f"Total cards written to database: {total_cards_added}")
 
     # Print missing sets
     all_set_ids = set(s['set_id'] for s in all_sets_info)
@@ -1200,6 +2439,14 @@ def main():
         json.dump(missing_set_ids, f, indent=2)
     print("Missing set IDs saved to missing_sets.json")
 
+    print_http_stats()
+    set_page_cache.print_stats()
+
+    # Drop rows of re-scraped cards still stored under their pre-stable ids
+    db.remove_legacy_card_ids()
+    # Fold old price history into daily/weekly averages
+    db.price_history.rollup()
+
     db.print_database_stats()
     print(f"\n=== TESTING SEARCH FUNCTIONALITY ===")
     test_search_improved(db)
@@ -1231,9 +2478,144 @@ def test_search_improved(db):
         else:
             print("Not found")
 
+# Process-wide database handles, one per db_path, created on first use
+_shared_databases = {}
+_shared_databases_lock = threading.Lock()
+
+def get_shared_database(db_path="./mtg_cards_db"):
+    """Return the process-wide MTGCardDatabase for db_path, opening it once"""
+    db = _shared_databases.get(db_path)
+    if db is None:
+        with _shared_databases_lock:
+            db = _shared_databases.get(db_path)
+            if db is None:
+                db = MTGCardDatabase(db_path)
+                _shared_databases[db_path] = db
+    return db
+
 def get_card_price(card_name, set_name=None):
+    db = get_shared_database()
+    return db.get_card_value_cached(card_name, set_name)
+
+def get_card_prices_bulk(card_queries):
+    """Price a list of card names or (card_name, set_name) pairs, in input order"""
+    db = get_shared_database()
+    return db.get_card_values_bulk(card_queries)
+
+def get_catalog_report(days=7, top=10):
+    """Catalog analytics of the shared database as a dict (see catalog_analytics.catalog_report)"""
+    return get_shared_database().catalog_report(days=days, top=top)
+
+def get_catalog_report_text(days=7, top=10):
+    """Catalog analytics of the shared database as readable text, for the bot and the assistant"""
+    return format_report(get_catalog_report(days=days, top=top))
+
+def get_card_price_cache_stats():
+    """Hit/miss counters of the shared card price memo"""
+    return get_shared_database().value_cache.stats()
+
+# Pause between refresh rounds in refresh --loop mode
+REFRESH_LOOP_SECONDS = 900
+
+def refresh_main(hourly_request_budget=600, loop=False, source='html'):
+    """
+    Re-scrape the sets most in need of it (new, stale or volatile ones, see
+    RefreshScheduler) without exceeding hourly_request_budget requests per
+    hour. With loop, keeps refreshing as the budget frees up.
+    """
     db = MTGCardDatabase()
-    return db.get_card_value_improved(card_name, set_name)
+    scheduler = RefreshScheduler(hourly_request_budget=hourly_request_budget)
+    price_source = get_price_source(source)
+    http_stats = get_client().stats
+    card_log = open_card_data_log()
+
+    try:
+        while True:
+            requests_before = http_stats.snapshot()['requests']
+            all_sets_info = get_all_mtgstocks_set_urls()
+            scheduler.record_requests(http_stats.snapshot()['requests'] - requests_before)
+            scheduler.sync_sets(all_sets_info, load_scraped_set_ids())
+
+            planned = scheduler.plan()
+            print(f"\n=== REFRESH: {len(planned)} sets planned, "
+                  f"{scheduler.budget_remaining()} of {hourly_request_budget} requests left this hour ===")
+
+            for i, entry in enumerate(planned):
+                # Estimates can be low (new sets, sets that grew): stop once the real spend leaves too little
+                if scheduler.budget_remaining() < entry['estimated_requests']:
+                    print(f"Request budget used up after {i} of {len(planned)} planned sets")
+                    break
+                reason = 'new set' if entry['overdue'] is None else f"{entry['overdue']:.1f}x overdue"
+                print(f"\n--- Refreshing set {i+1}/{len(planned)}: {entry['set_name']} (ID: {entry['set_id']}, {reason}) ---")
+                requests_before = http_stats.snapshot()['requests']
+                try:
+                    cards_data = price_source.fetch_set_cards(entry)
+                except Exception as e:
+                    print(f"Error fetching {entry['set_name']}: {e}")
+                    cards_data = []
+                requests_used = http_stats.snapshot()['requests'] - requests_before
+
+                write_stats = db.add_cards_to_database(cards_data) if cards_data else None
+                if not cards_data or write_stats['failed']:
+                    # Charge the requests but keep the old scrape time, so the set stays due
+                    scheduler.record_failure(entry['set_id'], requests_used)
+                    print(f"Refresh of {entry['set_name']} failed ({requests_used} requests); it stays due")
+                    continue
+
+                card_log.append_set(entry['set_id'], cards_data)
+                volatility = scheduler.record_scrape(entry['set_id'], requests_used,
+                                                     write_stats['written'], write_stats['unchanged'])
+                save_scraped_set_id(entry['set_id'])
+                print(f"{write_stats['written']} cards changed, {write_stats['unchanged']} unchanged, "
+                      f"{requests_used} requests, volatility now {volatility:.2f}")
+
+            if planned:
+                compact_to_json(CARD_DATA_LOG, CARD_DATA_JSON)
+                db.remove_legacy_card_ids()
+            if not loop:
+                break
+            print(f"Next refresh round in {REFRESH_LOOP_SECONDS // 60} minutes...")
+            time.sleep(REFRESH_LOOP_SECONDS)
+    finally:
+        card_log.close()
+        scheduler.close()
+    print_http_stats()
+    set_page_cache.print_stats()
+
+def price_changes_main(consumer='cli', limit=None):
+    """Print the price changes this consumer hasn't seen yet and advance its cursor"""
+    feed_path = os.path.join("./mtg_cards_db", PRICE_CHANGE_FEED_FILE)
+    changes = read_new_changes(feed_path, consumer, limit)
+    for change in changes:
+        print(f"{change['name']} ({change['card_id']}): ${change['old_price']:.2f} -> "
+              f"${change['new_price']:.2f} ({change['delta_pct']:+.1f}%)")
+    print(f"{len(changes)} new price changes for {consumer}")
+    return changes
+
+def backfill_embeddings_main():
+    """Backfill semantic embeddings for cards ingested in fast mode."""
+    db = MTGCardDatabase()
+    updated = db.backfill_semantic_embeddings()
+    print(f"Backfill complete: {updated} cards now have semantic embeddings")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if len(sys.argv) > 1 and sys.argv[1] == 'backfill-embeddings':
+        backfill_embeddings_main()
+    elif len(sys.argv) > 1 and sys.argv[1] == 'refresh':
+        budget = int(sys.argv[sys.argv.index('--budget') + 1]) if '--budget' in sys.argv[:-1] else 600
+        refresh_main(budget, loop='--loop' in sys.argv,
+                     source=sys.argv[sys.argv.index('--source') + 1] if '--source' in sys.argv[:-1] else 'html')
+    elif len(sys.argv) > 1 and sys.argv[1] == 'price-changes':
+        price_changes_main(sys.argv[sys.argv.index('--consumer') + 1] if '--consumer' in sys.argv[:-1] else 'cli',
+                           int(sys.argv[sys.argv.index('--limit') + 1]) if '--limit' in sys.argv[:-1] else None)
+    elif len(sys.argv) > 1 and sys.argv[1] == 'benchmark-parse':
+        benchmark_page_parsing(sys.argv[2] if len(sys.argv) > 2 else SET_PAGE_CACHE_DIR)
+    else:
+        sets_in_flight = None
+        if '--concurrent' in sys.argv:
+            position = sys.argv.index('--concurrent')
+            value = sys.argv[position + 1] if position + 1 < len(sys.argv) else ''
+            sets_in_flight = int(value) if value.isdigit() else DEFAULT_SETS_IN_FLIGHT
+        main(ingest_mode='fast' if '--fast' in sys.argv else 'semantic', sets_in_flight=sets_in_flight,
+             pipeline='--pipeline' in sys.argv, prefetch='--prefetch' in sys.argv,
+             source=sys.argv[sys.argv.index('--source') + 1] if '--source' in sys.argv[:-1] else 'html')
\ No newline at end of file
@@ -0,0 +1,176 @@
+"""
+Shared HTTP client for the MTGStocks scrapers.
+
+One pooled requests.Session reuses keep-alive connections, so pages after
+the first skip the TCP/TLS handshake. It asks for compressed responses
+(gzip, plus brotli when the brotli package is installed), applies default
+timeouts and retries connection errors and 429/5xx responses a bounded
+number of times with jittered exponential backoff.
+
+Every request is counted in HTTPStats: requests, retries, errors, status
+codes, bytes on the wire vs decoded, and a latency histogram.
+print_http_stats() reports them at the end of a scrape.
+"""
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import brotli  # noqa: F401  (urllib3 decodes br responses when this is installed)
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = 'gzip, deflate, br'
+    except ImportError:
+        ACCEPT_ENCODING = 'gzip, deflate'
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# (connect, read) seconds
+DEFAULT_TIMEOUT = (10, 30)
+DEFAULT_RETRIES = 3
+RETRY_BACKOFF_SECONDS = 1.0
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, float('inf')]
+
+
+def retry_delay(attempt, base=RETRY_BACKOFF_SECONDS):
+    """Jittered exponential backoff before retry number `attempt` (0-based)"""
+    return base * 2 ** attempt * random.uniform(0.5, 1.5)
+
+
+class HTTPStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.retries = 0
+            self.errors = 0
+            self.status_codes = {}
+            self.wire_bytes = 0
+            self.decoded_bytes = 0
+            self.total_latency = 0.0
+            self.latency_histogram = [0] * len(LATENCY_BUCKETS)
+
+    def record(self, latency, response=None, retried=False):
+        """Count one request attempt (response is None for connection errors)"""
+        with self.lock:
+            self.requests += 1
+            self.retries += retried
+            self.total_latency += latency
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    self.latency_histogram[i] += 1
+                    break
+            if response is None:
+                self.errors += 1
+                return
+            self.status_codes[response.status_code] = self.status_codes.get(response.status_code, 0) + 1
+            decoded = len(response.content)
+            self.decoded_bytes += decoded
+            try:
+                # Bytes read from the socket, before gzip/br decoding
+                self.wire_bytes += response.raw.tell() or decoded
+            except (AttributeError, TypeError, ValueError):
+                self.wire_bytes += decoded
+
+    def snapshot(self):
+        """Return the counters as a plain dict"""
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'retries': self.retries,
+                'errors': self.errors,
+                'status_codes': dict(self.status_codes),
+                'wire_bytes': self.wire_bytes,
+                'decoded_bytes': self.decoded_bytes,
+                'avg_latency': self.total_latency / self.requests if self.requests else 0.0,
+                'latency_histogram': {
+                    (f"<={bound:g}s" if bound != float('inf') else f">{LATENCY_BUCKETS[-2]:g}s"): count
+                    for bound, count in zip(LATENCY_BUCKETS, self.latency_histogram)
+                },
+            }
+
+
+class ScraperHTTPClient:
+    def __init__(self, pool_size=10, retries=DEFAULT_RETRIES, timeout=DEFAULT_TIMEOUT):
+        """Pooled session with compression, default timeout and bounded retries"""
+        self.retries = retries
+        self.timeout = timeout
+        self.stats = HTTPStats()
+
+        self.session = requests.Session()
+        # Retries are handled in get() so each attempt is counted and jittered
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'User-Agent': USER_AGENT,
+            'Accept-Encoding': ACCEPT_ENCODING,
+        })
+
+    def get(self, url, retries=None, **kwargs):
+        """
+        GET url through the pooled session. Connection errors and 429/5xx
+        responses are retried up to `retries` times (pass 0 when the caller
+        runs its own backoff). Returns the last response; raises the last
+        connection error if every attempt failed to connect.
+        """
+        retries = self.retries if retries is None else retries
+        kwargs.setdefault('timeout', self.timeout)
+
+        for attempt in range(retries + 1):
+            start = time.monotonic()
+            try:
+                response = self.session.get(url, **kwargs)
+            except requests.exceptions.RequestException:
+                self.stats.record(time.monotonic() - start, retried=attempt > 0)
+                if attempt == retries:
+                    raise
+            else:
+                self.stats.record(time.monotonic() - start, response, retried=attempt > 0)
+                if response.status_code not in RETRY_STATUS_CODES or attempt == retries:
+                    return response
+            time.sleep(retry_delay(attempt))
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide scraper HTTP client, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ScraperHTTPClient()
+    return _client
+
+
+def http_get(url, retries=None, **kwargs):
+    """GET through the shared pooled client"""
+    return get_client().get(url, retries=retries, **kwargs)
+
+
+def print_http_stats():
+    """Print where scrape time and bandwidth went"""
+    stats = get_client().stats.snapshot()
+    print(f"\n=== HTTP STATS ===")
+    print(f"Requests: {stats['requests']} ({stats['retries']} retries, {stats['errors']} connection errors)")
+    print(f"Status codes: {stats['status_codes']}")
+    print(f"Bytes: {stats['wire_bytes']:,} on the wire, {stats['decoded_bytes']:,} decoded")
+    print(f"Average latency: {stats['avg_latency'] * 1000:.0f} ms")
+    print("Latency histogram: " + ', '.join(f"{bucket}: {count}" for bucket, count in stats['latency_histogram'].items()))
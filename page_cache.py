@@ -0,0 +1,151 @@
+"""
+On-disk conditional HTTP cache for scraped set pages.
+
+Each cached URL keeps its body (gzipped), the server's ETag and
+Last-Modified validators, a hash of the body and the cards already parsed
+from it. Re-scrapes send If-None-Match / If-Modified-Since; a 304 reuses
+the parsed cards without downloading or parsing the page again. Servers
+that send no validators still return the full page, but if its hash
+matches the cached body the parser is skipped.
+
+Entries record PARSER_VERSION; bump it whenever extraction output changes
+so stale parsed results are rebuilt from the cached bodies.
+"""
+import gzip
+import hashlib
+import json
+import os
+import time
+
+PARSER_VERSION = 2
+
+
+def body_hash(content):
+    """Hash of a response body, for the unchanged-page short-circuit"""
+    return hashlib.sha256(content).hexdigest()
+
+
+class PageCache:
+    def __init__(self, cache_dir='./http_cache'):
+        self.cache_dir = cache_dir
+        self.hits = {'not_modified': 0, 'unchanged_body': 0, 'parsed': 0}
+
+    def _path(self, url, suffix):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], key + suffix)
+
+    def get(self, url):
+        """Return the cache entry for url, or None"""
+        try:
+            with open(self._path(url, '.json'), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get('url') == url else None
+
+    def load_body(self, url):
+        """Return the cached body of url as text, or None"""
+        try:
+            with gzip.open(self._path(url, '.html.gz'), 'rb') as f:
+                return f.read().decode('utf-8')
+        except (OSError, EOFError):
+            return None
+
+    def conditional_headers(self, entry):
+        """Request headers that let the server answer 304 for a cached entry"""
+        headers = {}
+        # Only ask for a 304 if there is something to reuse when we get one
+        usable = entry and (entry.get('parser_version') == PARSER_VERSION
+                            or os.path.exists(self._path(entry['url'], '.html.gz')))
+        if usable:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url, response, result, content_hash=None, write_body=True):
+        """Save validators, body hash and parsed result (any JSON value) for url"""
+        json_path = self._path(url, '.json')
+        os.makedirs(os.path.dirname(json_path), exist_ok=True)
+
+        if write_body:
+            with gzip.open(self._path(url, '.html.gz'), 'wb') as f:
+                f.write(response.content)
+
+        entry = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'body_hash': content_hash or body_hash(response.content),
+            'parser_version': PARSER_VERSION,
+            'fetched_at': time.time(),
+            'result': result,
+        }
+        temp_path = json_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(temp_path, json_path)
+
+    def check(self, url, response, entry):
+        """
+        First half of resolve(): returns (cached result, None) when the
+        cached parse can be reused, (None, html) when the page must be parsed
+        (finish with store_parsed()), or (None, None) for a 304 whose cached
+        body has since disappeared.
+        """
+        current = entry is not None and entry.get('parser_version') == PARSER_VERSION
+
+        if response.status_code == 304 and entry is not None:
+            self.hits['not_modified'] += 1
+            if current:
+                return entry['result'], None
+            return None, self.load_body(url)
+
+        content_hash = body_hash(response.content)
+        if current and entry['body_hash'] == content_hash:
+            self.hits['unchanged_body'] += 1
+            self.store(url, response, entry['result'], content_hash, write_body=False)
+            return entry['result'], None
+
+        self.hits['parsed'] += 1
+        return None, response.text
+
+    def store_parsed(self, url, response, entry, result):
+        """Second half of resolve(): save the result of parsing the html check() returned"""
+        if response.status_code == 304:
+            self._refresh(url, entry, result)
+        else:
+            self.store(url, response, result)
+
+    def resolve(self, url, response, entry, parse):
+        """
+        Turn a (possibly conditional) response into a parsed result.
+
+        parse(html) is only called when the page is new or changed (or the
+        cached result came from an older parser). Returns the result, or
+        None for a 304 whose cached body has since disappeared.
+        """
+        result, html = self.check(url, response, entry)
+        if html is not None:
+            result = parse(html)
+            self.store_parsed(url, response, entry, result)
+        return result
+
+    def print_stats(self):
+        """Print how many pages were reused from the cache instead of parsed"""
+        pages = sum(self.hits.values())
+        reused = self.hits['not_modified'] + self.hits['unchanged_body']
+        print(f"\n=== SET PAGE CACHE ===")
+        print(f"Pages: {pages} ({self.hits['not_modified']} not modified, "
+              f"{self.hits['unchanged_body']} unchanged bodies, {self.hits['parsed']} parsed)")
+        print(f"Reused without parsing: {reused / pages if pages else 0:.1%}")
+
+    def _refresh(self, url, entry, result):
+        """Rewrite an entry's parsed result after re-parsing its cached body"""
+        entry = dict(entry, result=result, parser_version=PARSER_VERSION, fetched_at=time.time())
+        json_path = self._path(url, '.json')
+        temp_path = json_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(temp_path, json_path)
@@ -0,0 +1,147 @@
+"""
+Price change feed for the MTG card database.
+
+Every ingest diffs the new prices of re-scraped cards against the prices
+already stored (one vectorized pass over the whole batch) and appends the
+cards whose price moved to a JSONL feed, one line per change:
+
+    {"card_id": ..., "name": ..., "set_id": ..., "old_price": 1.5,
+     "new_price": 2.0, "delta_pct": 33.33, "ts": 1760000000.0}
+
+Downstream jobs (eBay repricing, bot alerts) read the feed through a
+FeedCursor, which remembers how far each consumer has read, so they only
+ever see new changes and never reload the catalog to compare prices.
+"""
+import json
+import os
+import time
+
+import numpy as np
+
+from card_prices import parse_price
+
+# Price compared between scrapes
+FEED_PRICE_FIELD = 'price'
+
+
+def _price_array(prices):
+    """float64 array of prices, NaN where a price is missing or not numeric"""
+    return np.fromiter((np.nan if price is None else price for price in map(parse_price, prices)),
+                       dtype=np.float64, count=len(prices))
+
+
+def diff_prices(card_ids, old_prices, new_prices, min_delta_pct=0.0):
+    """
+    Compare old and new prices of the same cards in one vectorized pass.
+
+    Returns [(card_id, old, new, delta percent)] for every card with a
+    positive old price and a new price that moved by more than
+    min_delta_pct percent. Cards without an old price (new cards) are skipped.
+    """
+    if not len(card_ids):
+        return []
+    old = _price_array(old_prices)
+    new = _price_array(new_prices)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delta_pct = (new - old) / old * 100
+    moved = (old > 0) & ~np.isnan(new) & (new != old) & (np.abs(delta_pct) > min_delta_pct)
+    return [(card_ids[i], float(old[i]), float(new[i]), round(float(delta_pct[i]), 2))
+            for i in np.flatnonzero(moved)]
+
+
+class PriceChangeFeed:
+    def __init__(self, path='price_changes.jsonl', min_delta_pct=0.0, fsync=False):
+        self.path = path
+        self.min_delta_pct = min_delta_pct
+        self.fsync = fsync
+
+    def record_changes(self, card_ids, old_prices, new_metadatas, timestamp=None):
+        """
+        Diff a batch of written cards against their previously stored prices
+        and append the changes to the feed. Returns the number appended.
+        """
+        new_prices = [metadata.get(FEED_PRICE_FIELD) for metadata in new_metadatas]
+        changes = diff_prices(card_ids, old_prices, new_prices, self.min_delta_pct)
+        if not changes:
+            return 0
+
+        ts = timestamp if timestamp is not None else time.time()
+        metadata_by_id = dict(zip(card_ids, new_metadatas))
+        lines = []
+        for card_id, old_price, new_price, delta_pct in changes:
+            metadata = metadata_by_id[card_id]
+            lines.append(json.dumps({
+                'card_id': card_id,
+                'name': metadata.get('name', ''),
+                'set_id': metadata.get('set_id', ''),
+                'old_price': old_price,
+                'new_price': new_price,
+                'delta_pct': delta_pct,
+                'ts': ts,
+            }, ensure_ascii=False))
+
+        # One write per batch, so a crash can leave at most one torn line
+        with open(self.path, 'ab') as f:
+            f.write(('\n'.join(lines) + '\n').encode('utf-8'))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        return len(lines)
+
+
+class FeedCursor:
+    def __init__(self, feed_path, consumer):
+        """Read position of one consumer in a feed, kept in <feed>.<consumer>.cursor"""
+        self.feed_path = feed_path
+        self.cursor_path = f"{feed_path}.{consumer}.cursor"
+        self.offset = self._load_offset()
+        self.pending_offset = self.offset
+
+    def _load_offset(self):
+        try:
+            with open(self.cursor_path, 'r', encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def read(self, limit=None):
+        """
+        Return the changes appended since the last commit(), oldest first
+        (at most limit). A torn final line is left for the next read.
+        """
+        if not os.path.exists(self.feed_path):
+            return []
+        if os.path.getsize(self.feed_path) < self.offset:
+            # The feed was truncated or replaced: start over
+            self.offset = 0
+
+        changes = []
+        position = self.offset
+        with open(self.feed_path, 'rb') as f:
+            f.seek(self.offset)
+            for line in f:
+                if not line.endswith(b'\n') or (limit is not None and len(changes) >= limit):
+                    break
+                position += len(line)
+                try:
+                    changes.append(json.loads(line))
+                except ValueError:
+                    print(f"Skipping unreadable line in {self.feed_path}")
+        self.pending_offset = position
+        return changes
+
+    def commit(self):
+        """Mark everything returned by read() as consumed"""
+        temp_path = self.cursor_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(str(self.pending_offset))
+        os.replace(temp_path, self.cursor_path)
+        self.offset = self.pending_offset
+
+
+def read_new_changes(feed_path, consumer, limit=None):
+    """Read and commit the changes a consumer hasn't seen yet"""
+    cursor = FeedCursor(feed_path, consumer)
+    changes = cursor.read(limit)
+    cursor.commit()
+    return changes
@@ -0,0 +1,204 @@
+"""
+Append-only price history for the MTG card database.
+
+Every time a card's prices are written to ChromaDB a row is appended here
+(SQLite, next to the Chroma files), so old prices survive re-scrapes.
+Recent points stay raw; rollup() folds older points into daily and then
+weekly averages to keep the table small. Queries answer price-at-time,
+min/max/average over a window and percent change without re-scraping.
+"""
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from card_prices import PRICE_FIELDS, parse_price
+
+# Columns of the history table; the same fields the card database stores
+HISTORY_PRICE_FIELDS = PRICE_FIELDS
+
+DAY_SECONDS = 86400
+WEEK_SECONDS = 7 * DAY_SECONDS
+
+# Bucket sizes used by rollup(); raw points have no bucket size
+BUCKET_SECONDS = {'day': DAY_SECONDS, 'week': WEEK_SECONDS}
+
+
+def to_timestamp(value):
+    """Convert a datetime, ISO date string or number to unix seconds"""
+    if value is None:
+        return time.time()
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).timestamp()
+    return float(value)
+
+
+class PriceHistoryStore:
+    def __init__(self, db_file):
+        """Open (or create) the price history database at db_file"""
+        self.db_file = db_file
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        columns = ', '.join(f"{field} REAL" for field in HISTORY_PRICE_FIELDS)
+        self.conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS price_points (
+                card_id TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                ts REAL NOT NULL,
+                samples INTEGER NOT NULL DEFAULT 1,
+                {columns},
+                PRIMARY KEY (card_id, bucket, ts)
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS price_points_card_ts ON price_points (card_id, ts)")
+        self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def record_prices(self, cards, timestamp=None):
+        """
+        Append one raw price point per card.
+
+        cards is an iterable of (card_id, metadata) pairs; price fields are
+        read from the metadata dict. Returns the number of points written.
+        """
+        ts = to_timestamp(timestamp)
+        rows = []
+        for card_id, metadata in cards:
+            prices = [parse_price(metadata.get(field)) for field in HISTORY_PRICE_FIELDS]
+            if any(price is not None for price in prices):
+                rows.append((card_id, 'raw', ts, 1, *prices))
+
+        if not rows:
+            return 0
+
+        placeholders = ', '.join('?' * (4 + len(HISTORY_PRICE_FIELDS)))
+        with self.lock:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO price_points VALUES ({placeholders})", rows
+            )
+            self.conn.commit()
+        return len(rows)
+
+    def _roll_up(self, source_bucket, target_bucket, cutoff):
+        """Fold source_bucket points older than cutoff into target_bucket averages"""
+        size = BUCKET_SECONDS[target_bucket]
+        averages = ', '.join(
+            f"SUM({field} * samples) / SUM(CASE WHEN {field} IS NOT NULL THEN samples END)"
+            for field in HISTORY_PRICE_FIELDS
+        )
+        updates = ', '.join(
+            f"{field} = (COALESCE(price_points.{field}, 0) * price_points.samples"
+            f" + COALESCE(excluded.{field}, 0) * excluded.samples)"
+            f" / NULLIF((price_points.{field} IS NOT NULL) * price_points.samples"
+            f" + (excluded.{field} IS NOT NULL) * excluded.samples, 0)"
+            for field in HISTORY_PRICE_FIELDS
+        )
+        self.conn.execute(f"""
+            INSERT INTO price_points
+            SELECT card_id, ?, CAST(ts / ? AS INTEGER) * ?, SUM(samples), {averages}
+            FROM price_points
+            WHERE bucket = ? AND ts < ?
+            GROUP BY card_id, CAST(ts / ? AS INTEGER)
+            ON CONFLICT (card_id, bucket, ts) DO UPDATE SET
+                {updates},
+                samples = price_points.samples + excluded.samples
+        """, (target_bucket, size, size, source_bucket, cutoff, size))
+        deleted = self.conn.execute(
+            "DELETE FROM price_points WHERE bucket = ? AND ts < ?", (source_bucket, cutoff)
+        ).rowcount
+        return deleted
+
+    def rollup(self, raw_days=30, daily_days=365, now=None):
+        """
+        Compact old history: raw points older than raw_days become daily
+        averages, daily points older than daily_days become weekly averages.
+        Only whole days/weeks are rolled up. Returns the number of rows folded.
+        """
+        now = to_timestamp(now)
+        raw_cutoff = (now - raw_days * DAY_SECONDS) // DAY_SECONDS * DAY_SECONDS
+        daily_cutoff = (now - daily_days * DAY_SECONDS) // WEEK_SECONDS * WEEK_SECONDS
+
+        with self.lock:
+            folded = self._roll_up('raw', 'day', raw_cutoff)
+            folded += self._roll_up('day', 'week', daily_cutoff)
+            self.conn.commit()
+        print(f"Price history rollup folded {folded} points")
+        return folded
+
+    def history(self, card_id, start=None, end=None, field='price'):
+        """Return [(timestamp, price, bucket)] for a card, oldest first"""
+        start = to_timestamp(start) if start is not None else 0
+        end = to_timestamp(end)
+        with self.lock:
+            return self.conn.execute(f"""
+                SELECT ts, {self._column(field)}, bucket FROM price_points
+                WHERE card_id = ? AND ts >= ? AND ts <= ? AND {self._column(field)} IS NOT NULL
+                ORDER BY ts
+            """, (card_id, start, end)).fetchall()
+
+    def price_at(self, card_id, when=None, field='price'):
+        """Return the card's most recent recorded price at or before `when`"""
+        with self.lock:
+            row = self.conn.execute(f"""
+                SELECT {self._column(field)} FROM price_points
+                WHERE card_id = ? AND ts <= ? AND {self._column(field)} IS NOT NULL
+                ORDER BY ts DESC LIMIT 1
+            """, (card_id, to_timestamp(when))).fetchone()
+        return row[0] if row else None
+
+    def prices_at(self, when=None, field='price'):
+        """Return {card_id: most recent price at or before `when`} for every card, in one query"""
+        column = self._column(field)
+        with self.lock:
+            # SQLite takes the bare column from the row that holds MAX(ts)
+            rows = self.conn.execute(f"""
+                SELECT card_id, {column}, MAX(ts) FROM price_points
+                WHERE ts <= ? AND {column} IS NOT NULL
+                GROUP BY card_id
+            """, (to_timestamp(when),)).fetchall()
+        return {card_id: price for card_id, price, _ in rows}
+
+    def window_stats(self, card_id, start, end=None, field='price'):
+        """
+        Return min/max and the average sample (sample_avg) of a price field
+        between start and end. Rolled-up points contribute their bucket
+        average, weighted by sample count. sample_avg is not time-weighted:
+        a stretch of frequent scrapes counts for more than a quiet one.
+        """
+        column = self._column(field)
+        with self.lock:
+            row = self.conn.execute(f"""
+                SELECT MIN({column}), MAX({column}),
+                       SUM({column} * samples) / SUM(samples), COUNT(*)
+                FROM price_points
+                WHERE card_id = ? AND ts >= ? AND ts <= ? AND {column} IS NOT NULL
+            """, (card_id, to_timestamp(start), to_timestamp(end))).fetchone()
+        if not row or not row[3]:
+            return None
+        return {'min': row[0], 'max': row[1], 'sample_avg': row[2], 'points': row[3]}
+
+    def percent_change(self, card_id, start, end=None, field='price'):
+        """
+        Percent change of a price field between start and end. If the card
+        has no price recorded before start, its first price in the window is
+        used as the baseline. Returns None if unknown.
+        """
+        old_price = self.price_at(card_id, start, field)
+        if old_price is None:
+            first_points = self.history(card_id, start, end, field)
+            old_price = first_points[0][1] if first_points else None
+        new_price = self.price_at(card_id, end, field)
+        if not old_price or new_price is None:
+            return None
+        return (new_price - old_price) / old_price * 100
+
+    def _column(self, field):
+        if field not in HISTORY_PRICE_FIELDS:
+            raise ValueError(f"Unknown price field: {field}")
+        return field
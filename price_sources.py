@@ -0,0 +1,175 @@
+"""
+Pluggable card price sources for the MTGStocks scraper.
+
+A price source turns a set (the set_info dicts from
+get_all_mtgstocks_set_urls) into card dicts in the layout
+MTGCardDatabase.add_cards_to_database expects.
+
+    JSONAPIPriceSource   reads the set's prints from api.mtgstocks.com and
+                         maps them to typed price fields (floats), no HTML
+    HTMLPriceSource      wraps the rendered-page scraper (scrape_set_page)
+    FallbackPriceSource  tries one source and falls back to another when it
+                         fails or returns no cards
+
+The JSON source fetches through the shared mtgstocks_http client, so it
+runs against recorded responses by mounting an http_fixtures ReplayAdapter
+on that client (use_transport); fetch_json(url) replaces the fetcher.
+"""
+import re
+
+from mtgstocks_http import http_get
+
+MTGSTOCKS_API_URL = "https://api.mtgstocks.com"
+MTGSTOCKS_SITE_URL = "https://www.mtgstocks.com"
+# Returns the set with its prints and their latest prices
+SET_PRINTS_ENDPOINT = "/card_sets/{set_id}"
+
+RARITY_NAMES = {
+    'C': 'Common',
+    'U': 'Uncommon',
+    'R': 'Rare',
+    'M': 'Mythic',
+    'S': 'Special',
+    'L': 'Land',
+    'T': 'Token',
+}
+
+# card field -> keys the API has used for it in a print's latest price
+API_PRICE_KEYS = {
+    'market_price': ('market',),
+    'average_price': ('avg', 'average'),
+    'low_price': ('low',),
+    'high_price': ('high',),
+}
+
+# Keys of an API latest price tried in order for the headline price: the
+# average, else the market price (the sealed price lookup uses the same order)
+HEADLINE_PRICE_KEYS = API_PRICE_KEYS['average_price'] + API_PRICE_KEYS['market_price']
+
+
+def fetch_api_json(url):
+    """
+    Default fetcher: GET url through the shared HTTP client and decode JSON.
+    It doesn't rate limit or retry; the scraper passes fetch_mtgstocks_json,
+    which does both within the shared mtgstocks.com budget.
+    """
+    response = http_get(url, retries=0, headers={'Accept': 'application/json'})
+    response.raise_for_status()
+    return response.json()
+
+
+def _to_float(value):
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return None
+    return price if price > 0 else None
+
+
+def headline_price(latest):
+    """Headline price of an API latest-price object (see HEADLINE_PRICE_KEYS), or None"""
+    for key in HEADLINE_PRICE_KEYS:
+        price = _to_float(latest.get(key))
+        if price is not None:
+            return price
+    return None
+
+
+def _slugify(name):
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+def print_to_card(print_data, set_info):
+    """Map one API print to a card dict with float prices; None if it has no name"""
+    name = (print_data.get('name') or '').strip()
+    if not name:
+        return None
+
+    card = {
+        'name': name,
+        'set_id': str(set_info['set_id']),
+        'set_name': set_info['set_name'],
+        'price_source': 'api',
+    }
+
+    rarity = print_data.get('rarity')
+    if rarity:
+        card['rarity'] = RARITY_NAMES.get(rarity, rarity)
+
+    print_id = print_data.get('id')
+    if print_id is not None:
+        # Same URL form as the HTML scraper, so both sources give a card the same id
+        slug = print_data.get('slug') or _slugify(name)
+        card['card_url'] = f"{MTGSTOCKS_SITE_URL}/prints/{print_id}-{slug}"
+
+    latest = print_data.get('latest_price') or print_data.get('latestPrice') or {}
+    for field, keys in API_PRICE_KEYS.items():
+        for key in keys:
+            price = _to_float(latest.get(key))
+            if price is not None:
+                card[field] = price
+                break
+
+    headline = headline_price(latest)
+    if headline is not None:
+        card['price'] = headline
+    return card
+
+
+def prints_from_response(data):
+    """The list of prints in a set response (a set object or a bare list)"""
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        return data.get('prints') or data.get('cards') or []
+    return []
+
+
+class JSONAPIPriceSource:
+    name = 'api'
+
+    def __init__(self, fetch_json=None, base_url=MTGSTOCKS_API_URL):
+        self.fetch_json = fetch_json or fetch_api_json
+        self.base_url = base_url
+
+    def set_url(self, set_info):
+        return self.base_url + SET_PRINTS_ENDPOINT.format(set_id=set_info['set_id'])
+
+    def fetch_set_cards(self, set_info):
+        """Return the set's cards from the JSON API"""
+        url = self.set_url(set_info)
+        print(f"\nFetching set prices from API: {url}")
+        data = self.fetch_json(url)
+        cards = [card for card in (print_to_card(p, set_info) for p in prints_from_response(data)) if card]
+        print(f"Got {len(cards)} cards from the API for {set_info['set_name']}")
+        return cards
+
+
+class HTMLPriceSource:
+    name = 'html'
+
+    def __init__(self, scrape_set):
+        """scrape_set(set_url, set_info) -> cards, e.g. scrape_set_page"""
+        self.scrape_set = scrape_set
+
+    def fetch_set_cards(self, set_info):
+        return self.scrape_set(set_info['full_url'], set_info)
+
+
+class FallbackPriceSource:
+    def __init__(self, primary, fallback):
+        self.primary = primary
+        self.fallback = fallback
+        self.name = f"{primary.name}+{fallback.name}"
+
+    def fetch_set_cards(self, set_info):
+        try:
+            cards = self.primary.fetch_set_cards(set_info)
+        except Exception as e:
+            print(f"{self.primary.name} source failed for {set_info['set_name']}: {e}")
+            cards = []
+        if cards:
+            return cards
+        print(f"Falling back to the {self.fallback.name} source for {set_info['set_name']}")
+        return self.fallback.fetch_set_cards(set_info)
+
@@ -0,0 +1,111 @@
+"""
+Rate limiting shared by the MTGStocks scrapers.
+
+TokenBucket spaces requests to a host at a steady rate with a small burst
+allowance. It is thread-safe and can be awaited from asyncio code, so
+threaded and async scrapers can share one politeness budget.
+AdaptiveBackoff slows the bucket down and pauses all traffic when the
+server answers 429/5xx, then speeds back up as requests succeed.
+"""
+import asyncio
+import random
+import threading
+import time
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        """Allow `rate` requests per second on average, with bursts of up to `capacity`"""
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """Take tokens now and return how many seconds the caller must wait before using them"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            # Tokens may go negative: later callers queue behind earlier ones
+            self.tokens -= tokens
+            return max(0.0, -self.tokens / self.rate)
+
+    def acquire(self, tokens=1):
+        """Block the calling thread until the tokens are available"""
+        wait = self.reserve(tokens)
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens=1):
+        """Wait (without blocking the event loop) until the tokens are available"""
+        wait = self.reserve(tokens)
+        if wait:
+            await asyncio.sleep(wait)
+
+    def set_rate(self, rate):
+        with self.lock:
+            self.rate = float(rate)
+
+
+class AdaptiveBackoff:
+    def __init__(self, bucket, min_rate=None, max_rate=None, base_delay=2.0, max_delay=300.0):
+        """
+        Adapt `bucket`'s rate to server pushback: each 429/5xx halves the
+        rate (down to min_rate) and pauses all requests for an exponentially
+        growing delay; each success raises the rate back toward max_rate.
+        """
+        self.bucket = bucket
+        self.max_rate = max_rate if max_rate is not None else bucket.rate
+        self.min_rate = min_rate if min_rate is not None else self.max_rate / 16
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.consecutive_failures = 0
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def failure(self, retry_after=None):
+        """Record a throttled/failed response; returns the pause applied"""
+        with self.lock:
+            self.consecutive_failures += 1
+            delay = min(self.max_delay, self.base_delay * 2 ** (self.consecutive_failures - 1))
+            if retry_after:
+                delay = max(delay, min(self.max_delay, float(retry_after)))
+            # Jitter so concurrent workers don't all resume at the same instant
+            delay *= random.uniform(0.8, 1.2)
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+            self.bucket.set_rate(max(self.min_rate, self.bucket.rate / 2))
+            return delay
+
+    def success(self):
+        """Record a successful response"""
+        with self.lock:
+            self.consecutive_failures = 0
+            if self.bucket.rate < self.max_rate:
+                self.bucket.set_rate(min(self.max_rate, self.bucket.rate * 1.1))
+
+    def pause_remaining(self):
+        return max(0.0, self.paused_until - time.monotonic())
+
+    def wait(self):
+        """Block while a backoff pause is in effect"""
+        remaining = self.pause_remaining()
+        if remaining:
+            time.sleep(remaining)
+
+    async def wait_async(self):
+        """Wait out any backoff pause without blocking the event loop"""
+        remaining = self.pause_remaining()
+        while remaining:
+            await asyncio.sleep(remaining)
+            remaining = self.pause_remaining()
+
+
+def parse_retry_after(response):
+    """Seconds from a Retry-After header, or None"""
+    value = response.headers.get('Retry-After') if response is not None else None
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
@@ -0,0 +1,203 @@
+"""
+Staleness-driven refresh scheduling for scraped sets.
+
+Keeps per-set state in SQLite: when the set was last scraped, when its
+prices last changed, how volatile they are (a moving average of the
+share of cards whose prices changed per scrape) and how many requests a
+scrape of it costs. plan() picks the sets to re-scrape next:
+
+  * sets that have never been scraped come first, newest set ids first
+  * other sets are due once their age exceeds a refresh interval that
+    shrinks from MAX_REFRESH_HOURS (prices never move) to
+    MIN_REFRESH_HOURS (every card changes on every scrape), most overdue first
+
+and keeps the total within an hourly request budget, so the price
+database stays fresh without full-catalog crawls.
+"""
+import sqlite3
+import threading
+import time
+
+HOUR_SECONDS = 3600
+
+MIN_REFRESH_HOURS = 6
+MAX_REFRESH_HOURS = 7 * 24
+# Weight of the latest scrape in the volatility moving average
+VOLATILITY_ALPHA = 0.3
+# Request cost assumed for a set that hasn't been scraped yet. Deliberately
+# high (large sets take many pages, plus retries); after its first scrape a
+# set is planned with its measured cost
+DEFAULT_SET_REQUESTS = 10
+
+
+class RefreshScheduler:
+    def __init__(self, db_file='refresh_state.sqlite3', hourly_request_budget=600):
+        self.db_file = db_file
+        self.hourly_request_budget = hourly_request_budget
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS set_state (
+                set_id TEXT PRIMARY KEY,
+                set_name TEXT,
+                full_url TEXT,
+                last_scraped REAL,
+                last_changed REAL,
+                volatility REAL NOT NULL DEFAULT 0,
+                scrapes INTEGER NOT NULL DEFAULT 0,
+                last_requests INTEGER
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS request_log (
+                ts REAL NOT NULL,
+                requests INTEGER NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def sync_sets(self, sets_info, scraped_set_ids=()):
+        """
+        Add newly listed sets and refresh names/URLs of known ones. Sets in
+        scraped_set_ids (e.g. from scraped_sets.json) that the scheduler
+        hasn't seen count as scraped at an unknown time: they are not
+        treated as new, but are the first to become due.
+        """
+        scraped_set_ids = {str(set_id) for set_id in scraped_set_ids}
+        with self.lock:
+            for set_info in sets_info:
+                set_id = str(set_info['set_id'])
+                self.conn.execute("""
+                    INSERT INTO set_state (set_id, set_name, full_url, last_scraped)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (set_id) DO UPDATE SET
+                        set_name = excluded.set_name, full_url = excluded.full_url
+                """, (set_id, set_info['set_name'], set_info['full_url'],
+                      0.0 if set_id in scraped_set_ids else None))
+            self.conn.commit()
+
+    def refresh_interval(self, volatility):
+        """Seconds between refreshes of a set with the given volatility (0-1)"""
+        volatility = min(1.0, max(0.0, volatility))
+        hours = MAX_REFRESH_HOURS - (MAX_REFRESH_HOURS - MIN_REFRESH_HOURS) * volatility
+        return hours * HOUR_SECONDS
+
+    def requests_spent(self, now=None):
+        """Requests recorded in the last hour"""
+        now = now if now is not None else time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT COALESCE(SUM(requests), 0) FROM request_log WHERE ts > ?", (now - HOUR_SECONDS,)
+            ).fetchone()
+        return row[0]
+
+    def budget_remaining(self, now=None):
+        return max(0, self.hourly_request_budget - self.requests_spent(now))
+
+    def due_sets(self, now=None):
+        """
+        All sets due for a scrape, highest priority first, as dicts with
+        set_id, set_name, full_url, estimated_requests and overdue (age /
+        refresh interval; None for never-scraped sets).
+        """
+        now = now if now is not None else time.time()
+        with self.lock:
+            rows = self.conn.execute("""
+                SELECT set_id, set_name, full_url, last_scraped, volatility, last_requests
+                FROM set_state
+            """).fetchall()
+
+        new_sets = []
+        stale_sets = []
+        for set_id, set_name, full_url, last_scraped, volatility, last_requests in rows:
+            entry = {
+                'set_id': set_id,
+                'set_name': set_name,
+                'full_url': full_url,
+                'estimated_requests': last_requests or DEFAULT_SET_REQUESTS,
+            }
+            if last_scraped is None:
+                entry['overdue'] = None
+                new_sets.append(entry)
+                continue
+            overdue = (now - last_scraped) / self.refresh_interval(volatility)
+            if overdue >= 1:
+                entry['overdue'] = overdue
+                stale_sets.append(entry)
+
+        new_sets.sort(key=lambda entry: int(entry['set_id']) if entry['set_id'].isdigit() else 0, reverse=True)
+        stale_sets.sort(key=lambda entry: entry['overdue'], reverse=True)
+        return new_sets + stale_sets
+
+    def plan(self, now=None, budget=None):
+        """Due sets, in priority order, whose estimated cost fits in the remaining hourly budget"""
+        budget = self.budget_remaining(now) if budget is None else budget
+        planned = []
+        for entry in self.due_sets(now):
+            if entry['estimated_requests'] > budget:
+                # Keep priority order: don't let cheap low-priority sets jump ahead
+                break
+            planned.append(entry)
+            budget -= entry['estimated_requests']
+        return planned
+
+    def record_requests(self, requests, now=None):
+        """Charge requests not tied to a set (e.g. the set listing) to the budget"""
+        with self.lock:
+            self.conn.execute("INSERT INTO request_log VALUES (?, ?)",
+                              (now if now is not None else time.time(), requests))
+            self.conn.commit()
+
+    def record_scrape(self, set_id, requests, written, unchanged, now=None):
+        """
+        Record a finished scrape of a set: its request cost and how many
+        cards changed (written) vs stayed the same (unchanged).
+        """
+        now = now if now is not None else time.time()
+        total = written + unchanged
+        change_ratio = written / total if total else 0.0
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT volatility, scrapes FROM set_state WHERE set_id = ?", (str(set_id),)
+            ).fetchone()
+            volatility, scrapes = row if row else (0.0, 0)
+            if scrapes:
+                volatility = VOLATILITY_ALPHA * change_ratio + (1 - VOLATILITY_ALPHA) * volatility
+            else:
+                # The first scrape writes every card; it says nothing about volatility
+                volatility = 0.0
+            self.conn.execute("""
+                INSERT INTO set_state (set_id, last_scraped, last_changed, volatility, scrapes, last_requests)
+                VALUES (?, ?, ?, ?, 1, ?)
+                ON CONFLICT (set_id) DO UPDATE SET
+                    last_scraped = excluded.last_scraped,
+                    last_changed = COALESCE(excluded.last_changed, set_state.last_changed),
+                    volatility = excluded.volatility,
+                    scrapes = set_state.scrapes + 1,
+                    last_requests = excluded.last_requests
+            """, (str(set_id), now, now if written else None, volatility, requests))
+            self.conn.execute("INSERT INTO request_log VALUES (?, ?)", (now, requests))
+            self.conn.execute("DELETE FROM request_log WHERE ts < ?", (now - 24 * HOUR_SECONDS,))
+            self.conn.commit()
+        return volatility
+
+    def record_failure(self, set_id, requests, now=None):
+        """
+        Record a scrape of a set that fetched or stored nothing: its requests
+        count against the budget, but the set keeps its last scrape time and
+        volatility, so it stays due.
+        """
+        self.record_requests(requests, now)
+
+    def set_state(self, set_id):
+        """Stored state of one set as a dict, or None"""
+        with self.lock:
+            cursor = self.conn.execute("SELECT * FROM set_state WHERE set_id = ?", (str(set_id),))
+            row = cursor.fetchone()
+            columns = [description[0] for description in cursor.description]
+        return dict(zip(columns, row)) if row else None
@@ -0,0 +1,162 @@
+"""
+Crash-safe, page-level scrape journal.
+
+Replaces the scraped_sets.json progress file (which was re-read and
+rewritten after every set) with a SQLite write-ahead journal of:
+
+    pages            every completed page of a set: its URL, the next
+                     page URL and how many cards it held
+    ingested_cards   the ids of the cards each page wrote to the database
+    completed_sets   sets whose last page has been reached
+
+A scrape interrupted on page 9 of a set resumes at page 9, not page 1.
+Durability is tunable: commit_every batches that many pages per commit
+(a crash redoes at most that many pages) and synchronous sets SQLite's
+fsync policy ('FULL' fsyncs every commit, 'NORMAL' only at WAL checkpoints).
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class ScrapeJournal:
+    def __init__(self, db_file='scrape_journal.sqlite3', commit_every=1, synchronous='FULL',
+                 legacy_progress_file='scraped_sets.json'):
+        """Open (or create) the journal, importing a legacy progress file the first time"""
+        if synchronous not in ('OFF', 'NORMAL', 'FULL', 'EXTRA'):
+            raise ValueError(f"Unknown synchronous mode: {synchronous}")
+        self.db_file = db_file
+        self.commit_every = max(1, commit_every)
+        self.pending_pages = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(f"PRAGMA synchronous={synchronous}")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                set_id TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                next_url TEXT,
+                cards INTEGER NOT NULL,
+                completed_at REAL NOT NULL,
+                PRIMARY KEY (set_id, page)
+            );
+            CREATE TABLE IF NOT EXISTS ingested_cards (
+                card_id TEXT NOT NULL,
+                set_id TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                PRIMARY KEY (card_id, set_id)
+            );
+            CREATE TABLE IF NOT EXISTS completed_sets (
+                set_id TEXT PRIMARY KEY,
+                pages INTEGER NOT NULL,
+                cards INTEGER NOT NULL,
+                completed_at REAL NOT NULL
+            );
+        """)
+        self.conn.commit()
+
+        if legacy_progress_file and os.path.exists(legacy_progress_file) and not self.completed_set_ids():
+            self.import_legacy_progress(legacy_progress_file)
+
+    def import_legacy_progress(self, progress_file):
+        """Mark the set ids listed in a scraped_sets.json file as completed"""
+        try:
+            with open(progress_file, 'r', encoding='utf-8') as f:
+                set_ids = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO completed_sets VALUES (?, 0, 0, ?)",
+                [(str(set_id), time.time()) for set_id in set_ids]
+            )
+            self.conn.commit()
+        print(f"Imported {len(set_ids)} completed sets from {progress_file}")
+        return len(set_ids)
+
+    def _commit_if_due(self, force=False):
+        self.pending_pages += 1
+        if force or self.pending_pages >= self.commit_every:
+            self.conn.commit()
+            self.pending_pages = 0
+
+    def record_page(self, set_id, page, url, next_url, card_ids=()):
+        """Journal a page whose cards have been ingested"""
+        set_id = str(set_id)
+        card_ids = list(card_ids)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                (set_id, page, url, next_url, len(card_ids), time.time())
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO ingested_cards VALUES (?, ?, ?)",
+                [(card_id, set_id, page) for card_id in card_ids]
+            )
+            self._commit_if_due()
+
+    def complete_set(self, set_id):
+        """Mark a set as fully scraped (always committed immediately)"""
+        set_id = str(set_id)
+        with self.lock:
+            pages, cards = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(cards), 0) FROM pages WHERE set_id = ?", (set_id,)
+            ).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO completed_sets VALUES (?, ?, ?, ?)",
+                (set_id, pages, cards, time.time())
+            )
+            self._commit_if_due(force=True)
+
+    def restart_set(self, set_id):
+        """Forget a set's pages and completion so it is scraped again from page 1"""
+        set_id = str(set_id)
+        with self.lock:
+            self.conn.execute("DELETE FROM pages WHERE set_id = ?", (set_id,))
+            self.conn.execute("DELETE FROM ingested_cards WHERE set_id = ?", (set_id,))
+            self.conn.execute("DELETE FROM completed_sets WHERE set_id = ?", (set_id,))
+            self.conn.commit()
+
+    def completed_set_ids(self):
+        with self.lock:
+            return {row[0] for row in self.conn.execute("SELECT set_id FROM completed_sets")}
+
+    def resume_point(self, set_id):
+        """
+        Where to continue an unfinished set: (page number, URL) of the first
+        page not yet journaled, or None if the set has no journaled pages.
+        Returns (None, None) if the last journaled page had no next page.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT page, next_url FROM pages WHERE set_id = ? ORDER BY page DESC LIMIT 1", (str(set_id),)
+            ).fetchone()
+        if row is None:
+            return None
+        page, next_url = row
+        return (page + 1, next_url) if next_url else (None, None)
+
+    def ingested_card_ids(self, set_id, before_page=None):
+        """Ids of the cards ingested for a set (only from pages before before_page, if given)"""
+        query = "SELECT card_id FROM ingested_cards WHERE set_id = ?"
+        params = [str(set_id)]
+        if before_page is not None:
+            query += " AND page < ?"
+            params.append(before_page)
+        with self.lock:
+            return {row[0] for row in self.conn.execute(query, params)}
+
+    def flush(self):
+        """Commit any pages still waiting for a batched commit"""
+        with self.lock:
+            self.conn.commit()
+            self.pending_pages = 0
+
+    def close(self):
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
@@ -0,0 +1,205 @@
+"""
+Offline benchmark suite for the MTGStocks scrapers.
+
+Runs a fixed workload through the scrapers:
+
+    set listing    get_all_mtgstocks_set_urls
+    set pages      scrape_set_page over the first --sets sets (up to --pages pages each)
+    image pages    MTGCardImageScraper.get_image_url_from_page for the first --images cards
+    sealed prices  scrape_mtgstocks_sealed_prices (skipped if selenium isn't installed)
+    ingest         MTGCardDatabase.add_cards_to_database of every scraped card (fast mode)
+
+and reports pages/sec, parse ms/page, cards/sec and ingest rows/sec.
+
+    python scraper_benchmark.py record fixtures/ [--sets N] [--pages N] [--images N]
+        runs the workload against the live site, recording every response
+    python scraper_benchmark.py run fixtures/ [--latency SECONDS] [--jitter SECONDS] [--sets N] ...
+        replays the recorded responses with the given per-request latency
+
+Replayed runs make no network requests and aren't rate limited, so
+before/after numbers of a scraper change are directly comparable. Use the
+same --sets/--pages/--images for run as for record.
+"""
+import contextlib
+import io
+import shutil
+import sys
+import tempfile
+import time
+
+from http_fixtures import RecordingAdapter, ReplayAdapter, use_transport
+
+DEFAULT_SETS = 3
+DEFAULT_PAGES = 5
+DEFAULT_IMAGES = 20
+# Request budget while replaying: effectively unlimited
+REPLAY_REQUESTS_PER_SECOND = 1000
+
+
+def _rate(count, seconds):
+    return count / seconds if seconds else 0.0
+
+
+def run_workload(max_sets=DEFAULT_SETS, max_pages=DEFAULT_PAGES, max_images=DEFAULT_IMAGES, ingest=True,
+                 transport=None):
+    """
+    Run the benchmark workload and return the measurements. With a transport
+    adapter, every request of the workload goes through it (it is mounted on
+    the shared client and the image scraper's session); otherwise requests
+    go to the network.
+    """
+    import mtgstocksPriceDatabasescraper as scraper
+    from image_scraper import MTGCardImageScraper
+    from mtgstocks_http import get_client
+    from page_cache import PageCache
+
+    results = {}
+    work_dir = tempfile.mkdtemp(prefix='scraper_benchmark_')
+    # A fresh page cache, so every page is fetched and parsed
+    original_cache = scraper.set_page_cache
+    scraper.set_page_cache = PageCache(f"{work_dir}/http_cache")
+    get_client().stats.reset()
+
+    parse_seconds = []
+
+    def timed_parse(html, set_info, url):
+        start = time.perf_counter()
+        result = scraper.parse_set_page(html, set_info, url)
+        parse_seconds.append(time.perf_counter() - start)
+        return result
+
+    try:
+        image_scraper = MTGCardImageScraper(None, output_dir=f"{work_dir}/images")
+        sessions = [get_client().session, image_scraper.session]
+        # The scrapers print progress for every page; keep it out of the report
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+            if transport is not None:
+                stack.enter_context(use_transport(transport, sessions))
+
+            start = time.perf_counter()
+            sets_info = scraper.get_all_mtgstocks_set_urls()
+            results['set_listing'] = {'sets': len(sets_info), 'seconds': time.perf_counter() - start}
+
+            cards = []
+            start = time.perf_counter()
+            for set_info in sets_info[:max_sets]:
+                cards.extend(scraper.scrape_set_page(set_info['full_url'], set_info, max_pages=max_pages,
+                                                     parse=timed_parse))
+            seconds = time.perf_counter() - start
+            results['set_pages'] = {
+                'pages': len(parse_seconds),
+                'cards': len(cards),
+                'seconds': seconds,
+                'parse_seconds': sum(parse_seconds),
+            }
+
+            card_urls = [card['card_url'] for card in cards if card.get('card_url')][:max_images]
+            start = time.perf_counter()
+            found = sum(1 for card_url in card_urls if image_scraper.get_image_url_from_page(card_url))
+            results['image_pages'] = {'pages': len(card_urls), 'found': found,
+                                      'seconds': time.perf_counter() - start}
+
+            try:
+                from cost_to_value_search import scrape_mtgstocks_sealed_prices
+            except ImportError as e:
+                results['sealed_prices'] = {'skipped': str(e)}
+            else:
+                start = time.perf_counter()
+                prices = scrape_mtgstocks_sealed_prices()
+                results['sealed_prices'] = {'products': len(prices), 'seconds': time.perf_counter() - start}
+
+            if ingest and cards:
+                db = scraper.MTGCardDatabase(f"{work_dir}/db", ingest_mode='fast')
+                start = time.perf_counter()
+                write_stats = db.add_cards_to_database(cards)
+                results['ingest'] = {'rows': write_stats['written'], 'seconds': time.perf_counter() - start}
+                db.price_history.close()
+    finally:
+        scraper.set_page_cache = original_cache
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    results['http'] = get_client().stats.snapshot()
+    return results
+
+
+def print_report(results):
+    print(f"\n=== SCRAPER BENCHMARK ===")
+    listing = results['set_listing']
+    print(f"Set listing:   {listing['sets']} sets in {listing['seconds'] * 1000:.0f} ms")
+
+    pages = results['set_pages']
+    print(f"Set pages:     {pages['pages']} pages, {pages['cards']} cards in {pages['seconds']:.2f}s "
+          f"-> {_rate(pages['pages'], pages['seconds']):.1f} pages/sec, "
+          f"{_rate(pages['cards'], pages['seconds']):.0f} cards/sec")
+    if pages['pages']:
+        print(f"Parse:         {pages['parse_seconds'] / pages['pages'] * 1000:.1f} ms/page")
+
+    images = results['image_pages']
+    print(f"Image pages:   {images['pages']} pages ({images['found']} image URLs found) in {images['seconds']:.2f}s "
+          f"-> {_rate(images['pages'], images['seconds']):.1f} pages/sec")
+
+    sealed = results['sealed_prices']
+    if 'skipped' in sealed:
+        print(f"Sealed prices: skipped ({sealed['skipped']})")
+    else:
+        print(f"Sealed prices: {sealed['products']} products in {sealed['seconds'] * 1000:.0f} ms")
+
+    if 'ingest' in results:
+        ingest = results['ingest']
+        print(f"Ingest:        {ingest['rows']} rows in {ingest['seconds']:.2f}s "
+              f"-> {_rate(ingest['rows'], ingest['seconds']):.0f} rows/sec")
+
+    http = results['http']
+    print(f"HTTP:          {http['requests']} requests, {http['errors']} errors, "
+          f"average latency {http['avg_latency'] * 1000:.0f} ms")
+
+
+def record_fixtures(fixtures_dir, **workload):
+    """Run the workload against the live site, saving every response to fixtures_dir"""
+    adapter = RecordingAdapter(fixtures_dir)
+    results = run_workload(transport=adapter, **workload)
+    print(f"Recorded {adapter.recorded} responses to {fixtures_dir}")
+    return results
+
+
+def replay_benchmark(fixtures_dir, latency=0.0, jitter=0.0, **workload):
+    """Run the workload against the recorded responses in fixtures_dir"""
+    import mtgstocksPriceDatabasescraper as scraper
+    # The configured budget, not the current rate, which backoff may have lowered
+    rate, burst = scraper.mtgstocks_backoff.max_rate, scraper.mtgstocks_rate_limiter.capacity
+    scraper.configure_mtgstocks_rate_limit(REPLAY_REQUESTS_PER_SECOND)
+
+    adapter = ReplayAdapter(fixtures_dir, latency=latency, jitter=jitter)
+    try:
+        results = run_workload(transport=adapter, **workload)
+    finally:
+        scraper.configure_mtgstocks_rate_limit(rate, burst)
+    print(f"Replayed {adapter.served} responses from {fixtures_dir} "
+          f"({adapter.missing} not recorded, {latency * 1000:.0f} ms latency)")
+    return results
+
+
+def _option(name, default, convert=int):
+    if name in sys.argv[:-1]:
+        return convert(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ('record', 'run'):
+        print(__doc__)
+        sys.exit(1)
+
+    workload = {
+        'max_sets': _option('--sets', DEFAULT_SETS),
+        'max_pages': _option('--pages', DEFAULT_PAGES),
+        'max_images': _option('--images', DEFAULT_IMAGES),
+        'ingest': '--no-ingest' not in sys.argv,
+    }
+    if sys.argv[1] == 'record':
+        results = record_fixtures(sys.argv[2], **workload)
+    else:
+        results = replay_benchmark(sys.argv[2], latency=_option('--latency', 0.0, float),
+                                   jitter=_option('--jitter', 0.0, float), **workload)
+    print_report(results)
@@ -0,0 +1,125 @@
+"""
+Multi-process, catalog-wide card name scoring.
+
+When a fuzzy lookup has to compare a query against every name in the
+catalog, pure-Python scoring on one core is the bottleneck. This module
+splits the name list into shards, gives each shard its own worker process
+(initialised once with its names), scores whole batches of queries in
+parallel and merges the per-shard top-k results.
+
+Callers should create one ShardedNameScorer per catalog and reuse it; the
+worker start-up and shard transfer are paid once, and each batch of
+queries costs one round trip per shard.
+"""
+import heapq
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from difflib import SequenceMatcher
+
+from card_name_index import calculate_name_similarity, top_k_scored
+
+# Shard held by a worker process, set once by _init_shard
+_shard_names = []
+_shard_offset = 0
+
+
+def sequence_similarity(query, name):
+    """SequenceMatcher ratio (0.0-1.0), as used by detectname.compare_strings"""
+    return SequenceMatcher(None, query, name).ratio()
+
+
+def name_similarity(query, name):
+    """MTGCardDatabase name similarity (0-100) between normalized names"""
+    return calculate_name_similarity(query, name, name)
+
+
+# scorer name -> (score function, score of an exact match)
+SCORERS = {
+    'sequence': (sequence_similarity, 1.0),
+    'name': (name_similarity, 100),
+}
+
+
+def _init_shard(names, offset):
+    global _shard_names, _shard_offset
+    _shard_names = names
+    _shard_offset = offset
+
+
+def _score_shard(queries, k, scorer):
+    """Return the top k (score, catalog position) pairs in this worker's shard for each query"""
+    score, exact_score = SCORERS[scorer]
+    results = []
+    for query in queries:
+        results.append(top_k_scored(
+            ((score(query, name), _shard_offset + i) for i, name in enumerate(_shard_names)),
+            k,
+            exact_score
+        ))
+    return results
+
+
+class ShardedNameScorer:
+    def __init__(self, names, num_shards=None, scorer='sequence'):
+        """
+        Start one worker process per shard of `names`.
+
+        names must already be normalized the way the scorer expects (e.g.
+        lowercased for 'sequence'). num_shards defaults to the CPU count.
+        """
+        if scorer not in SCORERS:
+            raise ValueError(f"Unknown scorer: {scorer}")
+        self.names = list(names)
+        self.scorer = scorer
+
+        num_shards = num_shards or os.cpu_count() or 1
+        num_shards = max(1, min(num_shards, len(self.names)))
+        shard_size = math.ceil(len(self.names) / num_shards) if self.names else 0
+
+        self.executors = []
+        for start in range(0, len(self.names), shard_size or 1):
+            self.executors.append(ProcessPoolExecutor(
+                max_workers=1,
+                initializer=_init_shard,
+                initargs=(self.names[start:start + shard_size], start)
+            ))
+
+        print(f"Started {len(self.executors)} scoring shards for {len(self.names)} names")
+
+    def score_batch(self, queries, k=10):
+        """
+        Score a batch of queries against every name. Returns, per query, a
+        list of up to k (score, position in names) pairs, best first.
+        """
+        queries = list(queries)
+        if not queries or not self.executors:
+            return [[] for _ in queries]
+
+        futures = [executor.submit(_score_shard, queries, k, self.scorer) for executor in self.executors]
+        shard_results = [future.result() for future in futures]
+
+        merged = []
+        for query_index in range(len(queries)):
+            merged.append(heapq.nlargest(
+                k,
+                (match for shard in shard_results for match in shard[query_index]),
+                # Earlier catalog positions win ties, as in a single-process scan
+                key=lambda match: (match[0], -match[1])
+            ))
+        return merged
+
+    def top_matches(self, query, k=10):
+        """Score a single query; returns [(score, name)] best first"""
+        return [(score, self.names[position]) for score, position in self.score_batch([query], k)[0]]
+
+    def close(self):
+        for executor in self.executors:
+            executor.shutdown()
+        self.executors = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from card_data_log import CardDataLog, committed_sets, compact_to_json, iter_card_keys, iter_cards
+
+
+def card(name, price, url=True, set_id='1'):
+    data = {'name': name, 'set_id': set_id, 'price': price}
+    if url:
+        data['card_url'] = f"https://www.mtgstocks.com/prints/{set_id}-{name.lower()}"
+    return data
+
+
+@pytest.mark.parametrize('suffix', ['.jsonl', '.jsonl.gz'])
+def test_uncommitted_tail_is_dropped(tmp_path, suffix):
+    path = str(tmp_path / ('cards' + suffix))
+    with CardDataLog(path, fsync=False) as log:
+        log.append_set('1', [card('Bolt', '1.00')])
+    with open(path, 'ab') as f:
+        f.write(b'{"name": "Half wri')
+
+    assert [c['name'] for c in iter_cards(path)] == ['Bolt']
+    with CardDataLog(path, fsync=False) as log:
+        log.append_set('2', [card('Counterspell', '2.00', set_id='2')])
+    assert [c['name'] for c in iter_cards(path)] == ['Bolt', 'Counterspell']
+    assert [marker['set_id'] for marker in committed_sets(path)] == ['1', '2']
+
+
+def test_compaction_keeps_the_latest_record_of_each_card(tmp_path):
+    path = str(tmp_path / 'cards.jsonl')
+    json_path = str(tmp_path / 'cards.json')
+    with CardDataLog(path, fsync=False) as log:
+        log.append_set('1', [card('Bolt', '1.00'), card('Plains', '0.10', url=False),
+                             card('Plains', '0.20', url=False)])
+        log.append_set('2', [card('Counterspell', '2.00', set_id='2')])
+        # Re-scrape of set 1
+        log.append_set('1', [card('Bolt', '1.50'), card('Plains', '0.15', url=False),
+                             card('Plains', '0.25', url=False)])
+
+    assert compact_to_json(path, json_path) == 4
+    with open(json_path, 'r', encoding='utf-8') as f:
+        cards = json.load(f)
+    assert [(c['name'], c['price']) for c in cards] == [
+        ('Counterspell', '2.00'), ('Bolt', '1.50'), ('Plains', '0.15'), ('Plains', '0.25')]
+
+
+def test_compaction_of_an_empty_log(tmp_path):
+    json_path = str(tmp_path / 'cards.json')
+    assert compact_to_json(str(tmp_path / 'missing.jsonl'), json_path) == 0
+    with open(json_path, 'r', encoding='utf-8') as f:
+        assert json.load(f) == []
+
+
+def test_same_named_cards_on_different_pages_stay_distinct(tmp_path):
+    path = str(tmp_path / 'cards.jsonl')
+    json_path = str(tmp_path / 'cards.json')
+    with CardDataLog(path, fsync=False) as log:
+        # A set committed page by page, with a same-named card on each page
+        log.append_set('1', [card('Plains', '0.10', url=False)])
+        log.append_set('2', [card('Island', '0.10', url=False, set_id='2')])
+        log.append_set('1', [card('Plains', '0.20', url=False)], continues=True)
+        # The next scrape of the set numbers its cards from the start again
+        log.append_set('1', [card('Plains', '0.15', url=False)])
+        log.append_set('1', [card('Plains', '0.25', url=False)], continues=True)
+
+    assert [key for key in iter_card_keys(path)] == [
+        ('1', 'Plains', 0), ('2', 'Island', 0), ('1', 'Plains', 1), ('1', 'Plains', 0), ('1', 'Plains', 1)]
+    assert compact_to_json(path, json_path) == 3
+    with open(json_path, 'r', encoding='utf-8') as f:
+        assert [(c['name'], c['price']) for c in json.load(f)] == [
+            ('Island', '0.10'), ('Plains', '0.15'), ('Plains', '0.25')]
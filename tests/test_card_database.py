@@ -0,0 +1,180 @@
+import pytest
+
+pytest.importorskip('chromadb')
+from mtgstocksPriceDatabasescraper import MTGCardDatabase
+
+
+def card(name, print_id, set_name='Alpha', set_id='1', price='1.00'):
+    return {'name': name, 'set_name': set_name, 'set_id': set_id, 'price': price,
+            'card_url': f'https://www.mtgstocks.com/prints/{print_id}'}
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = MTGCardDatabase(str(tmp_path / 'db'), ingest_mode='fast')
+    yield db
+    db.price_history.close()
+
+
+def test_name_index_follows_writes_after_it_is_built(db):
+    db.add_cards_to_database([card('Shivan Dragon', 1), card('Dragon Whelp', 2)])
+    assert db.search_card_improved('Lightning Bolt') == []
+    assert db.name_index is not None
+
+    stats = db.add_cards_to_database([card('Lightning Bolt', 3), card('Shivan Dragon (Foil)', 1, price='2.00')])
+
+    assert stats['written'] == 2
+    assert [result['id'] for result in db.search_card_improved('Lightning Bolt')][:1] == ['1_print_3']
+    # The re-named print dropped its old postings
+    assert 'shivan dragon' not in db.name_index.name_to_ids
+    assert db.get_card_value_improved('Shivan Dragon')['card_name'] == 'Shivan Dragon (Foil)'
+    assert db.get_card_value_improved('Shivan Dragon')['match_score'] == 80
+
+
+def test_bulk_lookup_keeps_input_order(db):
+    db.add_cards_to_database([card('Shivan Dragon', 1, price='5.00'), card('Lightning Bolt', 2, price='1.50'),
+                              card('Lightning Bolt', 3, set_name='Beta', set_id='2', price='2.50')])
+
+    results = db.get_card_values_bulk(['Lightning Bolt', 'Black Lotus', ('Lightning Bolt', 'beta'),
+                                       'shivan dragon', 'Lightning Bolt', ''])
+
+    assert [result and (result['card_name'], result['set_name']) for result in results] == [
+        ('Lightning Bolt', 'Alpha'), None, ('Lightning Bolt', 'Beta'), ('Shivan Dragon', 'Alpha'),
+        ('Lightning Bolt', 'Alpha'), None]
+    assert results[2]['prices']['price'] == 2.5
+    assert db.last_bulk_stats['queries'] == 6
+    assert db.last_bulk_stats['unique_queries'] == 5
+    assert db.last_bulk_stats['matched'] == 4
+
+
+def test_index_picks_up_other_writers_once_per_ttl(db, tmp_path):
+    reader = MTGCardDatabase(str(tmp_path / 'db'), ingest_mode='fast')
+    db.add_cards_to_database([card('Shivan Dragon', 1, price='5.00')])
+    assert reader.get_card_value_cached('Shivan Dragon')['prices']['price'] == 5.0
+
+    db.add_cards_to_database([card('Lightning Bolt', 2), card('Shivan Dragon', 1, price='7.00')])
+    # Within the TTL the reader keeps serving its index and memo
+    assert reader.get_card_value_cached('Lightning Bolt') is None
+    assert reader.get_card_value_cached('Shivan Dragon')['prices']['price'] == 5.0
+
+    reader.name_index_checked_at -= reader.value_cache.ttl_seconds
+    assert reader.get_card_value_cached('Lightning Bolt')['card_name'] == 'Lightning Bolt'
+    assert reader.get_card_value_cached('Shivan Dragon')['prices']['price'] == 7.0
+    reader.price_history.close()
+
+
+def test_own_writes_do_not_rebuild_the_index(db):
+    db.add_cards_to_database([card('Shivan Dragon', 1)])
+    index = db.get_name_index()
+    db.add_cards_to_database([card('Lightning Bolt', 2)])
+    db.name_index_checked_at -= db.value_cache.ttl_seconds
+    assert db.get_name_index() is index
+
+
+def test_card_ids_are_stable():
+    db = MTGCardDatabase.__new__(MTGCardDatabase)
+    assert db.make_card_id(card('Shivan Dragon', 123)) == '1_print_123'
+    assert db.make_card_id(dict(card('Shivan Dragon', 123), name='Renamed', price='9.99')) == '1_print_123'
+    assert db.make_card_id({'name': "Jace, the Mind Sculptor", 'set_id': 7}) == '7_jace_the_mind_sculptor'
+    assert db.make_card_id({'name': 'Plains'}) == 'unknown_plains'
+
+
+def test_unchanged_cards_are_not_rewritten(db):
+    cards = [card('Shivan Dragon', 1, price='5.00'), card('Lightning Bolt', 2, price='1.00')]
+    assert db.add_cards_to_database(cards)['written'] == 2
+
+    stats = db.add_cards_to_database([dict(cards[0]), dict(cards[1], price='1.25')])
+
+    assert (stats['written'], stats['unchanged']) == (1, 1)
+    assert stats['ids'] == ['1_print_1', '1_print_2']
+    assert db.collection.count() == 2
+
+
+def test_legacy_ids_are_removed_once_re_scraped(db):
+    legacy = {'name': 'Shivan Dragon', 'normalized_name': 'shivan dragon', 'set_name': 'Alpha', 'set_id': '1',
+              'price': 5.0, 'card_url': 'https://www.mtgstocks.com/prints/1'}
+    db.collection.add(ids=['1_shivan_dragon_0a1b2c3d', '1_lightning_bolt_deadbeef'],
+                      metadatas=[legacy, dict(legacy, name='Lightning Bolt', normalized_name='lightning bolt',
+                                              card_url='https://www.mtgstocks.com/prints/2')],
+                      documents=['Card Name: Shivan Dragon', 'Card Name: Lightning Bolt'],
+                      embeddings=db.fast_embedding_function(['Shivan Dragon', 'Lightning Bolt']))
+    db.add_cards_to_database([card('Shivan Dragon', 1, price='6.00')])
+
+    assert db.remove_legacy_card_ids() == 1
+    assert set(db.collection.get()['ids']) == {'1_print_1', '1_lightning_bolt_deadbeef'}
+    assert [result['id'] for result in db.search_card_improved('Shivan Dragon')] == ['1_print_1']
+
+    db.add_cards_to_database([card('Lightning Bolt', 2)])
+    assert db.remove_legacy_card_ids() == 1
+    assert db.collection.metadata['legacy_ids_cleared'] is True
+    assert db.remove_legacy_card_ids() == 0
+    assert db.collection.count() == 2
+
+
+def test_price_info_reports_every_price_field():
+    from card_prices import PRICE_FIELDS
+
+    db = MTGCardDatabase.__new__(MTGCardDatabase)
+    metadata = {field: float(i + 1) for i, field in enumerate(PRICE_FIELDS)}
+    metadata.update(name='Shivan Dragon', price_col_3='4.5')
+    assert db.build_price_info(metadata, 100)['prices'] == dict(
+        {field: float(i + 1) for i, field in enumerate(PRICE_FIELDS)}, price_col_3=4.5)
+
+
+def test_fast_mode_lookups_need_no_model(db, monkeypatch):
+    db.add_cards_to_database([card('Shivan Dragon', 1, price='5.00'), card('Dragon Whelp', 2)])
+    queries = []
+    original_query = db.collection.query
+
+    def query(**kwargs):
+        queries.append(kwargs)
+        assert 'query_texts' not in kwargs
+        return original_query(**kwargs)
+
+    monkeypatch.setattr(db.collection, 'query', query)
+
+    assert db.get_card_value('Shivan Dragon')['card_name'] == 'Shivan Dragon'
+    assert db.search_card('Dragon Whelp')[0]['metadata']['name'] == 'Dragon Whelp'
+    assert db.search_card_fuzzy('Shivan Dragon', set_name='alpha')[0]['id'] == '1_print_1'
+    assert queries[-1]['where'] == {'$and': [{'set_name': {'$in': ['Alpha']}}, {'embedding': 'hashed'}]}
+
+
+def test_failed_embedding_search_falls_back_to_name_matches(db, monkeypatch):
+    db.add_cards_to_database([card('Shivan Dragon', 1, price='5.00')])
+
+    def unreachable(**kwargs):
+        raise OSError('Name or service not known')
+
+    monkeypatch.setattr(db.collection, 'query', unreachable)
+    assert db.get_card_value('shivan')['prices'] == {'price': 5.0}
+
+
+def test_backfill_replaces_hashed_embeddings(db):
+    db.add_cards_to_database([card('Shivan Dragon', 1), card('Dragon Whelp', 2), card('Lightning Bolt', 3)])
+    stub_vector = [1.0] + [0.0] * 383
+
+    def stub_embeddings(documents):
+        return [stub_vector for _ in documents]
+
+    assert db.backfill_semantic_embeddings(batch_size=2, max_batches=1, embedding_function=stub_embeddings) == 2
+    assert db.has_hashed_embeddings()
+    assert db.backfill_semantic_embeddings(batch_size=2, embedding_function=stub_embeddings) == 1
+    assert not db.has_hashed_embeddings()
+
+    stored = db.collection.get(include=['embeddings', 'metadatas'])
+    assert all(list(vector) == stub_vector for vector in stored['embeddings'])
+    assert {metadata['embedding'] for metadata in stored['metadatas']} == {'semantic'}
+    # Prices and the rest of the metadata are kept
+    assert {metadata['price'] for metadata in stored['metadatas']} == {1.0}
+
+
+def test_set_filter_resolves_stored_set_names(db):
+    db.add_cards_to_database([card('Shivan Dragon', 1), card('Shivan Dragon', 2, set_name='Alpha Edition', set_id='2')])
+    assert db.set_filter(None) is None
+    assert db.set_filter('alpha') == {'set_name': {'$in': ['Alpha', 'Alpha Edition']}}
+    assert db.set_filter('zendikar') is False
+
+    db.add_cards_to_database([card('Scalding Tarn', 3, set_name='Zendikar', set_id='3')])
+    assert db.set_filter('zendikar') == {'set_name': {'$in': ['Zendikar']}}
+    assert db.get_card_value_improved('Shivan Dragon', 'edition')['set_name'] == 'Alpha Edition'
+    assert db.search_card_improved('Shivan Dragon', 'zendikar') == []
@@ -0,0 +1,135 @@
+import os
+import subprocess
+import sys
+
+from card_name_index import CardNameIndex, TrigramNameMatcher, top_k_scored, trigram_similarity
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_index():
+    index = CardNameIndex()
+    index.add('1', 'shivan dragon', 'Shivan Dragon', 'Alpha')
+    index.add('2', 'dragon whelp', 'Dragon Whelp', 'Alpha')
+    index.add('3', 'lightning bolt', 'Lightning Bolt', 'Beta')
+    index.add('4', 'ragavan nimble pilferer', 'Ragavan, Nimble Pilferer', 'MH2')
+    return index
+
+
+def test_substring_names_match_inside_words():
+    index = make_index()
+    assert index.substring_names('ragon') == {'shivan dragon', 'dragon whelp'}
+    assert index.substring_names('ning bo') == {'lightning bolt'}
+    assert index.substring_names('xyz') == set()
+
+
+def test_substring_names_short_queries_scan_all_names():
+    index = make_index()
+    assert index.substring_names('ra') == {'shivan dragon', 'dragon whelp', 'ragavan nimble pilferer'}
+
+
+def test_substring_candidates_follow_removals():
+    index = make_index()
+    index.remove('2')
+    assert [card[0] for card in index.substring_candidates('ragon')] == ['1']
+
+
+def test_candidates_use_words_prefixes_and_trigrams():
+    index = make_index()
+    assert 'lightning bolt' in index.candidate_names('lightn')
+    assert 'lightning bolt' in index.candidate_names('lightnin bolt')
+
+
+def test_top_k_scored_keeps_earlier_items_on_ties():
+    items = [(50, 'a'), (90, 'b'), (50, 'c'), (70, 'd')]
+    assert top_k_scored(items, 3) == [(90, 'b'), (70, 'd'), (50, 'a')]
+
+
+MATCHER_NAMES = ['shivan dragon', 'dragon whelp', 'lightning bolt', 'lightning helix', 'serra angel',
+                 'ragavan nimble pilferer', 'force of will', 'sol ring']
+
+
+def test_trigram_search_finds_ocr_garbled_names():
+    matcher = TrigramNameMatcher(MATCHER_NAMES)
+    # No whole word in common with the stored name
+    assert matcher.search('shlvan draqon', k=3) == [(0.4, 'shivan dragon')]
+    assert matcher.search('lightnlng b0lt', k=1)[0][1] == 'lightning bolt'
+    assert matcher.search('serra angle', k=1)[0][1] == 'serra angel'
+    assert matcher.search('l1ghtn1ng') == []
+
+
+def test_trigram_search_filters_match_a_full_scan():
+    matcher = TrigramNameMatcher(MATCHER_NAMES)
+    for query in ['shlvan draqon', 'lightnlng b0lt', 'lightning', 'sol rlng', 'force of wil', 'dragon']:
+        for min_similarity in (0.2, 0.4, 0.6):
+            expected = sorted(((trigram_similarity(query, name), name) for name in MATCHER_NAMES
+                               if trigram_similarity(query, name) >= min_similarity), reverse=True)
+            assert matcher.search(query, k=len(MATCHER_NAMES), min_similarity=min_similarity) == expected
+
+
+def test_trigram_search_applies_the_cutoff():
+    matcher = TrigramNameMatcher(MATCHER_NAMES)
+    assert [name for _, name in matcher.search('lightnlng b0lt', min_similarity=0.2)] == \
+        ['lightning bolt', 'lightning helix']
+    assert [name for _, name in matcher.search('lightnlng b0lt')] == ['lightning bolt']
+
+
+def test_trigram_remove_clears_postings():
+    matcher = TrigramNameMatcher(['shivan dragon', 'dragon whelp'])
+    matcher.remove('shivan dragon')
+    assert matcher.search('shivan dragon', min_similarity=0.1) == [
+        (trigram_similarity('shivan dragon', 'dragon whelp'), 'dragon whelp')]
+    assert all('shivan dragon' not in names for names in matcher.postings.values())
+    matcher.remove('dragon whelp')
+    assert len(matcher) == 0 and not matcher.postings
+
+
+TIED_CANDIDATES_SCRIPT = """
+from card_name_index import CardNameIndex, calculate_name_similarity, top_k_scored
+index = CardNameIndex()
+for i in range(6):
+    index.add(f'bolt-{i}', 'lightning bolt', 'Lightning Bolt', f'Set {i}')
+    index.add(f'helix-{i}', 'lightning helix', 'Lightning Helix', f'Set {i}')
+scored = ((calculate_name_similarity('lightning bolt', card[1], card[2]), card[0])
+          for card in index.candidates('lightning bolt'))
+print(','.join(card_id for _, card_id in top_k_scored(scored, 3)))
+print(','.join(card[0] for card in index.cards_in_sets(index.resolve_sets('set'))))
+"""
+
+
+def test_tied_candidates_keep_insertion_order_under_any_hash_seed():
+    outputs = []
+    for seed in ('1', '2'):
+        env = dict(os.environ, PYTHONHASHSEED=seed)
+        outputs.append(subprocess.run([sys.executable, '-c', TIED_CANDIDATES_SCRIPT], cwd=REPO_ROOT, env=env,
+                                      capture_output=True, text=True, check=True).stdout)
+    assert outputs[0] == outputs[1]
+    best, in_sets = outputs[0].splitlines()
+    assert best == 'bolt-0,bolt-1,bolt-2'
+    assert in_sets.split(',')[:3] == ['bolt-0', 'helix-0', 'bolt-1']
+
+
+def test_replaced_card_keeps_its_position():
+    index = make_index()
+    index.add('5', 'shivan dragon', 'Shivan Dragon', 'Beta')
+    index.add('1', 'shivan dragon', 'Shivan Dragon', 'Revised')
+    shivans = [card[0] for card in index.candidates('shivan dragon') if card[1] == 'shivan dragon']
+    assert shivans == ['1', '5']
+
+
+def test_resolve_sets_matches_substrings_and_follows_new_partitions():
+    index = make_index()
+    assert sorted(index.resolve_sets('alph')) == ['alpha']
+    assert index.resolve_sets('Beta ') == ['beta']
+    assert index.resolve_sets('zendikar') == []
+
+    # Cached resolutions are dropped when a set partition appears or disappears
+    index.add('5', 'scalding tarn', 'Scalding Tarn', 'Zendikar')
+    assert index.resolve_sets('zendikar') == ['zendikar']
+    index.add('6', 'shivan dragon', 'Shivan Dragon', 'Alpha Edition')
+    assert sorted(index.resolve_sets('alpha')) == ['alpha', 'alpha edition']
+    index.remove('5')
+    assert index.resolve_sets('zendikar') == []
+
+    assert [card[0] for card in index.cards_in_sets(index.resolve_sets('alpha'))] == ['1', '2', '6']
+    assert index.set_names(index.resolve_sets('alpha')) == ['Alpha', 'Alpha Edition']
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from catalog_analytics import arrays_from_cards, coverage, distribution, group_stats, top_movers
+from price_history import PriceHistoryStore
+
+DAY = 86400.0
+NOW = 1_760_000_000.0
+
+
+def card(name, set_name, price, rarity='Common'):
+    return {'name': name, 'set_name': set_name, 'rarity': rarity, 'price': price,
+            'card_url': f"https://www.mtgstocks.com/prints/{name}"}
+
+
+CARDS = [
+    card('a', 'Beta', 5.0),
+    card('b', 'Alpha', '$1,000.00', 'Rare'),
+    card('c', 'Beta', None),
+    card('d', 'Alpha', 1.0),
+    card('e', 'Beta', '2.5'),
+    card('f', 'Alpha', 'n/a'),
+    card('g', '', 3.0),
+    card('h', 'Beta', 4.0),
+    card('i', 'Alpha', 10.0),
+]
+
+
+def test_arrays_parse_prices_like_the_rest_of_the_catalog():
+    catalog = arrays_from_cards(CARDS)
+    assert len(catalog) == 9
+    assert catalog.prices['price'][1] == 1000.0
+    assert np.isnan(catalog.prices['price'][2]) and np.isnan(catalog.prices['price'][5])
+    assert np.isnan(catalog.prices['market_price']).all()
+    assert coverage(catalog)['any'] == 7
+    assert distribution(catalog)['count'] == 7
+
+
+def test_group_stats_slices_each_group_in_price_order():
+    # Groups interleave in input order; each group's slice of the sorted prices must be its own
+    stats = {entry['group']: entry for entry in group_stats(arrays_from_cards(CARDS))}
+    assert list(stats) == ['Alpha', 'Beta', 'Unknown']
+
+    alpha, beta, unknown = stats['Alpha'], stats['Beta'], stats['Unknown']
+    assert (alpha['cards'], alpha['priced'], alpha['total'], alpha['max']) == (4, 3, 1011.0, 1000.0)
+    assert alpha['median'] == 10.0
+    assert (beta['cards'], beta['priced'], beta['total'], beta['max']) == (4, 3, 11.5, 5.0)
+    assert beta['median'] == 4.0
+    assert beta['p90'] == pytest.approx(np.percentile([2.5, 4.0, 5.0], 90))
+    assert (unknown['cards'], unknown['max']) == (1, 3.0)
+
+
+def test_group_stats_group_without_prices():
+    stats = group_stats(arrays_from_cards([card('a', 'Alpha', 1.0), card('b', 'Zeta', None)]))
+    assert stats[1] == {'group': 'Zeta', 'cards': 1, 'priced': 0, 'total': 0.0}
+
+
+def test_prices_at_takes_each_cards_latest_point(tmp_path):
+    store = PriceHistoryStore(str(tmp_path / 'history.sqlite3'))
+    store.record_prices([('a', {'price': 1.0}), ('b', {'price': 5.0})], NOW - 3 * DAY)
+    store.record_prices([('a', {'price': 2.0}), ('b', {'market_price': 7.0})], NOW - 2 * DAY)
+    store.record_prices([('a', {'price': 3.0})], NOW - DAY)
+
+    # MAX(ts) picks the row the bare price column is read from
+    assert store.prices_at(NOW - 1.5 * DAY) == {'a': 2.0, 'b': 5.0}
+    assert store.prices_at(NOW) == {'a': 3.0, 'b': 5.0}
+    assert store.prices_at(NOW, 'market_price') == {'b': 7.0}
+    assert store.prices_at(NOW - 4 * DAY) == {}
+
+    catalog = arrays_from_cards([card('a', 'Alpha', 6.0), card('b', 'Alpha', 2.5)], card_ids=['a', 'b'])
+    movers = top_movers(catalog, store, NOW - 1.5 * DAY)
+    assert [(m['card_id'], m['delta_pct']) for m in movers['risers']] == [('a', 200.0)]
+    assert [(m['card_id'], m['delta_pct']) for m in movers['fallers']] == [('b', -50.0)]
+    store.close()
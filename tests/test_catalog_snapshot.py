@@ -0,0 +1,63 @@
+import json
+import os
+
+import pytest
+
+from catalog_snapshot import (CatalogSnapshot, collection_source_tag, json_source_tag, open_json_catalog,
+                              write_snapshot)
+
+CARDS = [
+    {'name': 'Lightning Bolt', 'set_name': 'Alpha', 'set_id': '1', 'price': '$1,234.50', 'market_price': 2},
+    {'name': 'Shivan Dragon', 'set_name': 'Alpha', 'set_id': '1', 'rarity': 'Rare'},
+]
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / 'catalog.snapshot')
+    assert write_snapshot(CARDS, path, 'tag') == 2
+    with CatalogSnapshot(path) as snapshot:
+        assert len(snapshot) == 2
+        assert snapshot.names() == ['Lightning Bolt', 'Shivan Dragon']
+        assert snapshot[0]['price'] == '1234.50'
+        assert snapshot.value('market_price', 0) == 2.0
+        assert snapshot.value('price', 1) is None
+        assert snapshot[-1]['rarity'] == 'Rare'
+        assert not snapshot.is_stale('tag')
+
+
+def test_truncated_snapshot_is_rejected(tmp_path):
+    path = str(tmp_path / 'catalog.snapshot')
+    write_snapshot(CARDS, path)
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 5)
+    with pytest.raises(ValueError):
+        CatalogSnapshot(path)
+
+
+def test_json_catalog_snapshot_is_regenerated_when_stale(tmp_path):
+    json_path = str(tmp_path / 'cards.json')
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(CARDS, f)
+    with open_json_catalog(json_path) as snapshot:
+        assert snapshot.source_tag == json_source_tag(json_path)
+
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(CARDS[:1], f)
+    os.utime(json_path, ns=(1, 1))
+    with open_json_catalog(json_path) as snapshot:
+        assert len(snapshot) == 1
+
+
+def test_collection_tag_changes_on_price_only_updates(tmp_path):
+    pytest.importorskip('chromadb')
+    from mtgstocksPriceDatabasescraper import MTGCardDatabase
+
+    db = MTGCardDatabase(str(tmp_path / 'db'), ingest_mode='fast')
+    card = {'name': 'Lightning Bolt', 'set_id': '1', 'set_name': 'Alpha',
+            'card_url': 'https://www.mtgstocks.com/prints/1-lightning-bolt', 'price': '1.00'}
+    db.add_cards_to_database([card])
+    tag = collection_source_tag(db.collection)
+
+    db.add_cards_to_database([dict(card, price='2.00')])
+    assert db.collection.count() == 1
+    assert collection_source_tag(db.collection) != tag
@@ -0,0 +1,96 @@
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+pytest.importorskip('chromadb')
+import mtgstocksPriceDatabasescraper as scraper
+from mtgstocks_http import get_client
+from page_cache import PageCache
+from rate_limit import AdaptiveBackoff, TokenBucket
+
+
+class StubAdapter(BaseAdapter):
+    """Answers requests with the given status codes, in order"""
+
+    def __init__(self, statuses):
+        super().__init__()
+        self.statuses = list(statuses)
+        self.body = b'<html></html>'
+        self.sent = 0
+
+    def send(self, request, **kwargs):
+        self.sent += 1
+        response = requests.Response()
+        response.status_code = self.statuses.pop(0)
+        response.url = request.url
+        response.request = request
+        response._content = self.body
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    bucket = TokenBucket(1000)
+    backoff = AdaptiveBackoff(bucket, base_delay=0.0)
+    monkeypatch.setattr(scraper, 'mtgstocks_rate_limiter', bucket)
+    monkeypatch.setattr(scraper, 'mtgstocks_backoff', backoff)
+    return backoff
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    session = get_client().session
+    adapters = session.adapters.copy()
+    monkeypatch.setattr(session, 'adapters', adapters.copy())
+
+    def mount(statuses):
+        adapter = StubAdapter(statuses)
+        session.mount('https://', adapter)
+        return adapter
+    return mount
+
+
+def test_throttled_responses_retry_through_the_backoff(limiter, stub):
+    adapter = stub([503, 429, 200])
+    response = scraper.fetch_page('https://www.mtgstocks.com/sets/1-alpha')
+    assert response.status_code == 200
+    assert adapter.sent == 3
+    # Two failures halved the rate twice; the success raised it again
+    assert limiter.bucket.rate == pytest.approx(1000 / 4 * 1.1)
+    assert limiter.consecutive_failures == 0
+
+
+def test_gives_up_after_max_attempts(limiter, stub):
+    adapter = stub([503] * 3)
+    assert scraper.fetch_page('https://www.mtgstocks.com/sets/1-alpha', max_attempts=3) is None
+    assert adapter.sent == 3
+    assert limiter.consecutive_failures == 3
+
+
+def test_client_errors_are_not_retried(limiter, stub):
+    adapter = stub([404])
+    assert scraper.fetch_page('https://www.mtgstocks.com/sets/1-alpha') is None
+    assert adapter.sent == 1
+    assert limiter.consecutive_failures == 0
+
+
+def test_sequential_set_scrape_backs_off(limiter, stub, monkeypatch, tmp_path):
+    monkeypatch.setattr(scraper, 'set_page_cache', PageCache(str(tmp_path / 'http_cache')))
+    stub([503, 200])
+    scraper.scrape_set_page('https://www.mtgstocks.com/sets/1-alpha', {'set_id': '1', 'set_name': 'Alpha'},
+                            parse=lambda html, set_info, url: ([], None, None))
+    assert limiter.bucket.rate == pytest.approx(1000 / 2 * 1.1)
+
+
+def test_json_api_fetch_retries_through_the_backoff(limiter, stub):
+    adapter = stub([503, 200])
+    adapter.body = b'{"prints": []}'
+    assert scraper.fetch_mtgstocks_json('https://api.mtgstocks.com/card_sets/1') == {'prints': []}
+    assert adapter.sent == 2
+
+    stub([404])
+    with pytest.raises(requests.exceptions.RequestException):
+        scraper.fetch_mtgstocks_json('https://api.mtgstocks.com/card_sets/1')
@@ -0,0 +1,55 @@
+import json
+import os
+
+import pytest
+import requests
+
+from http_fixtures import FixtureNotFound, ReplayAdapter, fixture_key, use_transport
+
+URL = 'https://api.mtgstocks.com/card_sets/1'
+
+
+def write_fixture(fixtures_dir, url, body, status=200):
+    key = fixture_key('GET', url)
+    with open(os.path.join(fixtures_dir, key + '.json'), 'w', encoding='utf-8') as f:
+        json.dump({'method': 'GET', 'url': url, 'status': status, 'reason': 'OK',
+                   'headers': {'Content-Type': 'application/json'}}, f)
+    with open(os.path.join(fixtures_dir, key + '.body'), 'wb') as f:
+        f.write(body)
+
+
+def test_replay_through_mounted_sessions_only(tmp_path):
+    write_fixture(str(tmp_path), URL, b'{"prints": []}')
+    session = requests.Session()
+    other = requests.Session()
+    original = session.get_adapter(URL)
+
+    adapter = ReplayAdapter(str(tmp_path))
+    with use_transport(adapter, [session]):
+        response = session.get(URL)
+        assert response.json() == {'prints': []}
+        assert response.headers['Content-Length'] == '14'
+        with pytest.raises(FixtureNotFound):
+            session.get(URL + '?page=2')
+        assert other.get_adapter(URL) is not adapter
+
+    assert session.get_adapter(URL) is original
+    assert (adapter.served, adapter.missing) == (1, 1)
+
+
+def test_replay_benchmark_restores_the_rate_limit(tmp_path, monkeypatch):
+    pytest.importorskip('chromadb')
+    import mtgstocksPriceDatabasescraper as scraper
+    from rate_limit import AdaptiveBackoff, TokenBucket
+    from scraper_benchmark import replay_benchmark
+
+    bucket = TokenBucket(0.5, 2)
+    backoff = AdaptiveBackoff(bucket, base_delay=0.0)
+    monkeypatch.setattr(scraper, 'mtgstocks_rate_limiter', bucket)
+    monkeypatch.setattr(scraper, 'mtgstocks_backoff', backoff)
+    # Throttled by an earlier 429: the configured budget is restored, not the lowered rate
+    bucket.set_rate(0.25)
+    results = replay_benchmark(str(tmp_path), ingest=False)
+    assert results['set_listing']['sets'] == 0
+    assert (bucket.rate, bucket.capacity) == (0.5, 2.0)
+    assert (backoff.max_rate, backoff.min_rate) == (0.5, 0.5 / 16)
@@ -0,0 +1,74 @@
+import json
+import threading
+import time
+
+import requests
+from requests.adapters import BaseAdapter
+
+import image_scraper
+from image_scraper import MTGCardImageScraper
+
+CARD_PAGE = b'<html><mtg-print-image><img src="https://img.example.com/card.jpg"></mtg-print-image></html>'
+
+
+class StubAdapter(BaseAdapter):
+    """Serves a card page with an image (or without one) and slow image downloads"""
+
+    def __init__(self, card_page=CARD_PAGE, image_delay=0.05):
+        super().__init__()
+        self.card_page = card_page
+        self.image_delay = image_delay
+        self.image_requests = 0
+        self.lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = request.url
+        response.request = request
+        if request.url.startswith('https://img.example.com/'):
+            with self.lock:
+                self.image_requests += 1
+            time.sleep(self.image_delay)
+            response._content = b'jpeg'
+        else:
+            response._content = self.card_page
+        return response
+
+    def close(self):
+        pass
+
+
+def make_scraper(tmp_path, cards, adapter):
+    json_path = tmp_path / 'cards.json'
+    json_path.write_text(json.dumps(cards), encoding='utf-8')
+    scraper = MTGCardImageScraper(str(json_path), output_dir=str(tmp_path / 'images'),
+                                  host_requests_per_second=1000)
+    scraper.session.mount('https://', adapter)
+    return scraper
+
+
+def test_concurrent_cards_sharing_a_file_download_it_once(tmp_path):
+    cards = [{'name': 'Sol Ring', 'set_name': 'Commander', 'card_url': f'https://www.mtgstocks.com/prints/{i}'}
+             for i in range(4)]
+    adapter = StubAdapter()
+    scraper = make_scraper(tmp_path, cards, adapter)
+
+    counts = scraper.scrape_card_images_concurrent(cards, workers=4)
+
+    assert adapter.image_requests == 1
+    assert counts['downloaded'] == 1 and counts['skipped'] == 3
+    expected_path = scraper.image_file_path(cards[0])
+    assert all(card['image_path'] == expected_path for card in cards)
+
+
+def test_sequential_card_without_image_url_is_not_delayed(tmp_path, monkeypatch):
+    cards = [{'name': 'Island', 'set_name': 'Alpha', 'card_url': 'https://www.mtgstocks.com/prints/1'}]
+    scraper = make_scraper(tmp_path, cards, StubAdapter(card_page=b'<html></html>'))
+    sleeps = []
+    monkeypatch.setattr(image_scraper.time, 'sleep', sleeps.append)
+
+    scraper.scrape_card_images(delay=1, save_frequency=1)
+
+    assert sleeps == []
+    assert 'image_path' not in scraper.load_cards_data()[0]
@@ -0,0 +1,67 @@
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+import mtgstocks_http
+from mtgstocks_http import ScraperHTTPClient
+
+URL = 'https://api.mtgstocks.com/card_sets'
+
+
+class StubAdapter(BaseAdapter):
+    """Answers with the given status codes in order; None raises a connection error"""
+
+    def __init__(self, statuses):
+        super().__init__()
+        self.statuses = list(statuses)
+        self.sent = 0
+
+    def send(self, request, **kwargs):
+        self.sent += 1
+        status = self.statuses.pop(0)
+        if status is None:
+            raise requests.exceptions.ConnectionError('connection refused', request=request)
+        response = requests.Response()
+        response.status_code = status
+        response.url = request.url
+        response.request = request
+        response._content = b'{"ok": true}'
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(mtgstocks_http.time, 'sleep', lambda seconds: None)
+    return ScraperHTTPClient(retries=2)
+
+
+def test_retries_throttled_and_failed_attempts(client):
+    adapter = StubAdapter([None, 503, 200])
+    client.session.mount('https://', adapter)
+
+    response = client.get(URL)
+
+    assert response.status_code == 200
+    stats = client.stats.snapshot()
+    assert (stats['requests'], stats['retries'], stats['errors']) == (3, 2, 1)
+    assert stats['status_codes'] == {503: 1, 200: 1}
+    assert stats['decoded_bytes'] == 24
+
+
+def test_gives_up_after_the_retry_budget(client):
+    client.session.mount('https://', StubAdapter([429, 429, 429, 200]))
+    assert client.get(URL).status_code == 429
+
+    client.session.mount('https://', StubAdapter([None]))
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.get(URL, retries=0)
+
+
+def test_client_errors_are_not_retried(client):
+    adapter = StubAdapter([404])
+    client.session.mount('https://', adapter)
+    assert client.get(URL).status_code == 404
+    assert adapter.sent == 1
@@ -0,0 +1,43 @@
+import requests
+
+from page_cache import PageCache
+
+
+def make_response(status, body=b'', headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response._content = body
+    response.encoding = 'utf-8'
+    response.headers.update(headers or {})
+    return response
+
+
+def test_conditional_and_unchanged_pages_skip_the_parser(tmp_path):
+    cache = PageCache(str(tmp_path))
+    url = 'https://www.mtgstocks.com/sets/1-alpha'
+    parsed = []
+
+    def parse(html):
+        parsed.append(html)
+        return [html.upper()]
+
+    first = make_response(200, b'page', {'ETag': '"v1"'})
+    assert cache.resolve(url, first, cache.get(url), parse) == ['PAGE']
+
+    entry = cache.get(url)
+    assert cache.conditional_headers(entry) == {'If-None-Match': '"v1"'}
+    assert cache.resolve(url, make_response(304), entry, parse) == ['PAGE']
+    assert cache.resolve(url, make_response(200, b'page'), cache.get(url), parse) == ['PAGE']
+    assert cache.resolve(url, make_response(200, b'new page'), cache.get(url), parse) == ['NEW PAGE']
+
+    assert parsed == ['page', 'new page']
+    assert cache.hits == {'not_modified': 1, 'unchanged_body': 1, 'parsed': 2}
+
+
+def test_print_stats(tmp_path, capsys):
+    cache = PageCache(str(tmp_path))
+    cache.hits.update(not_modified=2, unchanged_body=1, parsed=1)
+    cache.print_stats()
+    out = capsys.readouterr().out
+    assert "Pages: 4 (2 not modified, 1 unchanged bodies, 1 parsed)" in out
+    assert "Reused without parsing: 75.0%" in out
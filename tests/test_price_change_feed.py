@@ -0,0 +1,34 @@
+import json
+
+from price_change_feed import FeedCursor, PriceChangeFeed, diff_prices, read_new_changes
+
+
+def test_diff_prices():
+    changes = diff_prices(['a', 'b', 'c', 'd', 'e'], [1.0, '2.00', None, 4.0, 'n/a'],
+                          [1.5, '$2.00', 3.0, '$3,000', 5.0])
+    assert changes == [('a', 1.0, 1.5, 50.0), ('d', 4.0, 3000.0, 74900.0)]
+    assert diff_prices(['a'], [1.0], [1.01], min_delta_pct=5) == []
+    assert diff_prices([], [], []) == []
+
+
+def test_cursor_reads_only_new_complete_lines(tmp_path):
+    path = str(tmp_path / 'changes.jsonl')
+    feed = PriceChangeFeed(path)
+    assert feed.record_changes(['a', 'b'], [1.0, 2.0], [{'name': 'A', 'price': 2.0}, {'name': 'B', 'price': 2.0}],
+                               timestamp=1.0) == 1
+
+    assert [change['card_id'] for change in read_new_changes(path, 'bot')] == ['a']
+    assert read_new_changes(path, 'bot') == []
+
+    feed.record_changes(['b'], [2.0], [{'name': 'B', 'price': 1.0}], timestamp=2.0)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'card_id': 'torn'})[:10])
+
+    cursor = FeedCursor(path, 'bot')
+    changes = cursor.read()
+    assert [(change['card_id'], change['delta_pct']) for change in changes] == [('b', -50.0)]
+    # Not committed: read again from the same place
+    assert FeedCursor(path, 'bot').read() == changes
+    cursor.commit()
+    assert FeedCursor(path, 'bot').read() == []
+    assert len(read_new_changes(path, 'ebay')) == 2
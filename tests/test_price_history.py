@@ -0,0 +1,54 @@
+from card_prices import parse_price
+from price_history import PriceHistoryStore, DAY_SECONDS
+
+NOW = 1_700_000_000.0
+
+
+def make_store(tmp_path):
+    return PriceHistoryStore(str(tmp_path / 'history.sqlite3'))
+
+
+def test_parse_price_accepts_formatted_strings():
+    assert parse_price('$1,234.50') == 1234.5
+    assert parse_price(' 2.5 ') == 2.5
+    assert parse_price(3) == 3.0
+    assert parse_price('N/A') is None
+    assert parse_price(None) is None
+
+
+def test_formatted_prices_are_recorded(tmp_path):
+    store = make_store(tmp_path)
+    store.record_prices([('a', {'price': '$1,200.00'})], timestamp=NOW)
+    assert store.price_at('a', NOW) == 1200.0
+
+
+def test_price_at_and_percent_change(tmp_path):
+    store = make_store(tmp_path)
+    store.record_prices([('a', {'price': 2.0})], timestamp=NOW - 10 * DAY_SECONDS)
+    store.record_prices([('a', {'price': 3.0})], timestamp=NOW)
+    assert store.price_at('a', NOW - DAY_SECONDS) == 2.0
+    assert store.price_at('a', NOW) == 3.0
+    assert store.price_at('a', NOW - 20 * DAY_SECONDS) is None
+    assert store.percent_change('a', NOW - 5 * DAY_SECONDS, NOW) == 50.0
+
+
+def test_window_stats_reports_sample_average(tmp_path):
+    store = make_store(tmp_path)
+    for day, price in enumerate([1.0, 2.0, 6.0]):
+        store.record_prices([('a', {'price': price})], timestamp=NOW + day * DAY_SECONDS)
+    stats = store.window_stats('a', NOW, NOW + 3 * DAY_SECONDS)
+    assert stats == {'min': 1.0, 'max': 6.0, 'sample_avg': 3.0, 'points': 3}
+
+
+def test_rollup_keeps_sample_weighted_averages(tmp_path):
+    store = make_store(tmp_path)
+    day = (NOW - 60 * DAY_SECONDS) // DAY_SECONDS * DAY_SECONDS
+    store.record_prices([('a', {'price': 1.0})], timestamp=day + 100)
+    store.record_prices([('a', {'price': 3.0})], timestamp=day + 200)
+    store.record_prices([('a', {'price': 10.0})], timestamp=NOW)
+
+    folded = store.rollup(now=NOW)
+    assert folded == 2
+    history = store.history('a', 0, NOW)
+    assert history == [(day, 2.0, 'day'), (NOW, 10.0, 'raw')]
+    assert store.window_stats('a', 0, NOW)['points'] == 2
@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from http_fixtures import ReplayAdapter, use_transport
+from price_sources import FallbackPriceSource, JSONAPIPriceSource, headline_price
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'api')
+
+
+@pytest.fixture(autouse=True)
+def replay():
+    with use_transport(ReplayAdapter(FIXTURES_DIR)) as adapter:
+        yield adapter
+
+
+def test_api_source_parses_recorded_set():
+    source = JSONAPIPriceSource()
+    cards = source.fetch_set_cards({'set_id': 1, 'set_name': 'Alpha'})
+
+    assert [card['name'] for card in cards] == ['Black Lotus', 'Lightning Bolt', 'Plains']
+    lotus, bolt, plains = cards
+    assert lotus == {
+        'name': 'Black Lotus', 'set_id': '1', 'set_name': 'Alpha', 'price_source': 'api', 'rarity': 'Rare',
+        'card_url': 'https://www.mtgstocks.com/prints/1-black-lotus',
+        'market_price': 27500.5, 'average_price': 25000.0, 'low_price': 20000.0, 'high_price': 31000.0,
+        'price': 25000.0,
+    }
+    assert bolt['card_url'] == 'https://www.mtgstocks.com/prints/2-lightning-bolt'
+    assert bolt['average_price'] == bolt['price'] == 1234.5
+    assert 'market_price' not in bolt and 'low_price' not in bolt
+    assert plains['rarity'] == 'Land'
+    assert 'price' not in plains
+
+
+def test_api_source_parses_bare_print_list():
+    source = JSONAPIPriceSource()
+    recall, walk = source.fetch_set_cards({'set_id': 2, 'set_name': 'Beta'})
+    assert recall['price'] == recall['market_price'] == 3100.0
+    assert walk['price'] == 2750.5
+    assert walk['rarity'] == 'X'
+
+
+def test_headline_price_prefers_average():
+    assert headline_price({'average': '3.5', 'market': 4}) == 3.5
+    assert headline_price({'avg': 0, 'market': 4}) == 4.0
+    assert headline_price({}) is None
+
+
+def test_fallback_on_missing_recording():
+    class Static:
+        name = 'static'
+
+        def fetch_set_cards(self, set_info):
+            return [{'name': 'Fallback'}]
+
+    source = FallbackPriceSource(JSONAPIPriceSource(), Static())
+    assert source.fetch_set_cards({'set_id': 999, 'set_name': 'Unknown'}) == [{'name': 'Fallback'}]
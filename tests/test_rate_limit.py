@@ -0,0 +1,53 @@
+import asyncio
+
+import requests
+
+import rate_limit
+from rate_limit import AdaptiveBackoff, TokenBucket, parse_retry_after
+
+
+def test_bucket_queues_callers_past_the_burst():
+    bucket = TokenBucket(10, capacity=2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    # The burst is spent: each further caller waits one more token interval
+    assert 0.05 < bucket.reserve() <= 0.1
+    assert 0.15 < bucket.reserve() <= 0.2
+
+
+def test_acquire_async_waits_without_blocking():
+    bucket = TokenBucket(1000, capacity=1)
+    asyncio.run(bucket.acquire_async())
+    asyncio.run(bucket.acquire_async())
+    assert bucket.tokens < 1
+
+
+def test_backoff_halves_the_rate_and_recovers(monkeypatch):
+    monkeypatch.setattr(rate_limit.random, 'uniform', lambda low, high: 1.0)
+    bucket = TokenBucket(8)
+    backoff = AdaptiveBackoff(bucket, min_rate=1, base_delay=2.0, max_delay=10.0)
+
+    assert backoff.failure() == 2.0
+    assert backoff.failure() == 4.0
+    assert bucket.rate == 2.0
+    # Retry-After wins when it is longer, but never beyond max_delay
+    assert backoff.failure(retry_after=60) == 10.0
+    assert bucket.rate == 1.0
+    assert backoff.pause_remaining() > 9
+
+    backoff.success()
+    assert backoff.consecutive_failures == 0
+    assert bucket.rate == 1.1
+    for _ in range(50):
+        backoff.success()
+    assert bucket.rate == 8.0
+
+
+def test_parse_retry_after():
+    response = requests.Response()
+    assert parse_retry_after(response) is None
+    response.headers['Retry-After'] = '30'
+    assert parse_retry_after(response) == 30.0
+    response.headers['Retry-After'] = 'Wed, 21 Oct 2026 07:28:00 GMT'
+    assert parse_retry_after(response) is None
+    assert parse_retry_after(None) is None
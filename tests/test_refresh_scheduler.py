@@ -0,0 +1,110 @@
+import json
+
+import pytest
+
+from refresh_scheduler import DEFAULT_SET_REQUESTS, HOUR_SECONDS, MAX_REFRESH_HOURS, RefreshScheduler
+
+NOW = 1_760_000_000.0
+SETS = [{'set_id': str(i), 'set_name': f"Set {i}", 'full_url': f"https://www.mtgstocks.com/sets/{i}"}
+        for i in (1, 2, 3)]
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    scheduler = RefreshScheduler(str(tmp_path / 'refresh.sqlite3'), hourly_request_budget=100)
+    yield scheduler
+    scheduler.close()
+
+
+def test_new_sets_first_newest_first(scheduler):
+    scheduler.sync_sets(SETS)
+    assert [entry['set_id'] for entry in scheduler.plan(NOW)] == ['3', '2', '1']
+    assert all(entry['estimated_requests'] == DEFAULT_SET_REQUESTS for entry in scheduler.plan(NOW))
+
+
+def test_plan_fits_the_budget_in_priority_order(scheduler):
+    scheduler.sync_sets(SETS)
+    scheduler.record_scrape('3', 60, 10, 0, now=NOW - MAX_REFRESH_HOURS * HOUR_SECONDS)
+    scheduler.record_requests(100 - 2 * DEFAULT_SET_REQUESTS, now=NOW)
+    assert [entry['set_id'] for entry in scheduler.plan(NOW)] == ['2', '1']
+    assert scheduler.plan(NOW, budget=DEFAULT_SET_REQUESTS) == scheduler.plan(NOW)[:1]
+
+
+def test_volatility_shortens_the_refresh_interval(scheduler):
+    scheduler.sync_sets(SETS[:1])
+    scheduler.record_scrape('1', 5, 100, 0, now=NOW)
+    assert scheduler.set_state('1')['volatility'] == 0.0
+    scheduler.record_scrape('1', 5, 100, 0, now=NOW)
+    volatility = scheduler.set_state('1')['volatility']
+    assert volatility == pytest.approx(0.3)
+    assert scheduler.refresh_interval(volatility) < scheduler.refresh_interval(0.0)
+    assert scheduler.plan(NOW + HOUR_SECONDS) == []
+
+
+def test_failed_scrape_keeps_the_set_due(scheduler):
+    scheduler.sync_sets(SETS[:1])
+    scheduler.record_failure('1', 7, now=NOW)
+    state = scheduler.set_state('1')
+    assert state['last_scraped'] is None and state['scrapes'] == 0
+    assert scheduler.requests_spent(NOW) == 7
+    assert [entry['set_id'] for entry in scheduler.plan(NOW)] == ['1']
+
+
+def test_refresh_main_records_only_sets_that_were_stored(tmp_path, monkeypatch):
+    pytest.importorskip('chromadb')
+    import mtgstocksPriceDatabasescraper as scraper
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(scraper, '_scrape_journal', None)
+    real_database = scraper.MTGCardDatabase
+    monkeypatch.setattr(scraper, 'MTGCardDatabase', lambda: real_database(ingest_mode='fast'))
+    monkeypatch.setattr(scraper, 'get_all_mtgstocks_set_urls', lambda: SETS[:2])
+
+    class Source:
+        name = 'stub'
+
+        def fetch_set_cards(self, set_info):
+            if set_info['set_id'] == '1':
+                raise ValueError('no response')
+            return [{'name': 'Bolt', 'set_id': '2', 'set_name': 'Set 2', 'price': 1.5,
+                     'card_url': 'https://www.mtgstocks.com/prints/7-bolt'}]
+
+    monkeypatch.setattr(scraper, 'get_price_source', lambda source: Source())
+    scraper.refresh_main(100)
+    scraper.get_scrape_journal().close()
+
+    scheduler = RefreshScheduler()
+    assert scheduler.set_state('1')['last_scraped'] is None
+    assert scheduler.set_state('2')['scrapes'] == 1
+    scheduler.close()
+    with open(scraper.CARD_DATA_JSON, 'r', encoding='utf-8') as f:
+        assert [card['name'] for card in json.load(f)] == ['Bolt']
+
+
+def test_refresh_stops_when_the_real_spend_exhausts_the_budget(tmp_path, monkeypatch):
+    pytest.importorskip('chromadb')
+    import mtgstocksPriceDatabasescraper as scraper
+    from mtgstocks_http import get_client
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(scraper, '_scrape_journal', None)
+    real_database = scraper.MTGCardDatabase
+    monkeypatch.setattr(scraper, 'MTGCardDatabase', lambda: real_database(ingest_mode='fast'))
+    monkeypatch.setattr(scraper, 'get_all_mtgstocks_set_urls', lambda: SETS)
+    fetched = []
+
+    class Source:
+        name = 'stub'
+
+        def fetch_set_cards(self, set_info):
+            fetched.append(set_info['set_id'])
+            # A set that cost far more requests than estimated
+            for _ in range(2 * DEFAULT_SET_REQUESTS + 5):
+                get_client().stats.record(0.0)
+            return [{'name': f"Card {set_info['set_id']}", 'set_id': set_info['set_id'],
+                     'set_name': set_info['set_name'], 'price': 1.0}]
+
+    monkeypatch.setattr(scraper, 'get_price_source', lambda source: Source())
+    scraper.refresh_main(3 * DEFAULT_SET_REQUESTS)
+    scraper.get_scrape_journal().close()
+    assert fetched == ['3']
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from scrape_journal import ScrapeJournal
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = ScrapeJournal(str(tmp_path / 'journal.sqlite3'), legacy_progress_file=None)
+    yield journal
+    journal.close()
+
+
+def test_resume_point(journal):
+    assert journal.resume_point('1') is None
+    journal.record_page('1', 1, 'u1', 'u2', ['a', 'b'])
+    journal.record_page('1', 2, 'u2', 'u3', ['c'])
+    assert journal.resume_point('1') == (3, 'u3')
+    journal.record_page('1', 3, 'u3', None, ['d'])
+    assert journal.resume_point('1') == (None, None)
+
+
+def test_ingested_ids_by_page(journal):
+    journal.record_page('1', 1, 'u1', 'u2', ['a', 'b'])
+    journal.record_page('1', 2, 'u2', None, ['c'])
+    journal.record_page('2', 1, 'v1', None, ['z'])
+    assert journal.ingested_card_ids('1') == {'a', 'b', 'c'}
+    assert journal.ingested_card_ids('1', before_page=2) == {'a', 'b'}
+
+    journal.restart_set('1')
+    assert journal.resume_point('1') is None
+    assert journal.ingested_card_ids('1') == set()
+    assert journal.ingested_card_ids('2') == {'z'}
+
+
+def test_complete_set_survives_reopening(tmp_path):
+    path = str(tmp_path / 'journal.sqlite3')
+    journal = ScrapeJournal(path, commit_every=10, legacy_progress_file=None)
+    journal.record_page('7', 1, 'u1', None, ['a'])
+    journal.complete_set('7')
+    journal.close()
+
+    journal = ScrapeJournal(path, legacy_progress_file=None)
+    assert journal.completed_set_ids() == {'7'}
+    journal.close()
+
+
+def test_legacy_progress_import(tmp_path):
+    legacy = tmp_path / 'scraped_sets.json'
+    legacy.write_text(json.dumps(['1', 2]))
+    journal = ScrapeJournal(str(tmp_path / 'journal.sqlite3'), legacy_progress_file=str(legacy))
+    assert journal.completed_set_ids() == {'1', '2'}
+    journal.close()
+
+
+def test_same_named_cards_keep_distinct_ids_across_pages(tmp_path, journal):
+    pytest.importorskip('chromadb')
+    from mtgstocksPriceDatabasescraper import MTGCardDatabase
+
+    db = MTGCardDatabase(str(tmp_path / 'db'), ingest_mode='fast')
+    plains = {'name': 'Plains', 'set_id': '1', 'set_name': 'Alpha', 'price': '0.10'}
+
+    used_ids = journal.ingested_card_ids('1', before_page=1)
+    page_1 = db.add_cards_to_database([plains, dict(plains, price='0.20')], used_ids=used_ids)
+    journal.record_page('1', 1, 'u1', 'u2', page_1['ids'])
+
+    # A resumed run seeds the ids from the journal
+    used_ids = journal.ingested_card_ids('1', before_page=2)
+    page_2 = db.add_cards_to_database([dict(plains, price='0.30')], used_ids=used_ids)
+
+    assert page_1['ids'] == ['1_plains', '1_plains_2']
+    assert page_2['ids'] == ['1_plains_3']
+    assert db.collection.count() == 3
@@ -0,0 +1,96 @@
+import os
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+pytest.importorskip('chromadb')
+import mtgstocksPriceDatabasescraper as scraper
+from mtgstocks_http import get_client
+from page_cache import PageCache
+from rate_limit import AdaptiveBackoff, TokenBucket
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'set_pages')
+SET_URL = 'https://www.mtgstocks.com/sets/1-alpha'
+
+
+class PagesAdapter(BaseAdapter):
+    """Serves fixture pages by URL"""
+
+    def __init__(self, pages):
+        super().__init__()
+        self.pages = pages
+        self.requested = []
+
+    def send(self, request, **kwargs):
+        self.requested.append(request.url)
+        response = requests.Response()
+        response.url = request.url
+        response.request = request
+        response.encoding = 'utf-8'
+        name = self.pages.get(request.url)
+        if name is None:
+            response.status_code = 404
+            response._content = b''
+        else:
+            response.status_code = 200
+            with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+                response._content = f.read()
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def site(monkeypatch, tmp_path):
+    bucket = TokenBucket(1000)
+    monkeypatch.setattr(scraper, 'mtgstocks_rate_limiter', bucket)
+    monkeypatch.setattr(scraper, 'mtgstocks_backoff', AdaptiveBackoff(bucket, base_delay=0.0))
+    monkeypatch.setattr(scraper, 'set_page_cache', PageCache(str(tmp_path / 'http_cache')))
+    session = get_client().session
+    monkeypatch.setattr(session, 'adapters', session.adapters.copy())
+
+    def serve(pages):
+        adapter = PagesAdapter(pages)
+        session.mount('https://', adapter)
+        return adapter
+    return serve
+
+
+@pytest.mark.parametrize('prefetch', [False, True])
+def test_pipeline_assembles_pages_in_order(site, prefetch):
+    adapter = site({
+        SET_URL: 'alpha_page_1.html',
+        SET_URL + '?page=2': 'alpha_page_3.html',
+        SET_URL + '?page=3': 'alpha_page_1.html',
+    })
+    batches = []
+    stats = scraper.run_scrape_pipeline([{'set_id': '1', 'set_name': 'Alpha', 'full_url': SET_URL}],
+                                        batches.extend, parse_workers=1, queue_size=2, prefetch=prefetch)
+
+    [(set_info, cards)] = batches
+    names = [card['name'] for card in cards]
+    page_1 = ['Black Lotus', 'LightningBolt', 'Plains', 'Jötun Grunt & Friends']
+    assert names == page_1 + ['Shivan Dragon', 'Mox Sapphire'] + page_1
+    assert sorted(adapter.requested) == [SET_URL, SET_URL + '?page=2', SET_URL + '?page=3']
+    assert stats['fetch'].items == 3
+    assert stats['parse'].items == 3
+
+    # A second run reuses the cached parses
+    batches.clear()
+    stats = scraper.run_scrape_pipeline([{'set_id': '1', 'set_name': 'Alpha', 'full_url': SET_URL}],
+                                        batches.extend, parse_workers=1, queue_size=2, prefetch=prefetch)
+    assert [card['name'] for card in batches[0][1]] == names
+    assert stats['parse'].items == 0
+
+
+def test_pipeline_stops_a_set_at_a_missing_page(site):
+    adapter = site({SET_URL: 'alpha_page_1.html', SET_URL + '?page=3': 'alpha_page_3.html'})
+    batches = []
+    scraper.run_scrape_pipeline([{'set_id': '1', 'set_name': 'Alpha', 'full_url': SET_URL}],
+                                batches.extend, parse_workers=1, queue_size=2)
+    [(_, cards)] = batches
+    assert len(cards) == 4
+    # Fetching stops at the failed page instead of running ahead through the set
+    assert SET_URL + '?page=3' not in adapter.requested
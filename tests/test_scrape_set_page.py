@@ -0,0 +1,67 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip('chromadb')
+import mtgstocksPriceDatabasescraper as scraper
+from http_fixtures import ReplayAdapter, fixture_key, use_transport
+from page_cache import PageCache
+from rate_limit import AdaptiveBackoff, TokenBucket
+
+SET_INFO = {'set_id': '1', 'set_name': 'Alpha'}
+SET_URL = 'https://www.mtgstocks.com/sets/1-alpha'
+PAGES = 6
+
+
+def set_page_html(page, pages):
+    buttons = ''.join(
+        f'<li class="page-item{" active" if number == page else ""}"><button class="page-link">{number}</button></li>'
+        for number in range(1, pages + 1))
+    next_state = ' disabled' if page == pages else ''
+    return (f'<html><body><table><tr><th>Name</th><th>Rarity</th><th>Avg</th></tr>'
+            f'<tr><td><a href="/prints/{page}-card-{page}">Card {page}</a></td><td>Common</td><td>${page}.00</td></tr>'
+            f'</table><ul class="pagination">{buttons}'
+            f'<li class="page-item{next_state}"><button class="page-link">Next</button></li></ul></body></html>')
+
+
+def record_set_pages(fixtures_dir, pages):
+    for page in range(1, pages + 1):
+        url = SET_URL if page == 1 else f"{SET_URL}?page={page}"
+        key = fixture_key('GET', url)
+        with open(os.path.join(fixtures_dir, key + '.json'), 'w', encoding='utf-8') as f:
+            json.dump({'method': 'GET', 'url': url, 'status': 200, 'reason': 'OK',
+                       'headers': {'Content-Type': 'text/html; charset=utf-8'}}, f)
+        with open(os.path.join(fixtures_dir, key + '.body'), 'w', encoding='utf-8') as f:
+            f.write(set_page_html(page, pages))
+
+
+@pytest.fixture
+def replay(monkeypatch, tmp_path):
+    bucket = TokenBucket(1000)
+    monkeypatch.setattr(scraper, 'mtgstocks_rate_limiter', bucket)
+    monkeypatch.setattr(scraper, 'mtgstocks_backoff', AdaptiveBackoff(bucket, base_delay=0.0))
+    monkeypatch.setattr(scraper, 'set_page_cache', PageCache(str(tmp_path / 'http_cache')))
+    fixtures_dir = tmp_path / 'fixtures'
+    fixtures_dir.mkdir()
+    record_set_pages(str(fixtures_dir), PAGES)
+    # Jitter so prefetched pages finish out of order
+    with use_transport(ReplayAdapter(str(fixtures_dir), latency=0.02, jitter=0.02)) as adapter:
+        yield adapter
+
+
+def test_prefetched_pages_come_back_in_page_order(replay):
+    pages = []
+    cards = scraper.scrape_set_page(SET_URL, SET_INFO, prefetch=True,
+                                    on_page=lambda number, url, page_cards, next_url: pages.append(number))
+
+    assert [card['name'] for card in cards] == [f'Card {page}' for page in range(1, PAGES + 1)]
+    assert pages == list(range(1, PAGES + 1))
+    assert (replay.served, replay.missing) == (PAGES, 0)
+
+
+@pytest.mark.parametrize('prefetch', [False, True])
+def test_max_pages_caps_the_scrape(replay, prefetch):
+    cards = scraper.scrape_set_page(SET_URL, SET_INFO, max_pages=4, prefetch=prefetch)
+    assert [card['name'] for card in cards] == ['Card 1', 'Card 2', 'Card 3', 'Card 4']
+    assert replay.served == 4
@@ -0,0 +1,50 @@
+import glob
+import os
+
+import pytest
+
+pytest.importorskip('chromadb')
+import mtgstocksPriceDatabasescraper as scraper
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'set_pages')
+SET_INFO = {'set_id': '1', 'set_name': 'Alpha'}
+SET_URL = 'https://www.mtgstocks.com/sets/1-alpha'
+
+
+def load(name):
+    with open(os.path.join(FIXTURES_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('path', sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html'))),
+                         ids=os.path.basename)
+def test_lean_parse_matches_full_parse(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        html = f.read()
+    full = scraper.parse_set_page(html, SET_INFO, SET_URL, lean=False)
+    lean = scraper.parse_set_page(html, SET_INFO, SET_URL, lean=True)
+    assert full[0]
+    assert lean == full
+
+
+def test_table_page():
+    cards, next_url, page_count = scraper.parse_set_page(load('alpha_page_1.html'), SET_INFO, SET_URL)
+    assert [card['name'] for card in cards] == ['Black Lotus', 'LightningBolt', 'Plains', 'Jötun Grunt & Friends']
+    assert cards[0]['card_url'] == 'https://www.mtgstocks.com/prints/1-black-lotus'
+    assert cards[0]['rarity'] == 'Rare'
+    assert cards[0]['set_name'] == 'Alpha'
+    assert cards[1]['price'] == '12.25'
+    assert next_url == SET_URL + '?page=2'
+    assert page_count == 3
+
+
+def test_last_page_and_div_fallback():
+    cards, next_url, page_count = scraper.parse_set_page(load('alpha_page_3.html'), SET_INFO, SET_URL + '?page=3')
+    assert [card['name'] for card in cards] == ['Shivan Dragon', 'Mox Sapphire']
+    assert cards[0]['low_price'] == '380.00' and cards[0]['high_price'] == '612.10'
+    assert next_url is None
+    assert page_count == 3
+
+    cards, _, _ = scraper.parse_set_page(load('beta_divs.html'), SET_INFO, SET_URL)
+    assert {card['name'] for card in cards} == {'Ancestral Recall', 'Time Walk', 'Sol Ring'}
+    assert cards[0]['price'] == '3100.00'
@@ -0,0 +1,26 @@
+import pytest
+
+from sharded_name_scorer import ShardedNameScorer, sequence_similarity
+
+NAMES = ['lightning bolt', 'lightning helix', 'counterspell', 'sol ring', 'lightning bolt', 'llanowar elves']
+
+
+def test_sharded_scores_match_a_single_scan():
+    with ShardedNameScorer(NAMES, num_shards=3) as scorer:
+        results = scorer.score_batch(['lightning bolt', 'sol rng'], k=3)
+
+    for query, matches in zip(['lightning bolt', 'sol rng'], results):
+        expected = sorted(((sequence_similarity(query, name), i) for i, name in enumerate(NAMES)),
+                          key=lambda match: (-match[0], match[1]))[:3]
+        assert matches == expected
+    # Duplicate exact matches keep catalog order
+    assert [position for _, position in results[0][:2]] == [0, 4]
+
+
+def test_top_matches_and_empty_catalog():
+    with ShardedNameScorer(NAMES, num_shards=2) as scorer:
+        assert scorer.top_matches('counterspel', k=1)[0][1] == 'counterspell'
+    with ShardedNameScorer([], num_shards=2) as scorer:
+        assert scorer.score_batch(['anything']) == [[]]
+    with pytest.raises(ValueError):
+        ShardedNameScorer(NAMES, scorer='unknown')